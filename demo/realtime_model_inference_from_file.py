@@ -4,10 +4,16 @@ import re
 import traceback
 from typing import List, Tuple, Union, Dict, Any
 import time
+import numpy as np
 import torch
-import copy
 
-from vibevoice.modular.modeling_vibevoice_streaming_inference import VibeVoiceStreamingForConditionalGenerationInference
+from vibevoice.modular.modeling_vibevoice_streaming_inference import (
+    CPU_BF16_PRECISION_MAP,
+    VibeVoiceStreamingForConditionalGenerationInference,
+)
+from vibevoice.modular.quantization import QUANTIZABLE_COMPONENTS, is_quantized_checkpoint, load_quantized, quantize_for_cpu
+from vibevoice.modular.voice_preset import VOICE_PRESET_SUFFIX, clone_prefilled_outputs, load_prefilled_outputs
+from vibevoice.processor.audio_streaming import StreamingResampler
 from vibevoice.processor.vibevoice_streaming_processor import VibeVoiceStreamingProcessor
 from transformers.utils import logging
 
@@ -49,13 +55,15 @@ class VoiceMapper:
         # Scan for all VOICE files in the voices directory
         self.voice_presets = {}
         
-        # Get all .pt files in the voices directory
+        # Get all .pt files in the voices directory, then the slim presets, which take precedence
         pt_files = [f for f in os.listdir(voices_dir) 
                     if f.lower().endswith('.pt') and os.path.isfile(os.path.join(voices_dir, f))]
+        pt_files += [f for f in os.listdir(voices_dir)
+                     if f.endswith(VOICE_PRESET_SUFFIX) and os.path.isfile(os.path.join(voices_dir, f))]
         
         # Create dictionary with filename (without extension) as key
         for pt_file in pt_files:
-            # Remove .pt extension to get the name
+            # Remove the extension to get the name
             name = os.path.splitext(pt_file)[0]
             # Create full path
             full_path = os.path.join(voices_dir, pt_file)
@@ -129,6 +137,60 @@ def parse_args():
         default=1.5,
         help="CFG (Classifier-Free Guidance) scale for generation (default: 1.5)",
     )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed for the diffusion noise, makes the generated audio reproducible (default: unseeded)",
+    )
+    parser.add_argument(
+        "--decode_chunk_size",
+        type=int,
+        default=1,
+        help="Speech latents decoded per acoustic decoder call; larger values trade latency for throughput (default: 1)",
+    )
+    parser.add_argument(
+        "--offline_decode",
+        action="store_true",
+        help="Decode the whole utterance in one non-streaming pass after generation instead of frame by frame",
+    )
+    parser.add_argument(
+        "--save_latents",
+        action="store_true",
+        help="Also save the speech latents (.safetensors) for later decoding with vibevoice/scripts/decode_latents.py",
+    )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="Fold layer scales and norm weights into the weights at load time (checked for numerical equivalence)",
+    )
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Compile the per-token hot path with torch.compile (opt-in, falls back to eager mode on failure)",
+    )
+    parser.add_argument(
+        "--cpu_dtype",
+        type=str,
+        default="float32",
+        choices=["float32", "bfloat16"],
+        help="Inference dtype on CPU; bfloat16 keeps the EOS classifier and the last decoder conv in float32",
+    )
+    parser.add_argument(
+        "--quantize",
+        type=str,
+        nargs="*",
+        default=[],
+        choices=list(QUANTIZABLE_COMPONENTS),
+        help="CPU only: components whose Linear layers run as dynamic int8 kernels "
+             "(a checkpoint saved by vibevoice/scripts/quantize_model.py can also be passed as --model_path)",
+    )
+    parser.add_argument(
+        "--output_sample_rate",
+        type=int,
+        default=24000,
+        help="Sample rate of the saved audio (e.g. 8000 or 16000 for telephony); the model output is 24000 Hz",
+    )
     
     return parser.parse_args()
 
@@ -197,6 +259,8 @@ def main():
                 device_map="cuda",
                 attn_implementation=attn_impl_primary,
             )
+        elif is_quantized_checkpoint(args.model_path):
+            model = load_quantized(args.model_path, attn_implementation=attn_impl_primary)
         else:  # cpu
             model = VibeVoiceStreamingForConditionalGenerationInference.from_pretrained(
                 args.model_path,
@@ -224,12 +288,32 @@ def main():
     model.eval()
     model.set_ddpm_inference_steps(num_steps=5)
 
+    if args.optimize:
+        deviations = model.optimize_for_inference(check=True)
+        print(f"Folded weights for inference, max relative deviation: {deviations}")
+
+    if args.quantize:
+        counts = quantize_for_cpu(model, args.quantize)
+        print(f"Quantized Linear layers: {counts}")
+
+    if args.device == "cpu" and args.cpu_dtype == "bfloat16":
+        dtypes = model.apply_precision_map({
+            name: dtype for name, dtype in CPU_BF16_PRECISION_MAP.items() if name not in model._quantized_components
+        })
+        print(f"CPU bf16 precision map: {dtypes}")
+
+    if args.compile:
+        print("Compiling hot modules and warming up...")
+        if not model.compile_for_inference(warmup=True, decode_chunk_size=args.decode_chunk_size):
+            print("Compiled mode unavailable, running eagerly")
+
     if hasattr(model.model, 'language_model'):
        print(f"Language model attention: {model.model.language_model.config._attn_implementation}")
     
     target_device = args.device if args.device != "cpu" else "cpu"
     voice_sample = voice_mapper.get_voice_path(args.speaker_name)
-    all_prefilled_outputs = torch.load(voice_sample, map_location=target_device, weights_only=False)
+    all_prefilled_outputs = load_prefilled_outputs(voice_sample, device=target_device)
+    all_prefilled_outputs = model.cast_prefilled_outputs(all_prefilled_outputs)
 
     # Prepare inputs for the model
     inputs = processor.process_input_with_cached_prompt(
@@ -256,7 +340,10 @@ def main():
         tokenizer=processor.tokenizer,
         generation_config={'do_sample': False},
         verbose=True,
-        all_prefilled_outputs=copy.deepcopy(all_prefilled_outputs) if all_prefilled_outputs is not None else None,
+        seed=args.seed,
+        decode_chunk_size=args.decode_chunk_size,
+        defer_decode=args.offline_decode,
+        all_prefilled_outputs=clone_prefilled_outputs(all_prefilled_outputs) if all_prefilled_outputs is not None else None,
     )
     generation_time = time.time() - start_time
     print(f"Generation time: {generation_time:.2f} seconds")
@@ -288,11 +375,26 @@ def main():
     output_path = os.path.join(args.output_dir, f"{txt_filename}_generated.wav")
     os.makedirs(args.output_dir, exist_ok=True)
     
+    speech_output = outputs.speech_outputs[0]  # First (and only) batch item
+    if args.output_sample_rate != 24000:
+        resampler = StreamingResampler(24000, args.output_sample_rate)
+        audio = speech_output.detach().float().cpu().numpy().reshape(-1)
+        speech_output = np.concatenate([resampler.process(audio), resampler.flush()])
     processor.save_audio(
-        outputs.speech_outputs[0], # First (and only) batch item
+        speech_output,
         output_path=output_path,
+        sampling_rate=args.output_sample_rate,
     )
     print(f"Saved output to {output_path}")
+
+    if args.save_latents and outputs.speech_latents and outputs.speech_latents[0] is not None:
+        latents_path = os.path.join(args.output_dir, f"{txt_filename}_latents.safetensors")
+        model.save_speech_latents(
+            latents_path,
+            outputs.speech_latents[0],
+            metadata={"text_file": args.txt_path, "speaker_name": args.speaker_name, "model_path": args.model_path},
+        )
+        print(f"Saved speech latents to {latents_path}")
     
     # Print summary
     print("\n" + "="*50)
@@ -6,10 +6,54 @@ def main():
     p.add_argument("--model_path", type=str, default="default_model")
     p.add_argument("--device", type=str, default="cuda", choices=["cpu", "cuda", "mpx", "mps"])
     p.add_argument("--reload", action="store_true", help="Reload the model or not")
+    p.add_argument("--optimize", action="store_true", help="Fold layer scales and norm weights into the weights at load time")
+    p.add_argument("--compile", action="store_true", help="Compile the per-token hot path with torch.compile")
+    p.add_argument("--cpu_dtype", type=str, default="float32", choices=["float32", "bfloat16"],
+                   help="Inference dtype on CPU (bfloat16 keeps numerically sensitive stages in float32)")
+    p.add_argument("--quantize", type=str, nargs="*", default=[],
+                   choices=["language_model", "tts_language_model", "prediction_head", "acoustic_decoder"],
+                   help="CPU only: components whose Linear layers run as dynamic int8 kernels")
+    p.add_argument("--batched_decoder", action="store_true", help="Decode audio of concurrent sessions in shared batches")
+    p.add_argument("--max_buffer_sec", type=float, default=10.0,
+                   help="Seconds of audio buffered per session before its generation pauses for a slow client")
+    p.add_argument("--max_frame_sec", type=float, default=1.0,
+                   help="Largest frame sent to a client that falls behind (queued chunks are coalesced)")
+    p.add_argument("--webrtc_prebuffer_ms", type=int, default=200, help="Audio held before WebRTC playout starts")
+    p.add_argument("--trim_silence", action="store_true",
+                   help="Drop near-silent audio before the first and after the last voiced sample of each request")
+    p.add_argument("--silence_threshold_db", type=float, default=-50.0, help="RMS level (dBFS) counted as voiced")
+    p.add_argument("--max_sessions", type=int, default=1, help="Sessions generating at once")
+    p.add_argument("--max_queue", type=int, default=16, help="Sessions waiting for a slot at once")
+    p.add_argument("--max_wait_sec", type=float, default=30.0, help="Longest wait in the queue before a session is rejected")
+    p.add_argument("--class_limits", type=str, default="",
+                   help="Caps on admitted plus queued sessions per priority class, e.g. 'low=2,normal=8'")
+    p.add_argument("--stage_metrics", action="store_true",
+                   help="Time every forward call of the model stages for /metrics (not with --compile)")
+    p.add_argument("--voice_cache_mb", type=float, default=1024.0,
+                   help="Memory kept for loaded voice presets, least recently used ones are evicted beyond it")
+    p.add_argument("--pinned_voices", type=str, nargs="*", default=[],
+                   help="Voices loaded at startup and never evicted (the default voice always is)")
     args = p.parse_args()
     
     os.environ["MODEL_PATH"] = args.model_path
     os.environ["MODEL_DEVICE"] = args.device
+    os.environ["MODEL_OPTIMIZE"] = "1" if args.optimize else "0"
+    os.environ["MODEL_COMPILE"] = "1" if args.compile else "0"
+    os.environ["MODEL_CPU_DTYPE"] = args.cpu_dtype
+    os.environ["MODEL_QUANTIZE"] = ",".join(args.quantize)
+    os.environ["MODEL_BATCHED_DECODER"] = "1" if args.batched_decoder else "0"
+    os.environ["MODEL_MAX_BUFFER_SEC"] = str(args.max_buffer_sec)
+    os.environ["MODEL_MAX_FRAME_SEC"] = str(args.max_frame_sec)
+    os.environ["MODEL_WEBRTC_PREBUFFER_MS"] = str(args.webrtc_prebuffer_ms)
+    os.environ["MODEL_TRIM_SILENCE"] = "1" if args.trim_silence else "0"
+    os.environ["MODEL_SILENCE_THRESHOLD_DB"] = str(args.silence_threshold_db)
+    os.environ["MODEL_MAX_SESSIONS"] = str(args.max_sessions)
+    os.environ["MODEL_MAX_QUEUE"] = str(args.max_queue)
+    os.environ["MODEL_MAX_WAIT_SEC"] = str(args.max_wait_sec)
+    os.environ["MODEL_CLASS_LIMITS"] = args.class_limits
+    os.environ["MODEL_STAGE_METRICS"] = "1" if args.stage_metrics else "0"
+    os.environ["MODEL_VOICE_CACHE_MB"] = str(args.voice_cache_mb)
+    os.environ["MODEL_PINNED_VOICES"] = ",".join(args.pinned_voices)
 
     uvicorn.run("web.app:app", host="0.0.0.0", port=args.port, reload=args.reload)
 
@@ -0,0 +1,210 @@
+"""
+Admission control for generation sessions.
+
+`AdmissionController` bounds the sessions generating at once. Sessions that do not fit wait in a priority
+queue (FIFO within a class) for at most `max_wait_sec`, receiving their position and estimated start time
+while they wait. The queue is bounded and each priority class can be capped; when the queue is full, a
+newcomer of a higher class displaces the most recent waiter of the lowest class, otherwise it is rejected.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+DEFAULT_PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class AdmissionRejected(Exception):
+    """The session was not admitted; `reason` is one of "queue_full", "class_limit", "timeout", "displaced"."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class AdmissionSlot:
+    """A granted session; release it exactly once (also usable as an async context manager)."""
+
+    def __init__(self, controller: "AdmissionController", priority_class: str, waited_sec: float):
+        self.controller = controller
+        self.priority_class = priority_class
+        self.waited_sec = waited_sec
+        self.admitted = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.controller._release(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+class _Ticket:
+    __slots__ = ("priority", "sequence", "priority_class", "future", "enqueued")
+
+    def __init__(self, priority: int, sequence: int, priority_class: str, future: asyncio.Future):
+        self.priority = priority
+        self.sequence = sequence
+        self.priority_class = priority_class
+        self.future = future
+        self.enqueued = time.monotonic()
+
+    def __lt__(self, other: "_Ticket") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class AdmissionController:
+    """
+    Args:
+        capacity: Sessions generating at once.
+        max_queue: Sessions waiting at once, over all classes.
+        max_wait_sec: Longest wait before a queued session is rejected.
+        class_limits: Optional cap per class on its admitted plus queued sessions.
+        priorities: Class name to priority (lower is served first).
+        initial_session_sec: Session duration assumed for the start estimates until sessions have completed.
+        update_interval_sec: Period of the position updates sent to a waiting session.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1,
+        max_queue: int = 16,
+        max_wait_sec: float = 30.0,
+        class_limits: Optional[Dict[str, int]] = None,
+        priorities: Optional[Dict[str, int]] = None,
+        initial_session_sec: float = 10.0,
+        update_interval_sec: float = 1.0,
+    ):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_wait_sec = max_wait_sec
+        self.class_limits = class_limits or {}
+        self.priorities = priorities or DEFAULT_PRIORITIES
+        self.update_interval_sec = update_interval_sec
+        # Moving average of the session durations, for the start estimates
+        self.average_session_sec = initial_session_sec
+
+        self._queue: List[_Ticket] = []
+        self._sequence = itertools.count()
+        self.active: Dict[str, int] = {name: 0 for name in self.priorities}
+        self.counters: Dict[str, int] = {"admitted": 0, "enqueued": 0, "timeout": 0, "queue_full": 0, "class_limit": 0, "displaced": 0}
+
+    @property
+    def num_active(self) -> int:
+        return sum(self.active.values())
+
+    def _class_usage(self, priority_class: str) -> int:
+        return self.active[priority_class] + sum(1 for ticket in self._queue if ticket.priority_class == priority_class)
+
+    def _check_class(self, priority_class: str) -> str:
+        if priority_class not in self.priorities:
+            raise ValueError(f"Unknown priority class {priority_class!r}, expected one of {sorted(self.priorities)}")
+        limit = self.class_limits.get(priority_class)
+        if limit is not None and self._class_usage(priority_class) >= limit:
+            self.counters["class_limit"] += 1
+            raise AdmissionRejected("class_limit", f"Too many '{priority_class}' sessions, try again later")
+        return priority_class
+
+    def _grant(self, priority_class: str, waited_sec: float) -> AdmissionSlot:
+        self.active[priority_class] += 1
+        self.counters["admitted"] += 1
+        return AdmissionSlot(self, priority_class, waited_sec)
+
+    def position(self, ticket: _Ticket) -> int:
+        """0-based position of `ticket` in the service order."""
+        return sum(1 for other in self._queue if other < ticket)
+
+    def estimated_start_sec(self, position: int) -> float:
+        """Rough wait before the session at `position` starts, from the average session duration."""
+        return (position // self.capacity + 1) * self.average_session_sec
+
+    def try_acquire(self, priority_class: str = "normal") -> AdmissionSlot:
+        """Admit now or raise `AdmissionRejected` (for requests that cannot wait, such as WebRTC offers)."""
+        self._check_class(priority_class)
+        if self.num_active < self.capacity and not self._queue:
+            return self._grant(priority_class, 0.0)
+        self.counters["queue_full"] += 1
+        raise AdmissionRejected("queue_full", "All generation slots are busy, try again later")
+
+    async def acquire(
+        self,
+        priority_class: str = "normal",
+        on_update: Optional[Callable[[int, float], Awaitable[None]]] = None,
+    ) -> AdmissionSlot:
+        """
+        Wait for a slot. `on_update(position, estimated_start_sec)` is awaited when the session is queued and
+        then every `update_interval_sec`; an exception it raises (e.g. the client went away) leaves the queue.
+        """
+        self._check_class(priority_class)
+        if self.num_active < self.capacity and not self._queue:
+            return self._grant(priority_class, 0.0)
+
+        ticket = _Ticket(self.priorities[priority_class], next(self._sequence), priority_class, asyncio.get_running_loop().create_future())
+        if len(self._queue) >= self.max_queue:
+            worst = max(self._queue)
+            if not ticket < worst:
+                self.counters["queue_full"] += 1
+                raise AdmissionRejected("queue_full", "The queue is full, try again later")
+            self._remove(worst)
+            self.counters["displaced"] += 1
+            worst.future.set_exception(AdmissionRejected("displaced", "Displaced by a higher priority session"))
+        heapq.heappush(self._queue, ticket)
+        self.counters["enqueued"] += 1
+
+        deadline = ticket.enqueued + self.max_wait_sec
+        try:
+            while True:
+                if on_update is not None:
+                    position = self.position(ticket)
+                    await on_update(position, self.estimated_start_sec(position))
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, _ = await asyncio.wait({ticket.future}, timeout=min(self.update_interval_sec, remaining))
+                if done:
+                    # Granted by `_release`, or displaced
+                    return ticket.future.result()
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        self._abandon(ticket)
+        self.counters["timeout"] += 1
+        raise AdmissionRejected("timeout", f"No slot became free within {self.max_wait_sec:.0f} s")
+
+    def _remove(self, ticket: _Ticket):
+        self._queue.remove(ticket)
+        heapq.heapify(self._queue)
+
+    def _abandon(self, ticket: _Ticket):
+        if ticket in self._queue:
+            self._remove(ticket)
+        elif ticket.future.done() and not ticket.future.cancelled() and ticket.future.exception() is None:
+            # Granted while giving up, hand the slot back
+            ticket.future.result().release()
+
+    def _release(self, slot: AdmissionSlot):
+        self.active[slot.priority_class] -= 1
+        duration = time.monotonic() - slot.admitted
+        self.average_session_sec = 0.8 * self.average_session_sec + 0.2 * duration
+        while self._queue and self.num_active < self.capacity:
+            ticket = heapq.heappop(self._queue)
+            if not ticket.future.done():
+                ticket.future.set_result(self._grant(ticket.priority_class, time.monotonic() - ticket.enqueued))
+
+    def stats(self) -> Dict[str, object]:
+        queued: Dict[str, int] = {name: 0 for name in self.priorities}
+        for ticket in self._queue:
+            queued[ticket.priority_class] += 1
+        return {
+            "capacity": self.capacity,
+            "active": dict(self.active),
+            "queued": queued,
+            "average_session_sec": self.average_session_sec,
+            **self.counters,
+        }
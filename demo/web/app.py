@@ -7,32 +7,55 @@ import threading
 import traceback
 from pathlib import Path
 from queue import Empty, Queue
-from typing import Any, Callable, Dict, Iterator, Optional, Tuple, cast
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 import torch
 from fastapi import FastAPI, WebSocket, Request
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from starlette.websockets import WebSocketDisconnect, WebSocketState
-from aiortc import RTCPeerConnection, RTCSessionDescription, MediaStreamTrack
-from av import AudioFrame
+from aiortc import RTCPeerConnection, RTCSessionDescription
 import time
 import numpy as np
-from queue import Queue as ThreadQueue
 
 from vibevoice.modular.modeling_vibevoice_streaming_inference import (
+    CPU_BF16_PRECISION_MAP,
     VibeVoiceStreamingForConditionalGenerationInference,
 )
 from vibevoice.processor.vibevoice_streaming_processor import (
     VibeVoiceStreamingProcessor,
 )
-from vibevoice.modular.streamer import AudioStreamer
-
-import copy
+from vibevoice.modular.streamer import RingBufferAudioStreamer
+from vibevoice.modular.acoustic_decoder_service import BatchedAcousticDecoder
+from vibevoice.modular.quantization import is_quantized_checkpoint, load_quantized, quantize_for_cpu
+from vibevoice.modular.shared_weights import load_shared_model
+from vibevoice.modular.voice_preset import VOICE_PRESET_SUFFIX, clone_prefilled_outputs, load_prefilled_outputs, preset_nbytes
+
+from vibevoice.processor.audio_streaming import SilenceTrimmer, StreamingResampler
+
+from .admission import AdmissionController, AdmissionRejected
+from .audio_codecs import ENCODERS, PCM16Encoder, create_encoder
+from .audio_pacer import PacedAudioTrack
+from .metrics import (
+    AUDIO_SECONDS,
+    BYTES_SENT,
+    CONTENT_TYPE,
+    ERRORS,
+    GENERATIONS,
+    REAL_TIME_FACTOR,
+    REGISTRY,
+    STAGE_LATENCY,
+    TIME_TO_FIRST_AUDIO,
+    StageTimer,
+)
+from .voice_cache import VoicePresetCache
 
 BASE = Path(__file__).parent
 SAMPLE_RATE = 24_000
+# Output rates a client can request, the audio is resampled on the server
+MIN_OUTPUT_SAMPLE_RATE = 8_000
+MAX_OUTPUT_SAMPLE_RATE = 48_000
 
 
 def get_timestamp():
@@ -43,23 +66,136 @@ def get_timestamp():
     ).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
     return timestamp
 
+class _OutputPipeline:
+    """
+    Per-stream post-processing of the decoded chunks, shared by `stream` and `astream`: peak normalization,
+    the optional silence gate, and the progress and latency log events.
+    """
+
+    def __init__(
+        self,
+        service: "StreamingTTSService",
+        audio_streamer: RingBufferAudioStreamer,
+        emit: Callable[..., None],
+        metric_labels: Dict[str, object],
+        started: float,
+    ):
+        self.service = service
+        self.audio_streamer = audio_streamer
+        self.emit = emit
+        self.metric_labels = metric_labels
+        self.sample_rate = service.sample_rate
+        # Also used without trimming, to report when speech starts
+        self.gate = SilenceTrimmer(service.sample_rate, threshold_db=service.silence_threshold_db)
+        self.started = started
+        self.generated_samples = 0
+        self.first_voiced_logged = False
+
+    def _elapsed_ms(self) -> float:
+        return 1000.0 * (time.perf_counter() - self.started)
+
+    def process(self, audio_chunk: np.ndarray) -> np.ndarray:
+        self.service._normalize_chunk(audio_chunk)
+        if not self.generated_samples:
+            latency_ms = self._elapsed_ms()
+            TIME_TO_FIRST_AUDIO.observe(latency_ms / 1000.0, **self.metric_labels)
+            self.emit("model_first_chunk", latency_ms=latency_ms)
+        self.generated_samples += int(audio_chunk.size)
+        self.emit(
+            "model_progress",
+            generated_sec=self.generated_samples / self.sample_rate,
+            chunk_sec=audio_chunk.size / self.sample_rate,
+            buffer_sec=self.audio_streamer.buffered_seconds(0),
+            stalled_sec=self.audio_streamer.stalled_seconds(0),
+        )
+
+        if self.service.trim_silence:
+            audio_chunk = self.gate.process(audio_chunk)
+        elif not self.gate.voiced:
+            self.gate.process(audio_chunk)
+        if self.gate.voiced and not self.first_voiced_logged:
+            self.first_voiced_logged = True
+            self.emit(
+                "model_first_voiced",
+                latency_ms=self._elapsed_ms(),
+                leading_silence_sec=self.gate.first_voiced_sample / self.sample_rate,
+            )
+        return audio_chunk
+
+    def finish(self) -> np.ndarray:
+        """Audio still held by the gate at the end of the stream."""
+        if not self.service.trim_silence:
+            return np.zeros(0, dtype=np.float32)
+        tail = self.gate.flush()
+        self.emit(
+            "model_silence_trimmed",
+            leading_sec=self.gate.trimmed_leading / self.sample_rate,
+            trailing_sec=self.gate.trimmed_trailing / self.sample_rate,
+        )
+        return tail
+
+    def close(self):
+        """Record the real-time factor once generation has wound down."""
+        if not self.generated_samples:
+            return
+        audio_sec = self.generated_samples / self.sample_rate
+        # Time paused for a slow consumer is not generation time
+        busy_sec = time.perf_counter() - self.started - self.audio_streamer.stalled_seconds(0)
+        REAL_TIME_FACTOR.observe(max(busy_sec, 0.0) / audio_sec, **self.metric_labels)
+        AUDIO_SECONDS.inc(audio_sec)
+
+
 class StreamingTTSService:
     def __init__(
         self,
         model_path: str,
         device: str = "cuda",
         inference_steps: int = 5,
+        compile_model: bool = False,
+        optimize_model: bool = False,
+        batched_decoder: bool = False,
+        cpu_dtype: str = "float32",
+        quantize_components: Optional[List[str]] = None,
+        max_buffer_sec: float = 10.0,
+        max_frame_sec: float = 1.0,
+        trim_silence: bool = False,
+        silence_threshold_db: float = -50.0,
+        shared_weights_path: Optional[str] = None,
+        stage_metrics: bool = False,
+        voice_cache_mb: float = 1024.0,
+        pinned_voices: Optional[List[str]] = None,
     ) -> None:
         # Keep model_path as string for HuggingFace repo IDs (Path() converts / to \ on Windows)
         self.model_path = model_path
         self.inference_steps = inference_steps
+        self.compile_model = compile_model
+        self.optimize_model = optimize_model
+        self.batched_decoder = batched_decoder
+        self.cpu_dtype = cpu_dtype
+        self.quantize_components = quantize_components or []
+        # Audio buffered per session before generation pauses, and largest frame sent to a lagging client
+        self.max_buffer_sec = max_buffer_sec
+        self.max_frame_sec = max_frame_sec
+        # Drop the near-silent audio before the first and after the last voiced sample
+        self.trim_silence = trim_silence
+        self.silence_threshold_db = silence_threshold_db
+        # Weights memory-mapped from a file shared with the other worker processes (see multiworker.py)
+        self.shared_weights_path = shared_weights_path
+        # Time every forward call of the model stages into the stage latency histogram
+        self.stage_metrics = stage_metrics
+        self.stage_timer: Optional[StageTimer] = None
+        self.acoustic_decoder: Optional[BatchedAcousticDecoder] = None
         self.sample_rate = SAMPLE_RATE
 
         self.processor: Optional[VibeVoiceStreamingProcessor] = None
         self.model: Optional[VibeVoiceStreamingForConditionalGenerationInference] = None
         self.voice_presets: Dict[str, Path] = {}
         self.default_voice_key: Optional[str] = None
-        self._voice_cache: Dict[str, Tuple[object, Path, str]] = {}
+        # Loaded presets are kept up to this budget; the pinned voices (and the default one) are loaded at
+        # startup and never evicted
+        self.voice_cache_mb = voice_cache_mb
+        self.pinned_voices = pinned_voices or []
+        self.voice_cache: Optional[VoicePresetCache] = None
 
         if device == "mpx":
             print("Note: device 'mpx' detected, treating it as 'mps'.")
@@ -91,12 +227,23 @@ class StreamingTTSService:
         print(f"Using device: {device_map}, torch_dtype: {load_dtype}, attn_implementation: {attn_impl_primary}")
         # Load model
         try:
-            self.model = VibeVoiceStreamingForConditionalGenerationInference.from_pretrained(
-                self.model_path,
-                torch_dtype=load_dtype,
-                device_map=device_map,
-                attn_implementation=attn_impl_primary,
-            )
+            if self.shared_weights_path:
+                if self.device != "cpu":
+                    raise RuntimeError("Shared memory-mapped weights are supported on CPU only")
+                print(f"[startup] Mapping shared weights from {self.shared_weights_path}")
+                self.model = load_shared_model(self.model_path, self.shared_weights_path, attn_implementation=attn_impl_primary)
+            elif is_quantized_checkpoint(self.model_path):
+                if self.device != "cpu":
+                    raise RuntimeError("Quantized checkpoints run on CPU only")
+                print(f"[startup] Loading quantized checkpoint from {self.model_path}")
+                self.model = load_quantized(self.model_path, attn_implementation=attn_impl_primary)
+            else:
+                self.model = VibeVoiceStreamingForConditionalGenerationInference.from_pretrained(
+                    self.model_path,
+                    torch_dtype=load_dtype,
+                    device_map=device_map,
+                    attn_implementation=attn_impl_primary,
+                )
             
             if self.device == "mps":
                 self.model.to("mps")
@@ -123,10 +270,57 @@ class StreamingTTSService:
         )
         self.model.set_ddpm_inference_steps(num_steps=self.inference_steps)
 
+        if self.optimize_model:
+            deviations = self.model.optimize_for_inference(check=True)
+            print(f"[startup] Folded weights for inference, max relative deviation: {deviations}")
+
+        if self.quantize_components:
+            # Dynamic int8 kernels need the fp32 weights, so this runs before the precision map
+            counts = quantize_for_cpu(self.model, self.quantize_components)
+            print(f"[startup] Quantized Linear layers: {counts}")
+
+        if self.device == "cpu" and self.cpu_dtype == "bfloat16":
+            # Loaded in fp32 so the stages kept in fp32 by the precision map keep full-precision weights
+            dtypes = self.model.apply_precision_map({
+                name: dtype for name, dtype in CPU_BF16_PRECISION_MAP.items()
+                if name not in self.model._quantized_components
+            })
+            print(f"[startup] CPU bf16 precision map: {dtypes}")
+
+        if self.compile_model:
+            print("[startup] Compiling hot modules and warming up")
+            if not self.model.compile_for_inference(warmup=True):
+                print("[startup] Compiled mode unavailable, running eagerly")
+
+        if self.stage_metrics:
+            if self.compile_model:
+                # Python hooks on compiled modules would break their graphs
+                print("[startup] Stage metrics are not collected for compiled models")
+            else:
+                stages = self.model._precision_stages()
+                self.stage_timer = StageTimer(STAGE_LATENCY, {
+                    name: stages[name]
+                    for name in ("language_model", "tts_language_model", "prediction_head",
+                                 "acoustic_connector", "tts_eos_classifier", "acoustic_decoder")
+                })
+
+        if self.batched_decoder:
+            # Concurrent generations share one batched acoustic decoder worker
+            self.acoustic_decoder = BatchedAcousticDecoder(self.model.model.acoustic_tokenizer)
+
         self.voice_presets = self._load_voice_presets()
         preset_name = os.environ.get("VOICE_PRESET")
         self.default_voice_key = self._determine_voice_key(preset_name)
-        self._ensure_voice_cached(self.default_voice_key)
+        unknown = [key for key in self.pinned_voices if key not in self.voice_presets]
+        if unknown:
+            print(f"[startup] Ignoring unknown pinned voices: {unknown}")
+        self.voice_cache = VoicePresetCache(
+            self._load_voice,
+            budget_bytes=int(self.voice_cache_mb * 2**20),
+            size_fn=preset_nbytes,
+            pinned=[self.default_voice_key] + [key for key in self.pinned_voices if key in self.voice_presets],
+        )
+        self.voice_cache.prewarm()
 
     def _load_voice_presets(self) -> Dict[str, Path]:
         voices_dir = BASE.parent / "voices" / "streaming_model"
@@ -136,9 +330,12 @@ class StreamingTTSService:
         presets: Dict[str, Path] = {}
         for pt_path in voices_dir.glob("*.pt"):
             presets[pt_path.stem] = pt_path
+        # Slim presets (vibevoice/scripts/convert_voice_presets.py) take precedence over the pickled ones
+        for preset_path in voices_dir.glob(f"*{VOICE_PRESET_SUFFIX}"):
+            presets[preset_path.stem] = preset_path
 
         if not presets:
-            raise RuntimeError(f"No voice preset (.pt) files found in {voices_dir}")
+            raise RuntimeError(f"No voice preset (.pt or {VOICE_PRESET_SUFFIX}) files found in {voices_dir}")
 
         print(f"[startup] Found {len(presets)} voice presets")
         return dict(sorted(presets.items()))
@@ -155,32 +352,42 @@ class StreamingTTSService:
         print(f"[startup] Using fallback voice preset: {first_key}")
         return first_key
 
-    def _ensure_voice_cached(self, key: str) -> Tuple[object, Path, str]:
+    def _load_voice(self, key: str) -> object:
+        preset_path = self.voice_presets[key]
+        print(f"[voice_cache] Loading voice preset {key} from {preset_path}")
+        prefilled_outputs = load_prefilled_outputs(preset_path, device=self._torch_device)
+        return self.model.cast_prefilled_outputs(prefilled_outputs)
+
+    def _ensure_voice_cached(self, key: str) -> object:
         if key not in self.voice_presets:
             raise RuntimeError(f"Voice preset {key!r} not found")
+        return self.voice_cache.get(key)
 
-        if key not in self._voice_cache:
-            preset_path = self.voice_presets[key]
-            print(f"[startup] Loading voice preset {key} from {preset_path}")
-            print(f"[startup] Loading prefilled prompt from {preset_path}")
-            prefilled_outputs = torch.load(
-                preset_path,
-                map_location=self._torch_device,
-                weights_only=False,
-            )
-            self._voice_cache[key] = prefilled_outputs
-
-        return self._voice_cache[key]
-
-    def _get_voice_resources(self, requested_key: Optional[str]) -> Tuple[str, object, Path, str]:
+    def _resolve_voice_key(self, requested_key: Optional[str]) -> str:
         key = requested_key if requested_key and requested_key in self.voice_presets else self.default_voice_key
         if key is None:
             key = next(iter(self.voice_presets))
             self.default_voice_key = key
+        return key
 
+    def _get_voice_resources(self, requested_key: Optional[str]) -> Tuple[str, object]:
+        key = self._resolve_voice_key(requested_key)
         prefilled_outputs = self._ensure_voice_cached(key)
         return key, prefilled_outputs
 
+    def prefetch_voices(self, keys: List[str]) -> Dict[str, str]:
+        """Start background loads of voices expected to be requested soon; returns the state of each."""
+        states = {}
+        for key in keys:
+            if key not in self.voice_presets:
+                states[key] = "unknown"
+            elif key in self.voice_cache:
+                states[key] = "cached"
+            else:
+                self.voice_cache.prefetch(key)
+                states[key] = "loading"
+        return states
+
     def _prepare_inputs(self, text: str, prefilled_outputs: object):
         if not self.processor or not self.model:
             raise RuntimeError("StreamingTTSService not initialized")
@@ -204,7 +411,7 @@ class StreamingTTSService:
     def _run_generation(
         self,
         inputs,
-        audio_streamer: AudioStreamer,
+        audio_streamer: RingBufferAudioStreamer,
         errors,
         cfg_scale: float,
         do_sample: bool,
@@ -213,9 +420,23 @@ class StreamingTTSService:
         refresh_negative: bool,
         prefilled_outputs,
         stop_event: threading.Event,
+        metric_labels: Dict[str, object],
+        inference_steps: int,
+        seed: Optional[int] = None,
     ) -> None:
+        if self.stage_timer is not None:
+            self.stage_timer.bind(**metric_labels)
+        stopped = []
+
+        def stop_check() -> bool:
+            if stop_event.is_set():
+                stopped.append(True)
+                return True
+            return False
+
+        reason = "eos"
         try:
-            self.model.generate(
+            outputs = self.model.generate(
                 **inputs,
                 max_new_tokens=None,
                 cfg_scale=cfg_scale,
@@ -226,40 +447,62 @@ class StreamingTTSService:
                     "top_p": top_p if do_sample else 1.0,
                 },
                 audio_streamer=audio_streamer,
-                stop_check_fn=stop_event.is_set,
+                stop_check_fn=stop_check,
                 verbose=False,
                 refresh_negative=refresh_negative,
-                all_prefilled_outputs=copy.deepcopy(prefilled_outputs),
+                all_prefilled_outputs=clone_prefilled_outputs(prefilled_outputs),
+                seed=seed,
+                inference_steps=inference_steps,
+                acoustic_decoder=self.acoustic_decoder,
             )
+            if stopped:
+                reason = "stopped"
+            elif outputs.reach_max_step_sample is not None and outputs.reach_max_step_sample.any():
+                reason = "max_length"
         except Exception as exc:  # pragma: no cover - diagnostic logging
+            reason = "error"
+            ERRORS.inc(kind="generation")
             errors.append(exc)
             traceback.print_exc()
             audio_streamer.end()
+        finally:
+            GENERATIONS.inc(reason=reason)
 
-    def stream(
-        self,
-        text: str,
-        cfg_scale: float = 1.5,
-        do_sample: bool = False,
-        temperature: float = 0.9,
-        top_p: float = 0.9,
-        refresh_negative: bool = True,
-        inference_steps: Optional[int] = None,
-        voice_key: Optional[str] = None,
-        log_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
-        stop_event: Optional[threading.Event] = None,
-    ) -> Iterator[np.ndarray]:
-        if not text.strip():
-            return
-        text = text.replace("’", "'")
-        selected_voice, prefilled_outputs = self._get_voice_resources(voice_key)
-
+    @staticmethod
+    def _make_emitter(log_callback: Optional[Callable[[str, Dict[str, Any]], None]]) -> Callable[..., None]:
         def emit(event: str, **payload: Any) -> None:
             if log_callback:
                 try:
                     log_callback(event, **payload)
                 except Exception as exc:
                     print(f"[log_callback] Error while emitting {event}: {exc}")
+        return emit
+
+    def _start_generation(
+        self,
+        text: str,
+        cfg_scale: float,
+        do_sample: bool,
+        temperature: float,
+        top_p: float,
+        refresh_negative: bool,
+        inference_steps: Optional[int],
+        voice_key: Optional[str],
+        stop_signal: threading.Event,
+        seed: Optional[int],
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        prefilled_outputs: Optional[object] = None,
+    ) -> Tuple[RingBufferAudioStreamer, threading.Thread, list, Dict[str, object]]:
+        """
+        Start `generate` on a worker thread; chunks are published to `loop` when given. Also returns the
+        metric labels of the session. With `prefilled_outputs`, `voice_key` must be the resolved key of that
+        preset and nothing is loaded here.
+        """
+        text = text.replace("’", "'")
+        if prefilled_outputs is None:
+            selected_voice, prefilled_outputs = self._get_voice_resources(voice_key)
+        else:
+            selected_voice = voice_key
 
         steps_to_use = self.inference_steps
         if inference_steps is not None:
@@ -269,14 +512,20 @@ class StreamingTTSService:
                     steps_to_use = parsed_steps
             except (TypeError, ValueError):
                 pass
-        if self.model:
-            self.model.set_ddpm_inference_steps(num_steps=steps_to_use)
-        self.inference_steps = steps_to_use
+        # Passed to this generation only: the model is shared by concurrent sessions
+        metric_labels = {"voice": selected_voice, "steps": steps_to_use, "cfg": f"{cfg_scale:g}"}
 
         inputs = self._prepare_inputs(text, prefilled_outputs)
-        audio_streamer = AudioStreamer(batch_size=1, stop_signal=None, timeout=None)
+        audio_streamer = RingBufferAudioStreamer(
+            batch_size=1,
+            capacity=int(self.max_buffer_sec * self.sample_rate),
+            stop_signal=None,
+            timeout=None,
+            loop=loop,
+            max_frame_samples=int(self.max_frame_sec * self.sample_rate),
+            sample_rate=self.sample_rate,
+        )
         errors: list = []
-        stop_signal = stop_event or threading.Event()
 
         thread = threading.Thread(
             target=self._run_generation,
@@ -291,98 +540,127 @@ class StreamingTTSService:
                 "refresh_negative": refresh_negative,
                 "prefilled_outputs": prefilled_outputs,
                 "stop_event": stop_signal,
+                "metric_labels": metric_labels,
+                "inference_steps": steps_to_use,
+                "seed": seed,
             },
             daemon=True,
         )
         thread.start()
+        return audio_streamer, thread, errors, metric_labels
 
-        generated_samples = 0
+    @staticmethod
+    def _normalize_chunk(audio_chunk: np.ndarray) -> np.ndarray:
+        """Peak-normalize a 1-D float32 view into the streamer's ring buffer, in place."""
+        peak = max(float(audio_chunk.max()), -float(audio_chunk.min())) if audio_chunk.size else 0.0
+        if peak > 1.0:
+            np.divide(audio_chunk, peak, out=audio_chunk)
+        return audio_chunk
 
-        try:
-            stream = audio_streamer.get_stream(0)
-            for audio_chunk in stream:
-                if torch.is_tensor(audio_chunk):
-                    audio_chunk = audio_chunk.detach().cpu().to(torch.float32).numpy()
-                else:
-                    audio_chunk = np.asarray(audio_chunk, dtype=np.float32)
+    def stream(
+        self,
+        text: str,
+        cfg_scale: float = 1.5,
+        do_sample: bool = False,
+        temperature: float = 0.9,
+        top_p: float = 0.9,
+        refresh_negative: bool = True,
+        inference_steps: Optional[int] = None,
+        voice_key: Optional[str] = None,
+        log_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        stop_event: Optional[threading.Event] = None,
+        seed: Optional[int] = None,
+    ) -> Iterator[np.ndarray]:
+        if not text.strip():
+            return
+        emit = self._make_emitter(log_callback)
+        stop_signal = stop_event or threading.Event()
+        started = time.perf_counter()
+        audio_streamer, thread, errors, metric_labels = self._start_generation(
+            text, cfg_scale, do_sample, temperature, top_p, refresh_negative,
+            inference_steps, voice_key, stop_signal, seed,
+        )
 
-                if audio_chunk.ndim > 1:
-                    audio_chunk = audio_chunk.reshape(-1)
+        pipeline = _OutputPipeline(self, audio_streamer, emit, metric_labels, started)
 
-                peak = np.max(np.abs(audio_chunk)) if audio_chunk.size else 0.0
-                if peak > 1.0:
-                    audio_chunk = audio_chunk / peak
+        try:
+            for audio_chunk in audio_streamer.get_stream(0):
+                audio_chunk = pipeline.process(audio_chunk)
+                if audio_chunk.size:
+                    # Valid until the next chunk is requested, consumers that keep it must copy
+                    yield audio_chunk
+            tail = pipeline.finish()
+            if tail.size:
+                yield tail
+        finally:
+            stop_signal.set()
+            audio_streamer.end()
+            thread.join()
+            pipeline.close()
+            if errors:
+                emit("generation_error", message=str(errors[0]))
+                raise errors[0]
 
-                generated_samples += int(audio_chunk.size)
-                emit(
-                    "model_progress",
-                    generated_sec=generated_samples / self.sample_rate,
-                    chunk_sec=audio_chunk.size / self.sample_rate,
-                )
+    async def astream(
+        self,
+        text: str,
+        cfg_scale: float = 1.5,
+        do_sample: bool = False,
+        temperature: float = 0.9,
+        top_p: float = 0.9,
+        refresh_negative: bool = True,
+        inference_steps: Optional[int] = None,
+        voice_key: Optional[str] = None,
+        log_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        stop_event: Optional[threading.Event] = None,
+        seed: Optional[int] = None,
+    ) -> AsyncIterator[np.ndarray]:
+        """Async variant of `stream`: chunks are awaited on the event loop, without an executor hop per chunk."""
+        if not text.strip():
+            return
+        emit = self._make_emitter(log_callback)
+        stop_signal = stop_event or threading.Event()
+        started = time.perf_counter()
+        voice_key = self._resolve_voice_key(voice_key)
+        # Taken out of the cache before starting, so an eviction in between cannot make the start load it here
+        prefilled_outputs = self.voice_cache.get_cached(voice_key)
+        if prefilled_outputs is None:
+            # The voice has to be loaded first, off the event loop
+            prefilled_outputs = await asyncio.to_thread(self._ensure_voice_cached, voice_key)
+        audio_streamer, thread, errors, metric_labels = self._start_generation(
+            text, cfg_scale, do_sample, temperature, top_p, refresh_negative,
+            inference_steps, voice_key, stop_signal, seed, loop=asyncio.get_running_loop(),
+            prefilled_outputs=prefilled_outputs,
+        )
 
-                chunk_to_yield = audio_chunk.astype(np.float32, copy=False)
+        pipeline = _OutputPipeline(self, audio_streamer, emit, metric_labels, started)
 
-                yield chunk_to_yield
+        try:
+            async for audio_chunk in audio_streamer.get_async_stream(0):
+                audio_chunk = pipeline.process(audio_chunk)
+                if audio_chunk.size:
+                    # Valid until the next chunk is requested, consumers that keep it must copy
+                    yield audio_chunk
+            tail = pipeline.finish()
+            if tail.size:
+                yield tail
         finally:
             stop_signal.set()
             audio_streamer.end()
-            thread.join()
+            # One executor hop per session, to not block the loop while generation winds down
+            await asyncio.to_thread(thread.join)
+            pipeline.close()
             if errors:
                 emit("generation_error", message=str(errors[0]))
                 raise errors[0]
 
     def chunk_to_pcm16(self, chunk: np.ndarray) -> bytes:
-        chunk = np.clip(chunk, -1.0, 1.0)
-        pcm = (chunk * 32767.0).astype(np.int16)
-        return pcm.tobytes()
+        return PCM16Encoder(self.sample_rate).encode(chunk)
 
 
 app = FastAPI()
 
 
-class ModelAudioTrack(MediaStreamTrack):
-    kind = "audio"
-
-    def __init__(self, sample_rate: int, generator: Iterator[np.ndarray]):
-        super().__init__()
-        self.sample_rate = sample_rate
-        self.generator = generator
-        self.queue = ThreadQueue()
-        self._stopped = False
-        self._thread = threading.Thread(target=self._generator_thread, daemon=True)
-        self._thread.start()
-
-    def _generator_thread(self):
-        try:
-            for chunk in self.generator:
-                if chunk is None:
-                    break
-                # chunk is float32 numpy array
-                self.queue.put(chunk)
-                if self._stopped:
-                    break
-        except Exception as e:
-            # stop and put None to indicate end
-            try:
-                self.queue.put(None)
-            except Exception:
-                pass
-
-    async def recv(self):
-        # This will block until a chunk is available via self.queue
-        loop = asyncio.get_event_loop()
-        chunk = await loop.run_in_executor(None, self.queue.get)
-        if chunk is None:
-            raise asyncio.CancelledError()
-        # create av.AudioFrame from float32 mono
-        frame = AudioFrame.from_ndarray(chunk, format="flt", layout="mono")
-        frame.sample_rate = self.sample_rate
-        # small sleep to pace
-        await asyncio.sleep(len(chunk) / self.sample_rate)
-        return frame
-
-
-
 @app.on_event("startup")
 async def _startup() -> None:
     model_path = os.environ.get("MODEL_PATH")
@@ -390,29 +668,104 @@ async def _startup() -> None:
         raise RuntimeError("MODEL_PATH not set in environment")
 
     device = os.environ.get("MODEL_DEVICE", "cuda")
+    compile_model = os.environ.get("MODEL_COMPILE", "0") == "1"
+    optimize_model = os.environ.get("MODEL_OPTIMIZE", "0") == "1"
+    batched_decoder = os.environ.get("MODEL_BATCHED_DECODER", "0") == "1"
+    cpu_dtype = os.environ.get("MODEL_CPU_DTYPE", "float32")
+    quantize_components = [name for name in os.environ.get("MODEL_QUANTIZE", "").split(",") if name]
+    max_buffer_sec = float(os.environ.get("MODEL_MAX_BUFFER_SEC", "10"))
+    max_frame_sec = float(os.environ.get("MODEL_MAX_FRAME_SEC", "1"))
+    trim_silence = os.environ.get("MODEL_TRIM_SILENCE", "0") == "1"
+    silence_threshold_db = float(os.environ.get("MODEL_SILENCE_THRESHOLD_DB", "-50"))
+    shared_weights_path = os.environ.get("MODEL_SHARED_WEIGHTS") or None
+    stage_metrics = os.environ.get("MODEL_STAGE_METRICS", "0") == "1"
+    voice_cache_mb = float(os.environ.get("MODEL_VOICE_CACHE_MB", "1024"))
+    pinned_voices = [name for name in os.environ.get("MODEL_PINNED_VOICES", "").split(",") if name]
+
+    # Set by multiworker.py: the cores of this worker and its intra-op thread count
+    cpu_set = os.environ.get("MODEL_CPU_SET")
+    if cpu_set and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {int(core) for core in cpu_set.split(",")})
+    num_threads = os.environ.get("MODEL_NUM_THREADS")
+    if num_threads:
+        torch.set_num_threads(int(num_threads))
     
     service = StreamingTTSService(
         model_path=model_path,
-        device=device
+        device=device,
+        compile_model=compile_model,
+        optimize_model=optimize_model,
+        batched_decoder=batched_decoder,
+        cpu_dtype=cpu_dtype,
+        quantize_components=quantize_components,
+        max_buffer_sec=max_buffer_sec,
+        max_frame_sec=max_frame_sec,
+        trim_silence=trim_silence,
+        silence_threshold_db=silence_threshold_db,
+        shared_weights_path=shared_weights_path,
+        stage_metrics=stage_metrics,
+        voice_cache_mb=voice_cache_mb,
+        pinned_voices=pinned_voices,
     )
     service.load()
 
     app.state.tts_service = service
     app.state.model_path = model_path
     app.state.device = device
-    app.state.websocket_lock = asyncio.Lock()
+    app.state.admission = AdmissionController(
+        capacity=int(os.environ.get("MODEL_MAX_SESSIONS", "1")),
+        max_queue=int(os.environ.get("MODEL_MAX_QUEUE", "16")),
+        max_wait_sec=float(os.environ.get("MODEL_MAX_WAIT_SEC", "30")),
+        class_limits={
+            name: int(limit)
+            for name, limit in (item.split("=") for item in os.environ.get("MODEL_CLASS_LIMITS", "").split(",") if item)
+        },
+    )
+    app.state.webrtc_tracks = set()
+    app.state.webrtc_prebuffer_ms = int(os.environ.get("MODEL_WEBRTC_PREBUFFER_MS", "200"))
+    _register_state_metrics(service, app.state.admission, app.state.webrtc_tracks)
     print("[startup] Model ready.")
 
 
-def streaming_tts(text: str, **kwargs) -> Iterator[np.ndarray]:
+def _register_state_metrics(service: StreamingTTSService, admission: AdmissionController, webrtc_tracks: set) -> None:
+    """Gauges read from the server state when `/metrics` is scraped."""
+    REGISTRY.callback("vibevoice_active_sessions", "Sessions holding a generation slot.", lambda: admission.num_active)
+    REGISTRY.callback(
+        "vibevoice_queue_depth", "Sessions waiting for a generation slot.",
+        lambda: admission.stats()["queued"], labelnames=("priority",),
+    )
+    REGISTRY.callback(
+        "vibevoice_admissions_total", "Admission decisions by outcome.",
+        lambda: dict(admission.counters), kind="counter", labelnames=("outcome",),
+    )
+    REGISTRY.callback(
+        "vibevoice_webrtc_sessions", "Live WebRTC audio tracks.",
+        lambda: sum(1 for track in list(webrtc_tracks) if track.readyState == "live"),
+    )
+    cache = service.voice_cache
+    REGISTRY.callback("vibevoice_voice_cache_entries", "Voice presets held in memory.", lambda: cache.stats()["entries"])
+    REGISTRY.callback("vibevoice_voice_cache_bytes", "Bytes of the voice presets held in memory.", lambda: cache.nbytes)
+    REGISTRY.callback("vibevoice_voice_cache_budget_bytes", "Byte budget of the voice preset cache.", lambda: cache.budget_bytes)
+    REGISTRY.callback(
+        "vibevoice_voice_cache_evictions_total", "Voice presets evicted to stay within the budget.",
+        lambda: cache.counters["evictions"], kind="counter",
+    )
+    REGISTRY.callback("vibevoice_voice_cache_hit_ratio", "Share of voice preset lookups served from memory.", cache.hit_rate)
+
+
+async def streaming_tts(text: str, **kwargs) -> AsyncIterator[np.ndarray]:
     service: StreamingTTSService = app.state.tts_service
-    yield from service.stream(text, **kwargs)
+    async for chunk in service.astream(text, **kwargs):
+        yield chunk
 
 @app.websocket("/stream")
 async def websocket_stream(ws: WebSocket) -> None:
     await ws.accept()
     text = ws.query_params.get("text", "")
-    # If text not in query params, read an initial message with JSON { type:'start', text, sequence, cfg, steps }
+    codec_param = ws.query_params.get("codec")
+    rate_param = ws.query_params.get("sample_rate")
+    priority_param = ws.query_params.get("priority")
+    # If text not in query params, read an initial message with JSON { type:'start', text, sequence, cfg, steps, codec, sample_rate }
     if not text:
         try:
             recv = await ws.receive_text()
@@ -427,6 +780,12 @@ async def websocket_stream(ws: WebSocket) -> None:
                         steps_param = str(payload.get("steps"))
                     if payload.get("voice") is not None:
                         voice_param = payload.get("voice")
+                    if payload.get("codec") is not None:
+                        codec_param = str(payload.get("codec"))
+                    if payload.get("sample_rate") is not None:
+                        rate_param = str(payload.get("sample_rate"))
+                    if payload.get("priority") is not None:
+                        priority_param = str(payload.get("priority"))
             except Exception:
                 text = recv
         except Exception:
@@ -450,28 +809,58 @@ async def websocket_stream(ws: WebSocket) -> None:
         inference_steps = None
 
     service: StreamingTTSService = app.state.tts_service
-    lock: asyncio.Lock = app.state.websocket_lock
+    admission: AdmissionController = app.state.admission
+
+    try:
+        output_rate = int(rate_param) if rate_param is not None else service.sample_rate
+        if not MIN_OUTPUT_SAMPLE_RATE <= output_rate <= MAX_OUTPUT_SAMPLE_RATE:
+            raise ValueError(f"sample_rate must be between {MIN_OUTPUT_SAMPLE_RATE} and {MAX_OUTPUT_SAMPLE_RATE} Hz")
+        resampler = StreamingResampler(service.sample_rate, output_rate)
+        encoder = create_encoder(codec_param, output_rate)
+    except ValueError as exc:
+        ERRORS.inc(kind="bad_request")
+        try:
+            await ws.send_text(json.dumps({
+                "type": "log",
+                "event": "backend_error",
+                "data": {"message": str(exc)},
+                "timestamp": get_timestamp(),
+            }))
+        except Exception:
+            pass
+        await ws.close(code=1003, reason="Unsupported output format")
+        return
 
-    if lock.locked():
+    async def send_queue_position(position: int, estimated_start_sec: float) -> None:
+        await ws.send_text(json.dumps({
+            "type": "log",
+            "event": "backend_queued",
+            "data": {"position": position, "estimated_start_sec": round(estimated_start_sec, 1)},
+            "timestamp": get_timestamp(),
+        }))
+
+    try:
+        slot = await admission.acquire(priority_param or "normal", on_update=send_queue_position)
+    except (AdmissionRejected, ValueError) as exc:
         busy_message = {
             "type": "log",
             "event": "backend_busy",
-            "data": {"message": "Please wait for the other requests to complete."},
+            "data": {"message": str(exc), "reason": getattr(exc, "reason", "invalid_priority")},
             "timestamp": get_timestamp(),
         }
-        print("Please wait for the other requests to complete.")
+        print(f"Session not admitted: {exc}")
         try:
             await ws.send_text(json.dumps(busy_message))
         except Exception:
             pass
-        await ws.close(code=1013, reason="Service busy")
+        await ws.close(code=1013 if isinstance(exc, AdmissionRejected) else 1003, reason="Service busy")
+        return
+    except Exception as exc:
+        # The position update could not be sent, the client left while queued
+        print(f"Client left while queued: {exc!r}")
         return
 
-    acquired = False
     try:
-        await lock.acquire()
-        acquired = True
-
         log_queue: "Queue[Dict[str, Any]]" = Queue()
 
         def enqueue_log(event: str, **data: Any) -> None:
@@ -501,6 +890,17 @@ async def websocket_stream(ws: WebSocket) -> None:
             inference_steps=inference_steps,
             voice=voice_param,
         )
+        if slot.waited_sec:
+            enqueue_log("backend_admitted", waited_sec=slot.waited_sec)
+        # Rate of the encoded stream: codecs with a fixed rate of their own (mulaw, opus, mp3) ignore `output_rate`
+        stream_rate = getattr(encoder, "codec_rate", encoder.sample_rate)
+        enqueue_log("backend_codec", codec=encoder.name, content_type=encoder.content_type, sample_rate=stream_rate)
+
+        def encode(chunk: np.ndarray) -> bytes:
+            return encoder.encode(resampler.process(chunk))
+
+        def finish() -> bytes:
+            return encoder.encode(resampler.flush()) + encoder.flush()
 
         stop_signal = threading.Event()
 
@@ -512,9 +912,9 @@ async def websocket_stream(ws: WebSocket) -> None:
             seq = None
 
         if seq and isinstance(seq, list) and len(seq) > 0:
-            def seq_iter():
+            async def seq_iter():
                 for phrase in seq:
-                    for ch in service.stream(phrase, cfg_scale=cfg_scale, inference_steps=inference_steps, voice_key=voice_param, log_callback=enqueue_log, stop_event=stop_signal):
+                    async for ch in service.astream(phrase, cfg_scale=cfg_scale, inference_steps=inference_steps, voice_key=voice_param, log_callback=enqueue_log, stop_event=stop_signal):
                         yield ch
             iterator = seq_iter()
         else:
@@ -526,24 +926,34 @@ async def websocket_stream(ws: WebSocket) -> None:
             log_callback=enqueue_log,
             stop_event=stop_signal,
         )
-        sentinel = object()
         first_ws_send_logged = False
 
         await flush_logs()
 
         try:
-            while ws.client_state == WebSocketState.CONNECTED:
-                await flush_logs()
-                chunk = await asyncio.to_thread(next, iterator, sentinel)
-                if chunk is sentinel:
+            async for chunk in iterator:
+                if ws.client_state != WebSocketState.CONNECTED:
                     break
-                chunk = cast(np.ndarray, chunk)
-                payload = service.chunk_to_pcm16(chunk)
+                await flush_logs()
+                # Compressed codecs encode in a worker thread; the chunk view stays valid until the next one is requested
+                if encoder.offload:
+                    payload = await asyncio.to_thread(encode, chunk)
+                else:
+                    payload = encode(chunk)
+                if not payload:
+                    # The codec is still filling a frame
+                    continue
                 await ws.send_bytes(payload)
+                BYTES_SENT.inc(len(payload), transport="websocket", codec=encoder.name)
                 if not first_ws_send_logged:
                     first_ws_send_logged = True
                     enqueue_log("backend_first_chunk_sent")
                 await flush_logs()
+            else:
+                payload = await asyncio.to_thread(finish) if encoder.offload else finish()
+                if payload and ws.client_state == WebSocketState.CONNECTED:
+                    await ws.send_bytes(payload)
+                    BYTES_SENT.inc(len(payload), transport="websocket", codec=encoder.name)
         except WebSocketDisconnect:
             print("Client disconnected (WebSocketDisconnect)")
             enqueue_log("client_disconnected")
@@ -553,9 +963,7 @@ async def websocket_stream(ws: WebSocket) -> None:
             enqueue_log("backend_stream_complete")
             await flush_logs()
             try:
-                iterator_close = getattr(iterator, "close", None)
-                if callable(iterator_close):
-                    iterator_close()
+                await iterator.aclose()
             except Exception:
                 pass
             # clear the log queue
@@ -568,8 +976,7 @@ async def websocket_stream(ws: WebSocket) -> None:
                 await ws.close()
             print("WS handler exit")
     finally:
-        if acquired:
-            lock.release()
+        slot.release()
 
 
 @app.get("/")
@@ -577,6 +984,44 @@ def index():
     return FileResponse(BASE / "index.html")
 
 
+@app.get("/load")
+def get_load():
+    """Sessions served by this process, polled by the multi-worker front to pick the least loaded worker."""
+    tracks = app.state.webrtc_tracks
+    tracks.difference_update([track for track in tracks if track.readyState != "live"])
+    admission: AdmissionController = app.state.admission
+    return {
+        "pid": os.getpid(),
+        "webrtc_sessions": len(tracks),
+        "active_sessions": admission.num_active,
+        "admission": admission.stats(),
+        "voice_cache": app.state.tts_service.voice_cache.stats(),
+        "num_threads": torch.get_num_threads(),
+    }
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus scrape endpoint (a sync handler, so the rendering runs in the threadpool)."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.post("/prefetch")
+async def prefetch(request: Request):
+    """Load voices expected to be requested soon (e.g. selected in the page) in the background."""
+    try:
+        data = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "Body must be a JSON object"}, status_code=400)
+    if not isinstance(data, dict):
+        return JSONResponse({"error": "Body must be a JSON object"}, status_code=400)
+    voices = data.get("voices") or ([data["voice"]] if data.get("voice") else [])
+    if not isinstance(voices, list):
+        return JSONResponse({"error": "voices must be a list"}, status_code=400)
+    service: StreamingTTSService = app.state.tts_service
+    return {"voices": service.prefetch_voices([str(voice) for voice in voices])}
+
+
 @app.get("/config")
 def get_config():
     service: StreamingTTSService = app.state.tts_service
@@ -584,6 +1029,7 @@ def get_config():
     return {
         "voices": voices,
         "default_voice": service.default_voice_key,
+        "codecs": {name: encoder.content_type for name, encoder in ENCODERS.items()},
     }
 
 
@@ -603,23 +1049,45 @@ async def offer(request: Request):
         return {"error": "Invalid offer"}
 
     service: StreamingTTSService = app.state.tts_service
-    # Create generator from service.stream or from sequence
+    # An offer cannot wait in the queue, it is admitted now or rejected
+    try:
+        slot = app.state.admission.try_acquire(data.get('priority') or "normal")
+    except (AdmissionRejected, ValueError) as exc:
+        return JSONResponse({"error": str(exc), "reason": getattr(exc, "reason", "invalid_priority")}, status_code=503)
+
+    # Create generator from service.astream or from sequence
     if sequence and isinstance(sequence, list) and len(sequence) > 0:
-        def seq_iter():
+        async def seq_iter():
             for phrase in sequence:
-                for ch in service.stream(phrase, cfg_scale=cfg, inference_steps=steps, voice_key=voice, log_callback=None, stop_event=None):
+                async for ch in service.astream(phrase, cfg_scale=cfg, inference_steps=steps, voice_key=voice, log_callback=None, stop_event=None):
                     yield ch
         generator = seq_iter()
     else:
-        generator = service.stream(text, cfg_scale=cfg, inference_steps=steps, voice_key=voice)
+        generator = service.astream(text, cfg_scale=cfg, inference_steps=steps, voice_key=voice)
 
     pc = RTCPeerConnection()
-    track = ModelAudioTrack(sample_rate=SAMPLE_RATE, generator=generator)
+    track = PacedAudioTrack(
+        generator, sample_rate=SAMPLE_RATE, prebuffer_ms=app.state.webrtc_prebuffer_ms, on_stop=slot.release,
+    )
     pc.addTrack(track)
+    app.state.webrtc_tracks.add(track)
+
+    @pc.on("connectionstatechange")
+    async def on_connectionstatechange():
+        # A peer that never connects or goes away must not keep its slot
+        if pc.connectionState in ("failed", "closed"):
+            track.stop()
+            await pc.close()
 
-    await pc.setRemoteDescription(RTCSessionDescription(offer_sdp, offer_type))
-    answer = await pc.createAnswer()
-    await pc.setLocalDescription(answer)
+    try:
+        await pc.setRemoteDescription(RTCSessionDescription(offer_sdp, offer_type))
+        answer = await pc.createAnswer()
+        await pc.setLocalDescription(answer)
+    except Exception:
+        ERRORS.inc(kind="webrtc")
+        track.stop()
+        await pc.close()
+        raise
     # Configure Opus max bitrate where supported to improve quality
     try:
         for sender in pc.getSenders():
@@ -0,0 +1,202 @@
+"""
+Output encoders for streamed audio.
+
+Every encoder is stateful and owned by one stream: `encode` takes float32 mono chunks in [-1, 1] at the
+model sample rate and returns the bytes ready to send (possibly empty while a codec frame is being
+filled), `flush` returns what is left at the end of the stream. Compressed codecs re-frame the audio to
+their frame size and are built on PyAV (`av`), which is already required for WebRTC.
+"""
+import fractions
+import io
+import struct
+from typing import Dict, List, Optional, Type
+
+import av
+import numpy as np
+
+
+class AudioEncoder:
+    """Base class of the output encoders."""
+
+    name = ""
+    content_type = "application/octet-stream"
+    # Whether encoding is expensive enough to run in a worker thread rather than on the event loop
+    offload = False
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+
+    def encode(self, chunk: np.ndarray) -> bytes:
+        raise NotImplementedError
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class PCM16Encoder(AudioEncoder):
+    """Raw little-endian 16-bit PCM at the model sample rate (the historical WebSocket format)."""
+
+    name = "pcm16"
+    content_type = "audio/L16"
+
+    def encode(self, chunk: np.ndarray) -> bytes:
+        chunk = np.clip(chunk, -1.0, 1.0)
+        return (chunk * 32767.0).astype("<i2").tobytes()
+
+
+class _AvEncoder(AudioEncoder):
+    """
+    Codec context fed through a resampler and a FIFO, so every encoded frame has the codec frame size.
+
+    Packets are returned as produced by the codec; subclasses can wrap them (`_format_packets`).
+    """
+
+    codec_name = ""
+    codec_rate = 48000
+    codec_format = "s16"
+    default_bit_rate: Optional[int] = None
+
+    def __init__(self, sample_rate: int, bit_rate: Optional[int] = None):
+        super().__init__(sample_rate)
+        self.codec = self._open_codec(bit_rate or self.default_bit_rate)
+        # PCM codecs report no frame size, any frame length is valid for them
+        self.frame_size = self.codec.frame_size or int(0.02 * self.codec_rate)
+        self.resampler = av.AudioResampler(format=self.codec_format, layout="mono", rate=self.codec_rate)
+        self.fifo = av.AudioFifo()
+        self._pts = 0
+
+    def _configure(self, codec, bit_rate: Optional[int]):
+        codec.sample_rate = self.codec_rate
+        codec.layout = "mono"
+        codec.format = self.codec_format
+        codec.time_base = fractions.Fraction(1, self.codec_rate)
+        if bit_rate:
+            codec.bit_rate = bit_rate
+        codec.open()
+        return codec
+
+    def _open_codec(self, bit_rate: Optional[int]):
+        return self._configure(av.CodecContext.create(self.codec_name, "w"), bit_rate)
+
+    def _encode_frame(self, frame: Optional[av.AudioFrame]) -> List[av.Packet]:
+        if frame is not None:
+            frame.pts = self._pts
+            frame.time_base = self.codec.time_base
+            self._pts += frame.samples
+        return self.codec.encode(frame)
+
+    def _format_packets(self, packets: List[av.Packet]) -> bytes:
+        return b"".join(bytes(packet) for packet in packets)
+
+    def encode(self, chunk: np.ndarray) -> bytes:
+        frame = av.AudioFrame.from_ndarray(
+            np.ascontiguousarray(chunk, dtype=np.float32).reshape(1, -1), format="flt", layout="mono"
+        )
+        frame.sample_rate = self.sample_rate
+        for resampled in self.resampler.resample(frame):
+            self.fifo.write(resampled)
+        packets = []
+        while self.fifo.samples >= self.frame_size:
+            packets.extend(self._encode_frame(self.fifo.read(self.frame_size)))
+        return self._format_packets(packets)
+
+    def flush(self) -> bytes:
+        packets = []
+        for resampled in self.resampler.resample(None):
+            self.fifo.write(resampled)
+        if self.fifo.samples:
+            # The last frame is padded with silence up to the codec frame size
+            tail = self.fifo.read()
+            padded = np.zeros((1, self.frame_size), dtype=tail.to_ndarray().dtype)
+            padded[:, :tail.samples] = tail.to_ndarray().reshape(1, -1)
+            frame = av.AudioFrame.from_ndarray(padded, format=self.codec_format, layout="mono")
+            frame.sample_rate = self.codec_rate
+            packets.extend(self._encode_frame(frame))
+        packets.extend(self._encode_frame(None))
+        return self._format_packets(packets)
+
+
+class MulawEncoder(_AvEncoder):
+    """G.711 mu-law at 8 kHz (telephony), one byte per sample."""
+
+    name = "mulaw"
+    content_type = "audio/basic"
+    codec_name = "pcm_mulaw"
+    codec_rate = 8000
+
+
+class MP3Encoder(_AvEncoder):
+    """MP3 (LAME); the stream is self-framing, so chunks can be concatenated or played as they arrive."""
+
+    name = "mp3"
+    content_type = "audio/mpeg"
+    offload = True
+    codec_name = "libmp3lame"
+    codec_rate = 24000
+    codec_format = "s16p"
+    default_bit_rate = 48000
+
+
+class OpusEncoder(_AvEncoder):
+    """
+    Raw Opus packets of 20 ms at 48 kHz, each prefixed by its length as a big-endian uint16, so a client
+    can split the byte stream and feed the packets to a WebCodecs / libopus decoder.
+    """
+
+    name = "opus"
+    content_type = "audio/opus"
+    offload = True
+    codec_name = "libopus"
+    default_bit_rate = 32000
+
+    def _format_packets(self, packets: List[av.Packet]) -> bytes:
+        return b"".join(struct.pack(">H", packet.size) + bytes(packet) for packet in packets)
+
+
+class OggOpusEncoder(OpusEncoder):
+    """Opus in an Ogg stream, playable by browsers through MediaSource or a plain <audio> element."""
+
+    name = "ogg_opus"
+    content_type = "audio/ogg; codecs=opus"
+
+    def _open_codec(self, bit_rate: Optional[int]):
+        self._buffer = io.BytesIO()
+        self.container = av.open(
+            self._buffer,
+            mode="w",
+            format="ogg",
+            # One Ogg page per packet and no I/O buffering, so the bytes leave with their packet
+            container_options={"page_duration": "20000", "flush_packets": "1"},
+        )
+        self.stream = self.container.add_stream(self.codec_name, rate=self.codec_rate)
+        # Encoding through the stream's codec context gives the muxer the matching OpusHead
+        return self._configure(self.stream.codec_context, bit_rate)
+
+    def _format_packets(self, packets: List[av.Packet]) -> bytes:
+        for packet in packets:
+            packet.stream = self.stream
+            self.container.mux(packet)
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def flush(self) -> bytes:
+        data = super().flush()
+        self.container.close()
+        return data + self._buffer.getvalue()
+
+
+ENCODERS: Dict[str, Type[AudioEncoder]] = {
+    encoder.name: encoder for encoder in (PCM16Encoder, OpusEncoder, OggOpusEncoder, MP3Encoder, MulawEncoder)
+}
+
+
+def create_encoder(name: Optional[str], sample_rate: int, bit_rate: Optional[int] = None) -> AudioEncoder:
+    """Encoder registered under `name` (default: pcm16)."""
+    encoder_cls = ENCODERS.get((name or PCM16Encoder.name).lower())
+    if encoder_cls is None:
+        raise ValueError(f"Unknown codec {name!r}, expected one of {sorted(ENCODERS)}")
+    if encoder_cls is PCM16Encoder:
+        return encoder_cls(sample_rate)
+    return encoder_cls(sample_rate, bit_rate=bit_rate)
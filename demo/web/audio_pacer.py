@@ -0,0 +1,241 @@
+"""
+Clock-driven audio track for WebRTC.
+
+`PacedAudioTrack` pulls float32 chunks of any size from an async iterator, re-frames them into fixed
+20 ms frames stamped with a sample-counter pts, and hands them to aiortc against a wall-clock deadline,
+after holding a prebuffer. Run this module to check the pacing over a local loopback peer connection:
+
+    python -m demo.web.audio_pacer --seconds 5
+"""
+import argparse
+import asyncio
+import fractions
+import math
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, Optional
+
+import numpy as np
+from aiortc import MediaStreamTrack, RTCPeerConnection
+from aiortc.mediastreams import MediaStreamError
+from av import AudioFrame
+
+
+class _SampleFifo:
+    """Float32 sample queue fed with arrays of any length and read in exact counts."""
+
+    def __init__(self):
+        self._chunks = deque()
+        self.samples = 0
+
+    def write(self, chunk: np.ndarray):
+        if chunk.size:
+            self._chunks.append(chunk)
+            self.samples += chunk.size
+
+    def read(self, count: int) -> np.ndarray:
+        """Up to `count` samples, oldest first."""
+        parts, needed = [], min(count, self.samples)
+        while needed:
+            head = self._chunks[0]
+            if head.size <= needed:
+                parts.append(self._chunks.popleft())
+            else:
+                parts.append(head[:needed])
+                self._chunks[0] = head[needed:]
+            needed -= parts[-1].size
+        read = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+        self.samples -= read.size
+        return read
+
+
+class PacedAudioTrack(MediaStreamTrack):
+    """
+    Mono audio track delivering fixed-size frames on a wall clock.
+
+    Frame `n` is due `n * frame_ms` after playout starts; playout starts once `prebuffer_ms` of audio is
+    queued (or the source ended). When a frame is due and not enough audio has arrived, the missing part is
+    filled with silence and counted as an underrun; frames handed out more than one frame period after
+    their deadline are counted as late. The source is read ahead by at most `max_buffer_ms`, so a bounded
+    producer upstream pauses instead of the track buffering the whole utterance.
+
+    Args:
+        source: Async iterator of float32 mono chunks in [-1, 1]. Chunks may be reused by the source after
+            the next one is requested, they are copied.
+        sample_rate: Sample rate of the source.
+        frame_ms: Frame duration handed to the encoder (20 ms is the Opus default).
+        prebuffer_ms: Audio held before playout starts.
+        max_buffer_ms: Read-ahead limit of the source.
+        on_stop: Called once when the track stops (end of the source, or the peer went away).
+    """
+
+    kind = "audio"
+
+    def __init__(
+        self,
+        source: AsyncIterator[np.ndarray],
+        sample_rate: int,
+        frame_ms: int = 20,
+        prebuffer_ms: int = 200,
+        max_buffer_ms: int = 2000,
+        on_stop: Optional[Callable[[], None]] = None,
+    ):
+        super().__init__()
+        self.source = source
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.prebuffer_samples = sample_rate * prebuffer_ms // 1000
+        self.max_buffer_samples = max(sample_rate * max_buffer_ms // 1000, self.prebuffer_samples + self.frame_samples)
+        self.time_base = fractions.Fraction(1, sample_rate)
+        self.on_stop = on_stop
+
+        self._fifo = _SampleFifo()
+        self._source_done = False
+        self._data_ready = asyncio.Event()
+        self._space_ready = asyncio.Event()
+        self._pump_task: Optional[asyncio.Task] = None
+        self._start: Optional[float] = None
+        self._pts = 0
+        self.stats: Dict[str, float] = {
+            "frames": 0,
+            "underruns": 0,
+            "late_frames": 0,
+            "max_late_ms": 0.0,
+            "prebuffer_wait_ms": 0.0,
+        }
+
+    async def _pump(self):
+        try:
+            async for chunk in self.source:
+                self._fifo.write(np.array(chunk, dtype=np.float32).reshape(-1))
+                self._data_ready.set()
+                while self._fifo.samples >= self.max_buffer_samples:
+                    self._space_ready.clear()
+                    await self._space_ready.wait()
+        finally:
+            self._source_done = True
+            self._data_ready.set()
+
+    async def _wait_for_prebuffer(self):
+        started = time.perf_counter()
+        while self._fifo.samples < self.prebuffer_samples and not self._source_done:
+            self._data_ready.clear()
+            await self._data_ready.wait()
+        self.stats["prebuffer_wait_ms"] = 1000.0 * (time.perf_counter() - started)
+
+    async def recv(self) -> AudioFrame:
+        if self.readyState != "live":
+            raise MediaStreamError
+        if self._pump_task is None:
+            self._pump_task = asyncio.ensure_future(self._pump())
+        if self._start is None:
+            await self._wait_for_prebuffer()
+            self._start = time.perf_counter()
+
+        lateness = time.perf_counter() - (self._start + self._pts / self.sample_rate)
+        if lateness < 0:
+            await asyncio.sleep(-lateness)
+        elif lateness > self.frame_samples / self.sample_rate:
+            self.stats["late_frames"] += 1
+            self.stats["max_late_ms"] = max(self.stats["max_late_ms"], 1000.0 * lateness)
+
+        samples = self._fifo.read(self.frame_samples)
+        self._space_ready.set()
+        if samples.size < self.frame_samples:
+            if self._source_done and not samples.size:
+                self.stop()
+                raise MediaStreamError
+            if not self._source_done:
+                self.stats["underruns"] += 1
+            samples = np.concatenate([samples, np.zeros(self.frame_samples - samples.size, dtype=np.float32)])
+
+        pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16).reshape(1, -1)
+        frame = AudioFrame.from_ndarray(pcm, format="s16", layout="mono")
+        frame.sample_rate = self.sample_rate
+        frame.pts = self._pts
+        frame.time_base = self.time_base
+        self._pts += self.frame_samples
+        self.stats["frames"] += 1
+        return frame
+
+    def stop(self):
+        if self.readyState == "live":
+            print(f"[pacer] {self.stats}")
+            if self.on_stop is not None:
+                self.on_stop()
+        super().stop()
+        if self._pump_task is not None and not self._pump_task.done():
+            # The cancellation is raised inside the source, which runs its own cleanup
+            self._pump_task.cancel()
+        elif self._pump_task is None:
+            aclose = getattr(self.source, "aclose", None)
+            if callable(aclose):
+                asyncio.ensure_future(aclose())
+
+
+async def _sine(sample_rate: int, seconds: float, chunk_samples: int = 3200, realtime_factor: float = 0.5):
+    """Stand-in for the model: 3200-sample chunks produced faster than real time, in bursts."""
+    phase = np.arange(chunk_samples) / sample_rate
+    for index in range(math.ceil(seconds * sample_rate / chunk_samples)):
+        await asyncio.sleep(realtime_factor * chunk_samples / sample_rate)
+        yield (0.3 * np.sin(2 * np.pi * 220.0 * (phase + index * chunk_samples / sample_rate))).astype(np.float32)
+
+
+async def loopback_check(seconds: float = 5.0, sample_rate: int = 24000, prebuffer_ms: int = 200) -> Dict[str, float]:
+    """
+    Stream a sine through `PacedAudioTrack` between two local peer connections.
+
+    Returns:
+        The pacer stats, plus the frames received by the remote peer and the spread of their arrival
+        times around the frame period.
+    """
+    sender, receiver = RTCPeerConnection(), RTCPeerConnection()
+    track = PacedAudioTrack(_sine(sample_rate, seconds), sample_rate, prebuffer_ms=prebuffer_ms)
+    sender.addTrack(track)
+    arrivals = []
+    done = asyncio.Event()
+
+    @receiver.on("track")
+    def on_track(remote):
+        async def consume():
+            try:
+                while True:
+                    await remote.recv()
+                    arrivals.append(time.perf_counter())
+            except MediaStreamError:
+                pass
+            finally:
+                done.set()
+        asyncio.ensure_future(consume())
+
+    await sender.setLocalDescription(await sender.createOffer())
+    await receiver.setRemoteDescription(sender.localDescription)
+    await receiver.setLocalDescription(await receiver.createAnswer())
+    await sender.setRemoteDescription(receiver.localDescription)
+
+    try:
+        await asyncio.wait_for(done.wait(), timeout=seconds + 10.0)
+    except asyncio.TimeoutError:
+        pass
+    await sender.close()
+    await receiver.close()
+
+    intervals = np.diff(arrivals) * 1000.0 if len(arrivals) > 1 else np.zeros(1)
+    return {
+        **track.stats,
+        "received_frames": len(arrivals),
+        "interval_mean_ms": float(intervals.mean()),
+        "interval_p99_ms": float(np.percentile(intervals, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check PacedAudioTrack over a local WebRTC loopback")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Audio streamed")
+    parser.add_argument("--prebuffer_ms", type=int, default=200)
+    args = parser.parse_args()
+    print(asyncio.run(loopback_check(args.seconds, prebuffer_ms=args.prebuffer_ms)))
+
+
+if __name__ == "__main__":
+    main()
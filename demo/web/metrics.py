@@ -0,0 +1,292 @@
+"""
+Prometheus metrics of the demo server, served at `/metrics` in the text exposition format.
+
+Updates take no lock: every thread accumulates into its own shard, written only by that thread, and a scrape
+merges the shards (those of finished threads are folded into a retired total). An update on the generation
+thread or the event loop costs a dict lookup and a few increments. Gauges mirroring server state (queue
+depth, active sessions, voice cache) are callbacks, evaluated only when scraped.
+"""
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Label set of a generation session, shared by its latency metrics
+SESSION_LABELS = ("voice", "steps", "cfg")
+
+_Values = Dict[Tuple[str, Tuple[str, ...]], List[float]]
+
+
+class _Shard:
+    __slots__ = ("thread", "values")
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.values: _Values = {}
+
+
+def _merge(into: _Values, values: _Values):
+    for key, cell in list(values.items()):
+        total = into.get(key)
+        if total is None:
+            into[key] = list(cell)
+        else:
+            for index, value in enumerate(cell):
+                total[index] += value
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry._register(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, Tuple[str, ...]]:
+        return self.name, tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _render(self, samples: _Values, lines: List[str]):
+        for (_, label_values), cell in sorted(samples.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, label_values)} {_format_value(cell[0])}")
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        values = self.registry._shard()
+        key = self._key(labels)
+        cell = values.get(key)
+        if cell is None:
+            values[key] = [float(amount)]
+        else:
+            cell[0] += amount
+
+    def value(self, **labels) -> float:
+        """Total over all threads (merges the shards, for scrape-time callbacks rather than the hot path)."""
+        cell = self.registry._collect().get(self._key(labels))
+        return cell[0] if cell else 0.0
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        values = self.registry._shard()
+        key = self._key(labels)
+        cell = values.get(key)
+        if cell is None:
+            # One count per bucket plus +Inf, then the sum
+            cell = values[key] = [0.0] * (len(self.buckets) + 2)
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def _render(self, samples: _Values, lines: List[str]):
+        names = self.labelnames + ("le",)
+        for (_, label_values), cell in sorted(samples.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), cell[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, label_values + (_format_value(bound),))} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(cell[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+
+
+class CallbackMetric(_Metric):
+    """
+    Gauge or counter read from the server state at scrape time. `callback` returns a number, or a dict from
+    label values (a tuple, or a string for a single label) to numbers.
+    """
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str,
+                 callback: Callable[[], Union[float, Dict]], kind: str = "gauge", labelnames: Sequence[str] = ()):
+        self.kind = kind
+        self.callback = callback
+        super().__init__(registry, name, documentation, labelnames)
+
+    def _render(self, samples: _Values, lines: List[str]):
+        try:
+            result = self.callback()
+        except Exception as exc:
+            print(f"[metrics] Callback of {self.name} failed: {exc!r}")
+            return
+        if not isinstance(result, dict):
+            result = {(): result}
+        for label_values, value in sorted(result.items()):
+            if not isinstance(label_values, tuple):
+                label_values = (label_values,)
+            lines.append(f"{self.name}{_format_labels(self.labelnames, label_values)} {_format_value(value)}")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._retired: _Values = {}
+        # Taken when a thread records its first sample and by scrapes, never by updates
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric):
+        if metric.name in self._metrics and isinstance(metric, CallbackMetric):
+            # Callbacks are rebound on app restarts (e.g. uvicorn reload)
+            self._metrics[metric.name] = metric
+            return
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return Counter(self, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Optional[Sequence[float]] = None) -> Histogram:
+        if buckets is None:
+            return Histogram(self, name, documentation, labelnames)
+        return Histogram(self, name, documentation, labelnames, buckets)
+
+    def callback(self, name: str, documentation: str, callback: Callable[[], Union[float, Dict]],
+                 kind: str = "gauge", labelnames: Sequence[str] = ()) -> CallbackMetric:
+        return CallbackMetric(self, name, documentation, callback, kind, labelnames)
+
+    def _shard(self) -> _Values:
+        values = getattr(self._local, "values", None)
+        if values is None:
+            shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            values = self._local.values = shard.values
+        return values
+
+    def _collect(self) -> _Values:
+        with self._lock:
+            live = []
+            for shard in self._shards:
+                if shard.thread.is_alive():
+                    live.append(shard)
+                else:
+                    # A finished thread no longer writes its shard
+                    _merge(self._retired, shard.values)
+            self._shards = live
+            merged: _Values = {}
+            _merge(merged, self._retired)
+            for shard in live:
+                _merge(merged, shard.values)
+        return merged
+
+    def render(self) -> str:
+        by_metric: Dict[str, _Values] = {}
+        for key, cell in self._collect().items():
+            by_metric.setdefault(key[0], {})[key] = cell
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            metric._render(by_metric.get(metric.name, {}), lines)
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Times the forward calls of model stages into `histogram` (labelled `stage` plus the session labels bound
+    to the calling thread with `bind`). On GPU the time covers the host side of the call (kernel launches),
+    not the kernels themselves.
+    """
+
+    def __init__(self, histogram: Histogram, stages: Dict[str, object]):
+        self.histogram = histogram
+        self._local = threading.local()
+        self._handles = []
+        for name, module in stages.items():
+            self._handles.append(module.register_forward_pre_hook(self._make_pre_hook(name)))
+            self._handles.append(module.register_forward_hook(self._make_hook(name)))
+
+    def bind(self, **labels):
+        """Session labels of the stage calls made by the current thread."""
+        self._local.labels = labels
+
+    def _make_pre_hook(self, name: str):
+        def pre_hook(module, args):
+            starts = getattr(self._local, "starts", None)
+            if starts is None:
+                starts = self._local.starts = {}
+            starts[name] = time.perf_counter()
+        return pre_hook
+
+    def _make_hook(self, name: str):
+        def hook(module, args, output):
+            started = self._local.starts.pop(name, None)
+            if started is not None:
+                labels = getattr(self._local, "labels", None) or {}
+                self.histogram.observe(time.perf_counter() - started, stage=name, **labels)
+        return hook
+
+    def remove(self):
+        for handle in self._handles:
+            handle.remove()
+        self._handles.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+TIME_TO_FIRST_AUDIO = REGISTRY.histogram(
+    "vibevoice_time_to_first_audio_seconds",
+    "Time from the start of a generation to its first decoded audio chunk.",
+    SESSION_LABELS,
+    buckets=(0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0),
+)
+REAL_TIME_FACTOR = REGISTRY.histogram(
+    "vibevoice_real_time_factor",
+    "Generation wall time divided by the duration of the generated audio (below 1 is faster than real time).",
+    SESSION_LABELS,
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0, 1.25, 1.5, 2.0, 3.0, 5.0),
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    "vibevoice_stage_latency_seconds",
+    "Duration of one forward call of a model stage.",
+    ("stage",) + SESSION_LABELS,
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.0075, 0.01, 0.015, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+GENERATIONS = REGISTRY.counter(
+    "vibevoice_generations_total",
+    "Finished generations by stop reason (eos, max_length, stopped by the client, error).",
+    ("reason",),
+)
+ERRORS = REGISTRY.counter("vibevoice_errors_total", "Errors by origin.", ("kind",))
+AUDIO_SECONDS = REGISTRY.counter("vibevoice_audio_seconds_total", "Seconds of audio generated.")
+BYTES_SENT = REGISTRY.counter("vibevoice_bytes_sent_total", "Audio payload bytes sent to clients.", ("transport", "codec"))
+VOICE_CACHE_REQUESTS = REGISTRY.counter(
+    "vibevoice_voice_cache_requests_total", "Voice preset lookups by result (hit or miss).", ("result",),
+)
+VOICE_LOAD_LATENCY = REGISTRY.histogram(
+    "vibevoice_voice_load_seconds",
+    "Time to load a voice preset, by cause (request on a cache miss, prefetch, prewarm).",
+    ("source",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
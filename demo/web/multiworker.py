@@ -0,0 +1,308 @@
+"""
+Supervised multi-worker serving on CPU.
+
+The front process loads the model once, writes its weights (in the serving dtype) to a safetensors file in
+shared memory, and starts N `web.app` workers, each pinned to its own cores with its own intra-op thread
+count. The workers memory-map that file, so the weights are held once in RAM whatever N is. The front
+serves the page and dispatches every WebSocket session and WebRTC offer to the least loaded worker,
+restarting workers that exit.
+
+    python demo/web/multiworker.py --model_path microsoft/VibeVoice-Realtime-0.5B --workers 8 --port 3000
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import uvicorn
+import websockets
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.websockets import WebSocketDisconnect, WebSocketState
+
+BASE = Path(__file__).parent
+DEMO_DIR = BASE.parent
+
+
+def partition_cores(num_workers: int, cores: Optional[List[int]] = None) -> List[List[int]]:
+    """Split the usable cores into `num_workers` contiguous sets (neighbouring cores share caches)."""
+    if cores is None:
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    if num_workers > len(cores):
+        raise ValueError(f"{num_workers} workers requested but only {len(cores)} cores are available")
+    per_worker, extra = divmod(len(cores), num_workers)
+    sets, start = [], 0
+    for index in range(num_workers):
+        size = per_worker + (1 if index < extra else 0)
+        sets.append(cores[start:start + size])
+        start += size
+    return sets
+
+
+def prepare_shared_weights(model_path: str, cpu_dtype: str, directory: str) -> str:
+    """Write the serving weights of `model_path` once to `directory`, reusing a previous export."""
+    import torch
+
+    from vibevoice.modular.modeling_vibevoice_streaming_inference import (
+        CPU_BF16_PRECISION_MAP,
+        VibeVoiceStreamingForConditionalGenerationInference,
+    )
+    from vibevoice.modular.shared_weights import save_shared_weights
+
+    key = hashlib.sha1(f"{os.path.abspath(model_path) if os.path.isdir(model_path) else model_path}:{cpu_dtype}".encode()).hexdigest()[:12]
+    path = os.path.join(directory, f"vibevoice-{key}.safetensors")
+    if os.path.exists(path):
+        print(f"[multiworker] Reusing shared weights {path}")
+        return path
+
+    print(f"[multiworker] Exporting shared weights of {model_path} ({cpu_dtype}) to {path}")
+    model = VibeVoiceStreamingForConditionalGenerationInference.from_pretrained(
+        model_path, torch_dtype=torch.float32, device_map="cpu", attn_implementation="sdpa",
+    )
+    if cpu_dtype == "bfloat16":
+        # Cast here, so the workers' precision map finds the weights already in their dtype and copies nothing
+        model.apply_precision_map(CPU_BF16_PRECISION_MAP)
+    save_shared_weights(model, path)
+    del model
+    return path
+
+
+class WorkerProcess:
+    """One `web.app` server process, restarted (with backoff) when it exits."""
+
+    def __init__(self, index: int, port: int, cores: List[int], num_threads: int, env: Dict[str, str]):
+        self.index = index
+        self.port = port
+        self.cores = cores
+        self.num_threads = num_threads
+        self.env = {
+            **env,
+            "MODEL_CPU_SET": ",".join(str(core) for core in cores),
+            "MODEL_NUM_THREADS": str(num_threads),
+            "OMP_NUM_THREADS": str(num_threads),
+        }
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts = 0
+        # Maintained by the front
+        self.ready = False
+        self.sessions = 0
+        self.reported: Dict[str, object] = {}
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self.ready = False
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "web.app:app", "--host", "127.0.0.1", "--port", str(self.port)],
+            cwd=DEMO_DIR,
+            env=self.env,
+        )
+        print(f"[multiworker] Worker {self.index} (pid {self.process.pid}) on port {self.port}, cores {self.cores}")
+
+    def supervise(self, stopping: threading.Event):
+        backoff = 1.0
+        while not stopping.is_set():
+            started = time.monotonic()
+            code = self.process.wait()
+            self.ready = False
+            if stopping.is_set():
+                return
+            # A worker that crashes right away (e.g. while loading) is restarted less and less eagerly
+            backoff = 1.0 if time.monotonic() - started > 60.0 else min(backoff * 2, 60.0)
+            print(f"[multiworker] Worker {self.index} exited with {code}, restarting in {backoff:.0f} s")
+            if stopping.wait(backoff):
+                return
+            self.restarts += 1
+            self.start()
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def _http(method: str, url: str, body: Optional[bytes] = None, timeout: float = 30.0):
+    request = urllib.request.Request(url, data=body, method=method, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def create_front(workers: List[WorkerProcess], poll_interval: float = 1.0) -> FastAPI:
+    """Front app dispatching sessions to the least loaded ready worker."""
+    front = FastAPI()
+
+    def least_loaded() -> Optional[WorkerProcess]:
+        ready = [worker for worker in workers if worker.ready]
+        if not ready:
+            return None
+        # Sessions proxied by the front are known immediately, WebRTC sessions only through the polled load
+        return min(ready, key=lambda worker: (worker.sessions + int(worker.reported.get("webrtc_sessions", 0)), worker.index))
+
+    async def poll():
+        while True:
+            for worker in workers:
+                try:
+                    worker.reported = await asyncio.to_thread(_http, "GET", f"{worker.url}/load", None, 2.0)
+                    worker.ready = True
+                except Exception:
+                    worker.ready = False
+            await asyncio.sleep(poll_interval)
+
+    @front.on_event("startup")
+    async def _start_polling():
+        front.state.poll_task = asyncio.create_task(poll())
+
+    @front.get("/")
+    def index():
+        return FileResponse(BASE / "index.html")
+
+    @front.get("/config")
+    async def get_config():
+        worker = least_loaded()
+        if worker is None:
+            return JSONResponse({"error": "No worker ready"}, status_code=503)
+        return await asyncio.to_thread(_http, "GET", f"{worker.url}/config")
+
+    @front.get("/load")
+    def get_load():
+        return {
+            "workers": [
+                {
+                    "index": worker.index,
+                    "port": worker.port,
+                    "cores": worker.cores,
+                    "ready": worker.ready,
+                    "sessions": worker.sessions,
+                    "restarts": worker.restarts,
+                    **worker.reported,
+                }
+                for worker in workers
+            ]
+        }
+
+    @front.post("/offer")
+    async def offer(request: Request):
+        worker = least_loaded()
+        if worker is None:
+            return JSONResponse({"error": "No worker ready"}, status_code=503)
+        # Media flows directly between the browser and the worker, only the signalling goes through here
+        return await asyncio.to_thread(_http, "POST", f"{worker.url}/offer", await request.body())
+
+    @front.post("/prefetch")
+    async def prefetch(request: Request):
+        # Any worker may get the next session, so every one of them loads the voice
+        body = await request.body()
+        ready = [worker for worker in workers if worker.ready]
+        results = await asyncio.gather(
+            *(asyncio.to_thread(_http, "POST", f"{worker.url}/prefetch", body) for worker in ready),
+            return_exceptions=True,
+        )
+        return {
+            "workers": {
+                worker.index: (result if not isinstance(result, Exception) else {"error": str(result)})
+                for worker, result in zip(ready, results)
+            }
+        }
+
+    @front.websocket("/stream")
+    async def stream(ws: WebSocket):
+        await ws.accept()
+        worker = least_loaded()
+        if worker is None:
+            await ws.close(code=1013, reason="No worker ready")
+            return
+        worker.sessions += 1
+        query = f"?{ws.url.query}" if ws.url.query else ""
+        try:
+            async with websockets.connect(f"ws://127.0.0.1:{worker.port}/stream{query}", max_size=None) as upstream:
+                async def client_to_worker():
+                    while True:
+                        message = await ws.receive()
+                        if message["type"] == "websocket.disconnect":
+                            return
+                        if message.get("text") is not None:
+                            await upstream.send(message["text"])
+                        elif message.get("bytes") is not None:
+                            await upstream.send(message["bytes"])
+
+                async def worker_to_client():
+                    async for message in upstream:
+                        if isinstance(message, bytes):
+                            await ws.send_bytes(message)
+                        else:
+                            await ws.send_text(message)
+
+                tasks = [asyncio.create_task(client_to_worker()), asyncio.create_task(worker_to_client())]
+                _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in pending:
+                    task.cancel()
+        except (WebSocketDisconnect, websockets.ConnectionClosed, OSError) as exc:
+            print(f"[multiworker] Session on worker {worker.index} ended: {exc!r}")
+        finally:
+            worker.sessions -= 1
+            if ws.client_state == WebSocketState.CONNECTED:
+                await ws.close()
+
+    return front
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the realtime demo from several CPU worker processes")
+    parser.add_argument("--model_path", type=str, required=True)
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker processes")
+    parser.add_argument("--port", type=int, default=3000, help="Port of the front process")
+    parser.add_argument("--base_port", type=int, default=None, help="Port of the first worker (default: port + 1)")
+    parser.add_argument("--threads_per_worker", type=int, default=None,
+                        help="Intra-op threads per worker (default: the cores of its set)")
+    parser.add_argument("--cpu_dtype", type=str, default="float32", choices=["float32", "bfloat16"])
+    parser.add_argument("--shared_weights_dir", type=str, default=None,
+                        help="Where the shared weight file is written (default: /dev/shm, else the temp dir)")
+    parser.add_argument("--no_shared_weights", action="store_true",
+                        help="Let every worker load its own copy of the weights")
+    args = parser.parse_args()
+
+    core_sets = partition_cores(args.workers)
+    env = {
+        **os.environ,
+        "MODEL_PATH": args.model_path,
+        "MODEL_DEVICE": "cpu",
+        "MODEL_CPU_DTYPE": args.cpu_dtype,
+    }
+    if not args.no_shared_weights:
+        directory = args.shared_weights_dir or ("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+        env["MODEL_SHARED_WEIGHTS"] = prepare_shared_weights(args.model_path, args.cpu_dtype, directory)
+
+    base_port = args.base_port or args.port + 1
+    workers = [
+        WorkerProcess(index, base_port + index, cores, args.threads_per_worker or len(cores), env)
+        for index, cores in enumerate(core_sets)
+    ]
+    stopping = threading.Event()
+    for worker in workers:
+        worker.start()
+        threading.Thread(target=worker.supervise, args=(stopping,), daemon=True).start()
+
+    try:
+        uvicorn.run(create_front(workers), host="0.0.0.0", port=args.port)
+    finally:
+        stopping.set()
+        for worker in workers:
+            worker.stop()
+
+
+if __name__ == "__main__":
+    main()
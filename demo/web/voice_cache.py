@@ -0,0 +1,167 @@
+"""
+Memory-bounded cache of loaded voice presets.
+
+`VoicePresetCache` keeps the prefilled prompt outputs of recently used voices up to a byte budget and evicts
+the least recently used ones beyond it. Pinned voices are loaded at startup (`prewarm`) and never evicted.
+Voices expected to be requested soon can be loaded in the background (`prefetch`), so their first request
+does not pay for the load; concurrent requests and prefetches of the same voice share one load.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from .metrics import VOICE_CACHE_REQUESTS, VOICE_LOAD_LATENCY
+
+
+class VoicePresetCache:
+    """
+    Args:
+        loader: Loads the preset of a voice key, on the requesting thread or the background loader thread.
+        budget_bytes: Bytes of presets kept, as measured by `size_fn`. Evicted presets still used by a
+            running generation are freed when it ends.
+        size_fn: Bytes held by a loaded preset.
+        pinned: Voices loaded by `prewarm` and never evicted (they count against the budget).
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], object],
+        budget_bytes: int,
+        size_fn: Callable[[object], int],
+        pinned: Iterable[str] = (),
+    ):
+        self.loader = loader
+        self.budget_bytes = budget_bytes
+        self.size_fn = size_fn
+        self.pinned = list(dict.fromkeys(pinned))
+        self.nbytes = 0
+
+        self._entries: "OrderedDict[str, Tuple[object, int]]" = OrderedDict()
+        self._loading: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # One background load at a time, so prefetching does not compete with generation for the cores
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="voice-prefetch")
+        self.counters: Dict[str, int] = {"hits": 0, "misses": 0, "loads": 0, "load_errors": 0, "evictions": 0, "prefetches": 0}
+        self.load_seconds = 0.0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def _claim(self, key: str) -> Tuple[Optional[object], Optional[Future], bool]:
+        """Under the lock: the cached preset, else the pending load of `key` and whether the caller must run it."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry[0], None, False
+        future = self._loading.get(key)
+        if future is not None:
+            return None, future, False
+        future = self._loading[key] = Future()
+        return None, future, True
+
+    def get_cached(self, key: str) -> Optional[object]:
+        """The preset of `key` if it is cached (counted as a hit), else None; never loads."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+        VOICE_CACHE_REQUESTS.inc(result="hit")
+        return entry[0]
+
+    def get(self, key: str) -> object:
+        """The preset of `key`, loaded on this thread on a miss (or awaited, if a load is already running)."""
+        with self._lock:
+            preset, future, owner = self._claim(key)
+            self.counters["hits" if preset is not None else "misses"] += 1
+        VOICE_CACHE_REQUESTS.inc(result="hit" if preset is not None else "miss")
+        if preset is not None:
+            return preset
+        if owner:
+            self._load(key, future, "request")
+        return future.result()
+
+    def prefetch(self, key: str) -> Future:
+        """Load `key` in the background unless cached or loading; the future resolves to the preset."""
+        with self._lock:
+            preset, future, owner = self._claim(key)
+            if owner:
+                self.counters["prefetches"] += 1
+        if preset is not None:
+            future = Future()
+            future.set_result(preset)
+        elif owner:
+            self._executor.submit(self._load, key, future, "prefetch")
+        return future
+
+    def prewarm(self):
+        """Load the pinned voices now (at startup, before serving)."""
+        for key in self.pinned:
+            with self._lock:
+                preset, future, owner = self._claim(key)
+            if owner:
+                self._load(key, future, "prewarm")
+            elif future is not None:
+                future.result()
+        if self.nbytes > self.budget_bytes:
+            print(f"[voice_cache] Pinned voices take {self.nbytes / 2**20:.0f} MiB, over the {self.budget_bytes / 2**20:.0f} MiB budget")
+
+    def _load(self, key: str, future: Future, source: str):
+        started = time.perf_counter()
+        try:
+            preset = self.loader(key)
+            nbytes = self.size_fn(preset)
+        except BaseException as exc:
+            with self._lock:
+                self._loading.pop(key, None)
+                self.counters["load_errors"] += 1
+            print(f"[voice_cache] Loading voice {key} ({source}) failed: {exc!r}")
+            future.set_exception(exc)
+            return
+        seconds = time.perf_counter() - started
+        VOICE_LOAD_LATENCY.observe(seconds, source=source)
+        with self._lock:
+            self._loading.pop(key, None)
+            self._entries[key] = (preset, nbytes)
+            self.nbytes += nbytes
+            self.counters["loads"] += 1
+            self.load_seconds += seconds
+            self._evict(keep=key)
+        print(f"[voice_cache] Loaded voice {key} ({source}, {nbytes / 2**20:.1f} MiB) in {1000.0 * seconds:.0f} ms")
+        future.set_result(preset)
+
+    def _evict(self, keep: str):
+        """Under the lock: drop least recently used presets until the cache fits its budget."""
+        for key in list(self._entries):
+            if self.nbytes <= self.budget_bytes:
+                break
+            if key == keep or key in self.pinned:
+                continue
+            _, nbytes = self._entries.pop(key)
+            self.nbytes -= nbytes
+            self.counters["evictions"] += 1
+
+    def hit_rate(self) -> float:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return self.counters["hits"] / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.nbytes,
+                "budget_bytes": self.budget_bytes,
+                "voices": list(self._entries),
+                "loading": list(self._loading),
+                "pinned": list(self.pinned),
+                "hit_rate": self.hit_rate(),
+                "average_load_ms": 1000.0 * self.load_seconds / self.counters["loads"] if self.counters["loads"] else 0.0,
+                **self.counters,
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
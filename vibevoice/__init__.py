@@ -1,16 +1,25 @@
 # vibevoice/__init__.py
-from vibevoice.modular import (
-    VibeVoiceStreamingForConditionalGenerationInference,
-    VibeVoiceStreamingConfig,
-)
-from vibevoice.processor import (
-    VibeVoiceStreamingProcessor,
-    VibeVoiceTokenizerProcessor,
-)
+# Exports are resolved lazily, so that torch-free subpackages (e.g. `vibevoice.onnx.runtime`) can be
+# imported without pulling in transformers.
+import importlib
+
+_EXPORTS = {
+    "VibeVoiceStreamingForConditionalGenerationInference": "vibevoice.modular",
+    "VibeVoiceStreamingConfig": "vibevoice.modular",
+    "VibeVoiceStreamingProcessor": "vibevoice.processor",
+    "VibeVoiceTokenizerProcessor": "vibevoice.processor",
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "VibeVoiceStreamingForConditionalGenerationInference",
     "VibeVoiceStreamingConfig",
     "VibeVoiceStreamingProcessor",
     "VibeVoiceTokenizerProcessor",
-]
\ No newline at end of file
+]
@@ -2,7 +2,8 @@
 from .modeling_vibevoice_streaming_inference import VibeVoiceStreamingForConditionalGenerationInference
 from .configuration_vibevoice_streaming import VibeVoiceStreamingConfig
 from .modeling_vibevoice_streaming import VibeVoiceStreamingModel, VibeVoiceStreamingPreTrainedModel
-from .streamer import AudioStreamer, AsyncAudioStreamer
+from .streamer import AudioStreamer, AsyncAudioStreamer, RingBufferAudioStreamer
+from .acoustic_decoder_service import BatchedAcousticDecoder
 
 __all__ = [
     "VibeVoiceStreamingForConditionalGenerationInference",
@@ -11,4 +12,6 @@ __all__ = [
     "VibeVoiceStreamingPreTrainedModel",
     "AudioStreamer",
     "AsyncAudioStreamer",
+    "RingBufferAudioStreamer",
+    "BatchedAcousticDecoder",
 ]
\ No newline at end of file
@@ -0,0 +1,175 @@
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import torch
+
+from transformers.utils import logging
+
+from .modular_vibevoice_tokenizer import VibeVoiceTokenizerStreamingCache
+
+logger = logging.get_logger(__name__)
+
+
+class _DecodeRequest:
+    __slots__ = ("session_id", "latents", "future", "arrival")
+
+    def __init__(self, session_id: int, latents: torch.Tensor):
+        self.session_id = session_id
+        self.latents = latents
+        self.future = Future()
+        self.arrival = time.perf_counter()
+
+
+class BatchedAcousticDecoder:
+    """
+    Acoustic decoder worker shared by concurrent `generate` calls.
+
+    Every generation opens a session, which owns one row of a shared `VibeVoiceTokenizerStreamingCache`.
+    Latents submitted by the sessions are collected for at most `max_wait_ms` after the first pending
+    request (or until every open session has submitted), decoded as one batch with per-session cache
+    rows, and the audio is handed back to each session through a future. A session has at most one
+    request in a batch, so its chunks are decoded in submission order.
+
+    Args:
+        acoustic_tokenizer (`VibeVoiceAcousticTokenizerModel`): The acoustic tokenizer to decode with.
+        max_wait_ms (`float`, *optional*): Upper bound on the time a request waits for other sessions.
+        max_batch_size (`int`, *optional*): Maximum number of sessions decoded together.
+    """
+
+    def __init__(self, acoustic_tokenizer, max_wait_ms: float = 2.0, max_batch_size: int = 16):
+        self.acoustic_tokenizer = acoustic_tokenizer
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.cache = VibeVoiceTokenizerStreamingCache(num_slots=max_batch_size)
+
+        self._condition = threading.Condition()
+        self._pending: List[_DecodeRequest] = []
+        self._open_sessions = set()
+        self._idle_sessions = set()
+        self._closed_sessions: List[int] = []
+        self._session_ids = itertools.count()
+        self._stopped = False
+        self._worker = threading.Thread(target=self._run, name="acoustic-decoder", daemon=True)
+        self._worker.start()
+
+    def open_session(self) -> int:
+        """Register a new decoding stream and return its session id."""
+        with self._condition:
+            session_id = next(self._session_ids)
+            self._open_sessions.add(session_id)
+            return session_id
+
+    def close_session(self, session_id: int):
+        """Release the cache row of a finished stream."""
+        with self._condition:
+            self._open_sessions.discard(session_id)
+            self._idle_sessions.discard(session_id)
+            self._closed_sessions.append(session_id)
+            self._condition.notify()
+
+    @contextmanager
+    def idle(self, session_id: int):
+        """
+        Mark a session as not about to submit (e.g. while it waits for its client to drain audio), so
+        batches stop waiting for it.
+        """
+        with self._condition:
+            self._idle_sessions.add(session_id)
+            self._condition.notify()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._idle_sessions.discard(session_id)
+
+    def submit(self, session_id: int, latents: torch.Tensor) -> Future:
+        """
+        Queue `[1, vae_dim, frames]` latents of a session for decoding.
+
+        Returns:
+            A future resolved with the `[1, 1, frames * hop_length]` audio of the chunk.
+        """
+        request = _DecodeRequest(session_id, latents)
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("BatchedAcousticDecoder has been shut down")
+            self._pending.append(request)
+            self._condition.notify()
+        return request.future
+
+    def decode(self, session_id: int, latents: torch.Tensor) -> torch.Tensor:
+        """Blocking variant of `submit`."""
+        return self.submit(session_id, latents).result()
+
+    def shutdown(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._worker.join()
+
+    def _ready(self) -> bool:
+        sessions = {request.session_id for request in self._pending}
+        if len(sessions) >= min(self.max_batch_size, len(self._open_sessions - self._idle_sessions)):
+            return True
+        return time.perf_counter() - self._pending[0].arrival >= self.max_wait
+
+    def _take_batch(self) -> List[_DecodeRequest]:
+        """Oldest request of each session, up to `max_batch_size` sessions."""
+        batch, sessions, remaining = [], set(), []
+        for request in self._pending:
+            if request.session_id in sessions or len(batch) >= self.max_batch_size:
+                remaining.append(request)
+            else:
+                sessions.add(request.session_id)
+                batch.append(request)
+        self._pending = remaining
+        return batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and not self._closed_sessions and not (self._pending and self._ready()):
+                    if self._pending:
+                        timeout = self._pending[0].arrival + self.max_wait - time.perf_counter()
+                        self._condition.wait(timeout=max(timeout, 0.0))
+                    else:
+                        self._condition.wait()
+                if self._stopped:
+                    for request in self._pending:
+                        request.future.set_exception(RuntimeError("BatchedAcousticDecoder has been shut down"))
+                    self._pending = []
+                    return
+                closed, self._closed_sessions = self._closed_sessions, []
+                batch = self._take_batch() if self._pending and self._ready() else []
+
+            if closed:
+                self.cache.release(torch.tensor(closed, dtype=torch.long))
+            if batch:
+                self._decode_batch(batch)
+
+    def _decode_batch(self, batch: List[_DecodeRequest]):
+        # Requests can only share a forward when they carry the same number of frames
+        groups: Dict[int, List[_DecodeRequest]] = {}
+        for request in batch:
+            groups.setdefault(request.latents.shape[-1], []).append(request)
+
+        for requests in groups.values():
+            try:
+                device = self.acoustic_tokenizer.device
+                latents = torch.cat([request.latents.to(device) for request in requests], dim=0)
+                sample_indices = torch.tensor([request.session_id for request in requests], device=device)
+                with torch.no_grad():
+                    audio = self.acoustic_tokenizer.decode(
+                        latents, cache=self.cache, sample_indices=sample_indices, use_cache=True,
+                    )
+            except Exception as exc:
+                logger.error(f"Batched acoustic decode failed: {exc}")
+                for request in requests:
+                    request.future.set_exception(exc)
+                continue
+            for i, request in enumerate(requests):
+                request.future.set_result(audio[i:i + 1])
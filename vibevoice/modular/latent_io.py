@@ -0,0 +1,135 @@
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import torch
+
+from transformers.utils import logging
+
+from .configuration_vibevoice import VibeVoiceAcousticTokenizerConfig
+from .modular_vibevoice_tokenizer import VibeVoiceAcousticTokenizerModel
+
+logger = logging.get_logger(__name__)
+
+LATENT_FORMAT_VERSION = "1"
+ACOUSTIC_TOKENIZER_PREFIX = "model.acoustic_tokenizer."
+
+
+def save_speech_latents(
+    path: str,
+    speech_latents: torch.Tensor,
+    speech_scaling_factor: float,
+    speech_bias_factor: float,
+    sample_rate: int = 24000,
+    hop_length: int = 3200,
+    metadata: Optional[Dict[str, Any]] = None,
+    dtype: torch.dtype = torch.float32,
+) -> str:
+    """
+    Save generated speech latents to a safetensors file.
+
+    The latents are stored as generated (`[frames, latent_dim]`, before denormalization) together with the
+    scaling factors needed to decode them, so the file can be rendered without the language model.
+
+    Args:
+        path: Output file, conventionally with a `.safetensors` extension.
+        speech_latents: `[frames, latent_dim]` latents, e.g. from `VibeVoiceGenerationOutput.speech_latents`.
+        speech_scaling_factor, speech_bias_factor: Latent normalization of the model that produced them.
+        sample_rate, hop_length: Native audio rate of the decoder and samples per latent frame.
+        metadata: Extra string-convertible entries (text, voice, model, ...).
+        dtype: Storage dtype; float16 halves the size at a small precision cost.
+    """
+    from safetensors.torch import save_file
+
+    if speech_latents.dim() == 3:
+        speech_latents = speech_latents.squeeze(0)
+    header = {
+        "format_version": LATENT_FORMAT_VERSION,
+        "speech_scaling_factor": repr(float(speech_scaling_factor)),
+        "speech_bias_factor": repr(float(speech_bias_factor)),
+        "sample_rate": str(sample_rate),
+        "hop_length": str(hop_length),
+        "num_frames": str(speech_latents.shape[0]),
+        "latent_dim": str(speech_latents.shape[-1]),
+    }
+    for key, value in (metadata or {}).items():
+        header[key] = value if isinstance(value, str) else json.dumps(value)
+
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    save_file({"speech_latents": speech_latents.detach().to("cpu", dtype).contiguous()}, path, metadata=header)
+    return path
+
+
+def load_speech_latents(path: str) -> Tuple[torch.Tensor, Dict[str, Any]]:
+    """
+    Load latents written by `save_speech_latents`.
+
+    Returns:
+        The float32 `[frames, latent_dim]` latents and the metadata, with the numeric entries parsed.
+    """
+    from safetensors import safe_open
+
+    with safe_open(path, framework="pt") as f:
+        metadata = dict(f.metadata() or {})
+        speech_latents = f.get_tensor("speech_latents").float()
+
+    if metadata.get("format_version") != LATENT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported latent file format version {metadata.get('format_version')!r} in {path}")
+    for key in ("speech_scaling_factor", "speech_bias_factor"):
+        metadata[key] = float(metadata[key])
+    for key in ("sample_rate", "hop_length", "num_frames", "latent_dim"):
+        metadata[key] = int(metadata[key])
+    return speech_latents, metadata
+
+
+def denormalize_speech_latents(speech_latents: torch.Tensor, metadata: Dict[str, Any]) -> torch.Tensor:
+    """Undo the latent normalization, giving the `[batch, latent_dim, frames]` input of the acoustic decoder."""
+    if speech_latents.dim() == 2:
+        speech_latents = speech_latents.unsqueeze(0)
+    scaled_latents = speech_latents / metadata["speech_scaling_factor"] - metadata["speech_bias_factor"]
+    return scaled_latents.transpose(1, 2)
+
+
+def load_acoustic_tokenizer(model_path: str, device: str = "cpu", dtype: torch.dtype = torch.float32) -> VibeVoiceAcousticTokenizerModel:
+    """
+    Load only the acoustic tokenizer out of a full VibeVoice checkpoint.
+
+    Reads the tokenizer config from `config.json` and only the `model.acoustic_tokenizer.*` tensors from the
+    safetensors shards, so the language model weights are never loaded.
+
+    Args:
+        model_path: Local checkpoint directory or Hugging Face repo id.
+    """
+    from safetensors import safe_open
+
+    if not os.path.isdir(model_path):
+        from huggingface_hub import snapshot_download
+        model_path = snapshot_download(model_path, allow_patterns=["*.json", "*.safetensors"])
+
+    with open(os.path.join(model_path, "config.json"), "r", encoding="utf-8") as f:
+        config_dict = json.load(f)["acoustic_tokenizer_config"]
+    config_dict["model_type"] = "vibevoice_acoustic_tokenizer"
+    tokenizer = VibeVoiceAcousticTokenizerModel(VibeVoiceAcousticTokenizerConfig(**config_dict))
+
+    index_path = os.path.join(model_path, "model.safetensors.index.json")
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            weight_map = json.load(f)["weight_map"]
+        shards = sorted({shard for name, shard in weight_map.items() if name.startswith(ACOUSTIC_TOKENIZER_PREFIX)})
+    else:
+        shards = ["model.safetensors"]
+
+    state_dict = {}
+    for shard in shards:
+        with safe_open(os.path.join(model_path, shard), framework="pt") as f:
+            for name in f.keys():
+                if name.startswith(ACOUSTIC_TOKENIZER_PREFIX):
+                    state_dict[name[len(ACOUSTIC_TOKENIZER_PREFIX):]] = f.get_tensor(name)
+
+    missing, unexpected = tokenizer.load_state_dict(state_dict, strict=False)
+    missing = [name for name in missing if name.startswith("decoder.")]
+    if missing or unexpected:
+        logger.warning(f"Acoustic tokenizer weights mismatch, missing: {missing}, unexpected: {unexpected}")
+    return tokenizer.to(device=device, dtype=dtype).eval()
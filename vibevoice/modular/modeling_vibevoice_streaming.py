@@ -17,7 +17,7 @@ from transformers.modeling_utils import PreTrainedModel
 from transformers.modeling_flash_attention_utils import FlashAttentionKwargs
 from transformers.utils import logging
 
-from .modular_vibevoice_diffusion_head import VibeVoiceDiffusionHead
+from .modular_vibevoice_diffusion_head import VibeVoiceDiffusionHead, RMSNorm
 from vibevoice.schedule.dpm_solver import DPMSolverMultistepScheduler
 
 from .configuration_vibevoice_streaming import VibeVoiceStreamingConfig
@@ -48,6 +48,15 @@ class SpeechConnector(nn.Module):
         self.norm = LlamaRMSNorm(output_dim, eps=1e-6)
         self.fc2 = nn.Linear(output_dim, output_dim)
 
+    @torch.no_grad()
+    def fold_for_inference(self) -> bool:
+        """Fold the RMSNorm weight into `fc2`. The connector must not be trained or saved afterwards."""
+        if getattr(self.norm, "weight", None) is None:
+            return False
+        self.fc2.weight.copy_((self.fc2.weight.float() * self.norm.weight.float()[None, :]).to(self.fc2.weight.dtype))
+        self.norm = RMSNorm(self.fc2.in_features, eps=self.norm.variance_epsilon, elementwise_affine=False)
+        return True
+
     def forward(self, features, **kwargs):    
         x = self.fc1(features)
         x = self.norm(x)
@@ -1,3 +1,7 @@
+import copy
+import math
+from contextlib import contextmanager
+from functools import partial
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple, Union, Callable
 from tqdm import tqdm
@@ -20,6 +24,7 @@ from .configuration_vibevoice_streaming import VibeVoiceStreamingConfig
 from .modular_vibevoice_text_tokenizer import VibeVoiceTextTokenizer, VibeVoiceTextTokenizerFast
 from .modeling_vibevoice_streaming import VibeVoiceStreamingPreTrainedModel, VibeVoiceStreamingModel, BinaryClassifier
 from .streamer import AudioStreamer, AsyncAudioStreamer
+from .latent_io import save_speech_latents
 
 logger = logging.get_logger(__name__)
 
@@ -29,6 +34,59 @@ if not hasattr(modeling_utils, "ALL_PARALLEL_STYLES") or modeling_utils.ALL_PARA
 TTS_TEXT_WINDOW_SIZE = 5
 TTS_SPEECH_WINDOW_SIZE = 6
 
+# Per-stage dtypes for bf16 inference on CPUs with native bf16 matmul (AMX / AVX512-BF16): the transformers,
+# connector and diffusion head run in bf16, the EOS decision and the last decoder conv stay in fp32.
+# RMSNorm and the DPM solver upcast internally either way.
+CPU_BF16_PRECISION_MAP = {
+    "language_model": torch.bfloat16,
+    "tts_language_model": torch.bfloat16,
+    "tts_input_types": torch.bfloat16,
+    "acoustic_connector": torch.bfloat16,
+    "prediction_head": torch.bfloat16,
+    "tts_eos_classifier": torch.float32,
+    "acoustic_decoder": torch.bfloat16,
+    "acoustic_decoder_head": torch.float32,
+}
+
+
+def _cast_floating_inputs(module, args, kwargs, dtype=None):
+    """Forward pre-hook casting the floating point tensor arguments of a stage to the stage's dtype."""
+    def cast(value):
+        if torch.is_tensor(value) and value.is_floating_point() and value.dtype != dtype:
+            return value.to(dtype)
+        return value
+    return tuple(cast(arg) for arg in args), {key: cast(value) for key, value in kwargs.items()}
+
+
+def _cast_past_key_values(past_key_values, dtype):
+    """Cast a `DynamicCache` (in place) or a legacy tuple cache to `dtype`."""
+    if hasattr(past_key_values, "key_cache"):
+        past_key_values.key_cache = [key.to(dtype) for key in past_key_values.key_cache]
+        past_key_values.value_cache = [value.to(dtype) for value in past_key_values.value_cache]
+        return past_key_values
+    return tuple(tuple(tensor.to(dtype) for tensor in layer) for layer in past_key_values)
+
+
+@contextmanager
+def _raised_recompile_limit(limit: int):
+    """Raise dynamo's limit of graphs per code object to at least `limit`, restoring it on exit."""
+    import torch._dynamo
+
+    config = torch._dynamo.config
+    # `recompile_limit` replaced `cache_size_limit` in newer torch versions
+    names = [
+        name for name in ("recompile_limit", "cache_size_limit", "accumulated_recompile_limit", "accumulated_cache_size_limit")
+        if hasattr(config, name)
+    ]
+    previous = {name: getattr(config, name) for name in names}
+    try:
+        for name in names:
+            setattr(config, name, max(previous[name], limit))
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(config, name, value)
+
 
 def _update_model_kwargs_for_generation(
     outputs: ModelOutput,
@@ -72,10 +130,14 @@ class VibeVoiceGenerationOutput(ModelOutput):
             The generated sequences. 
         speech_outputs (`List[torch.FloatTensor]`, *optional*):
             List of generated speech waveforms or latents for each speech segment.
+        speech_latents (`List[torch.FloatTensor]`, *optional*):
+            Generated speech latents `(frames, latent_dim)` for each sample, before latent denormalization.
+            They can be decoded later with `decode_speech_latents`.
     """
     sequences: torch.LongTensor = None
     speech_outputs: Optional[List[torch.FloatTensor]] = None
     reach_max_step_sample: Optional[torch.BoolTensor] = None
+    speech_latents: Optional[List[torch.FloatTensor]] = None
 
 
 class VibeVoiceStreamingForConditionalGenerationInference(VibeVoiceStreamingPreTrainedModel, GenerationMixin):
@@ -91,6 +153,12 @@ class VibeVoiceStreamingForConditionalGenerationInference(VibeVoiceStreamingPreT
         
         # inference configuration
         self.ddpm_inference_steps = config.diffusion_head_config.ddpm_num_inference_steps
+        # set by `optimize_for_inference` once the latent scaling is folded into the acoustic decoder
+        self._decoder_latent_shift = None
+        # forward pre-hooks installed by `apply_precision_map`
+        self._precision_hooks = []
+        # components replaced by dynamically quantized kernels (see `vibevoice.modular.quantization`)
+        self._quantized_components = []
 
         # Initialize weights and apply final processing
         self.post_init()
@@ -157,6 +225,262 @@ class VibeVoiceStreamingForConditionalGenerationInference(VibeVoiceStreamingPreT
     def set_ddpm_inference_steps(self, num_steps=None):
         self.ddpm_inference_steps = num_steps or self.config.diffusion_head_config.ddpm_num_inference_steps
 
+    @torch.no_grad()
+    def _folding_probes(self, num_frames: int = 8):
+        """Deterministic probes of the components touched by `optimize_for_inference`."""
+        generator = torch.Generator(device="cpu").manual_seed(0)
+        hidden_size = self.config.decoder_config.hidden_size
+        latent_dim = self.config.acoustic_vae_dim
+        tokenizer = self.model.acoustic_tokenizer
+        head = self.model.prediction_head
+        connector = self.model.acoustic_connector
+        connector_dtype = next(connector.parameters()).dtype
+
+        latents = torch.randn(1, latent_dim, num_frames, generator=generator)
+        noisy = torch.randn(2, latent_dim, generator=generator).to(device=head.device, dtype=head.dtype)
+        condition = torch.randn(2, hidden_size, generator=generator).to(device=head.device, dtype=head.dtype)
+        timesteps = torch.full((2,), 500.0, device=head.device, dtype=head.dtype)
+        speech_latent = torch.randn(1, 1, latent_dim, generator=generator).to(device=self.device, dtype=connector_dtype)
+
+        return {
+            "acoustic_decoder": lambda: tokenizer.decode(
+                self._prepare_latent_for_decode(latents.to(device=tokenizer.device, dtype=tokenizer.dtype))
+            ),
+            "prediction_head": lambda: head(noisy, timesteps, condition=condition),
+            "acoustic_connector": lambda: connector(speech_latent),
+        }
+
+    @torch.no_grad()
+    def optimize_for_inference(self, check: bool = True, tolerance: Optional[float] = None) -> Dict[str, float]:
+        """
+        Load-time folding of per-call multiplies into weights.
+
+        - Acoustic decoder: `gamma`/`ffn_gamma` layer scales and RMSNorm weights of every `Block1D` are folded
+          into the adjacent mixer conv / FFN linears; the `speech_scaling_factor` rescale into the stem conv.
+        - `SpeechConnector`: the RMSNorm weight is folded into `fc2`.
+        - `VibeVoiceDiffusionHead`: the adaLN modulation of all layers runs as one GEMM.
+
+        The folded model is meant for inference only; do not train or `save_pretrained` it afterwards.
+
+        Args:
+            check: compare the folded components against their outputs before folding.
+            tolerance: max deviation relative to the reference peak (defaults to 1e-4 in fp32, 2e-2 otherwise).
+
+        Returns:
+            Dict of the relative max deviation per component (empty if `check` is False).
+
+        Raises:
+            RuntimeError: if `check` is set and a component deviates more than `tolerance`.
+        """
+        if self._decoder_latent_shift is not None:
+            logger.warning("optimize_for_inference was already applied, skipping.")
+            return {}
+        if self._quantized_components:
+            logger.warning("optimize_for_inference needs the float weights and must run before quantization, skipping.")
+            return {}
+
+        probes = self._folding_probes() if check else {}
+        references = {name: probe() for name, probe in probes.items()}
+
+        scaling_factor = self.model.speech_scaling_factor.float()
+        num_blocks = self.model.acoustic_tokenizer.decoder.fold_for_inference(input_scale=1.0 / scaling_factor)
+        self._decoder_latent_shift = self.model.speech_bias_factor.float() * scaling_factor
+        self.model.acoustic_connector.fold_for_inference()
+        self.model.prediction_head.fuse_adaln_modulation()
+        logger.info(f"Folded {num_blocks} acoustic decoder blocks for inference")
+
+        deviations = {}
+        for name, probe in probes.items():
+            reference = references[name].float()
+            output = probe().float()
+            deviations[name] = ((output - reference).abs().max() / reference.abs().max().clamp_min(1e-6)).item()
+
+        if tolerance is None:
+            tolerance = 1e-4 if self.dtype == torch.float32 else 2e-2
+        failed = {name: deviation for name, deviation in deviations.items() if deviation > tolerance}
+        if failed:
+            raise RuntimeError(
+                f"optimize_for_inference changed the model outputs beyond tolerance {tolerance}: {failed}. "
+                "The weights have been modified, reload the model."
+            )
+        return deviations
+
+    def _precision_stages(self) -> Dict[str, nn.Module]:
+        """Stages addressable by `apply_precision_map`, parents before their nested stages."""
+        return {
+            "language_model": self.model.language_model,
+            "tts_language_model": self.model.tts_language_model,
+            "tts_input_types": self.model.tts_input_types,
+            "acoustic_connector": self.model.acoustic_connector,
+            "prediction_head": self.model.prediction_head,
+            "tts_eos_classifier": self.tts_eos_classifier,
+            "acoustic_decoder": self.model.acoustic_tokenizer.decoder,
+            "acoustic_decoder_head": self.model.acoustic_tokenizer.decoder.head,
+        }
+
+    @torch.no_grad()
+    def apply_precision_map(self, precision_map: Dict[str, torch.dtype]) -> Dict[str, torch.dtype]:
+        """
+        Run each stage of the model in its own dtype, e.g. `CPU_BF16_PRECISION_MAP`.
+
+        Every stage gets a forward pre-hook that casts its floating point inputs to the stage dtype, so
+        stages of different precision chain without changes to `generate`. Load the model in fp32 before
+        downcasting, so the stages kept in fp32 keep their full-precision weights. Voice presets must match
+        the language models, see `cast_prefilled_outputs`.
+
+        Args:
+            precision_map: dtype per stage name (see `_precision_stages`); stages not listed keep their dtype.
+
+        Returns:
+            The resulting dtype of every stage.
+        """
+        stages = self._precision_stages()
+        unknown = set(precision_map) - set(stages)
+        if unknown:
+            raise ValueError(f"Unknown precision stages {sorted(unknown)}, expected a subset of {list(stages)}")
+        quantized = [name for name in self._quantized_components if precision_map.get(name, torch.float32) != torch.float32]
+        if quantized:
+            raise ValueError(f"Quantized stages {quantized} run dynamic int8 kernels with float32 activations and cannot be downcast")
+
+        for handle in self._precision_hooks:
+            handle.remove()
+        self._precision_hooks = []
+
+        for name, module in stages.items():
+            if name in precision_map:
+                module.to(precision_map[name])
+
+        dtypes = {}
+        for name, module in stages.items():
+            dtypes[name] = next(module.parameters()).dtype
+            self._precision_hooks.append(
+                module.register_forward_pre_hook(partial(_cast_floating_inputs, dtype=dtypes[name]), with_kwargs=True)
+            )
+        logger.info(f"Applied precision map: {dtypes}")
+        return dtypes
+
+    def cast_prefilled_outputs(self, all_prefilled_outputs):
+        """Cast the hidden states and KV caches of a voice preset (in place) to the dtype of the matching language model."""
+        dtypes = {
+            "lm": self.model.language_model.dtype,
+            "neg_lm": self.model.language_model.dtype,
+            "tts_lm": self.model.tts_language_model.dtype,
+            "neg_tts_lm": self.model.tts_language_model.dtype,
+        }
+        for key, dtype in dtypes.items():
+            outputs = all_prefilled_outputs.get(key)
+            if outputs is None:
+                continue
+            outputs["last_hidden_state"] = outputs["last_hidden_state"].to(dtype)
+            outputs["past_key_values"] = _cast_past_key_values(outputs["past_key_values"], dtype)
+        return all_prefilled_outputs
+
+    def _compile_targets(self):
+        """(owner, attribute) pairs of the per-token hot path that are compiled by `compile_for_inference`."""
+        targets = []
+        # TTS LM runs at sequence length 1 while generating speech; attention over the growing KV cache stays eager
+        for layer in self.model.tts_language_model.layers:
+            targets.append((layer.mlp, "forward"))
+        # Diffusion head always sees (2 x latent_size) inputs
+        targets.append((self.model.prediction_head, "forward"))
+        # Acoustic decoder: only the stateless FFN halves, streaming cache bookkeeping stays outside the graph
+        for stage in self.model.acoustic_tokenizer.decoder.stages:
+            for block in stage:
+                targets.append((block, "forward_ffn"))
+        return targets
+
+    def _compiled_graph_count(self, decode_chunk_size: int = 1) -> int:
+        """
+        Static graphs the warmup compiles for the most shared code object: all TTS LM MLPs share
+        `Qwen2MLP.forward` (one graph per layer and text window length) and all decoder blocks share
+        `Block1D.forward_ffn` (one graph per block and decode chunk length).
+        """
+        num_mlps = len(self.model.tts_language_model.layers)
+        num_blocks = sum(len(stage) for stage in self.model.acoustic_tokenizer.decoder.stages)
+        return max(num_mlps * TTS_TEXT_WINDOW_SIZE, num_blocks * max(1, decode_chunk_size), 1)
+
+    def compile_for_inference(
+        self,
+        backend: str = "inductor",
+        mode: Optional[str] = None,
+        warmup: bool = True,
+        decode_chunk_size: int = 1,
+    ) -> bool:
+        """
+        Opt-in `torch.compile` of the per-token hot path with static shapes.
+
+        Compiled regions: the TTS LM MLPs, `VibeVoiceDiffusionHead.forward` and the FFN halves of the
+        acoustic decoder blocks. If compilation or the warmup fails, the model falls back to eager mode.
+        Every input length compiles its own graph, so the warmup covers all lengths `generate` produces.
+        These graphs outnumber dynamo's default limit per code object (past which it silently runs
+        eagerly), so the limit is raised to `_compiled_graph_count` while compiling; shapes not covered by
+        the warmup are still bounded by the default limit afterwards.
+
+        Args:
+            backend: `torch.compile` backend (inductor by default, also on CPU).
+            mode: optional `torch.compile` mode, e.g. "max-autotune-no-cudagraphs".
+            warmup: run every compiled region once per input length so compilation does not hit the first requests.
+            decode_chunk_size: largest number of frames per streaming decode call (the `generate` argument).
+
+        Returns:
+            True if the compiled mode is active, False if the model runs eagerly.
+        """
+        if not hasattr(torch, "compile"):
+            logger.warning("torch.compile is not available in this torch version, running eagerly.")
+            return False
+
+        self.disable_compiled_inference()
+        compiled = []
+        try:
+            for owner, name in self._compile_targets():
+                setattr(owner, name, torch.compile(getattr(owner, name), backend=backend, mode=mode, dynamic=False))
+                compiled.append((owner, name))
+            self._compiled_targets = compiled
+            if warmup:
+                self.compile_graph_limit = self._compiled_graph_count(decode_chunk_size)
+                with _raised_recompile_limit(self.compile_graph_limit):
+                    self.warmup_compiled_inference(decode_chunk_size=decode_chunk_size)
+        except Exception as e:
+            logger.warning(f"Compiled inference is unavailable ({type(e).__name__}: {e}), falling back to eager mode.")
+            self.disable_compiled_inference()
+            return False
+        return True
+
+    def disable_compiled_inference(self):
+        """Restore the eager modules replaced by `compile_for_inference`."""
+        for owner, name in getattr(self, "_compiled_targets", []):
+            if name in vars(owner):
+                delattr(owner, name)
+        self._compiled_targets = []
+
+    @torch.no_grad()
+    def warmup_compiled_inference(self, num_frames: int = 3, decode_chunk_size: int = 1):
+        """
+        Trace every compiled region with the shapes seen during streaming generation: every text window
+        length (the last window of a text is shorter) and every decode chunk length up to `decode_chunk_size`
+        (the latents flushed at the end of a generation are fewer).
+        """
+        hidden_size = self.config.decoder_config.hidden_size
+        lm_device = self.model.tts_language_model.device
+        lm_dtype = self.model.tts_language_model.dtype
+        for layer in self.model.tts_language_model.layers:
+            for seq_len in range(1, TTS_TEXT_WINDOW_SIZE + 1):
+                layer.mlp(torch.zeros(1, seq_len, hidden_size, device=lm_device, dtype=lm_dtype))
+
+        condition = torch.zeros(1, hidden_size, device=self.model.prediction_head.device, dtype=self.model.prediction_head.dtype)
+        generator = torch.Generator(device="cpu").manual_seed(0)
+        for _ in range(2):
+            speech_latent = self.sample_speech_tokens(condition, condition, cfg_scale=1.5, generator=generator)
+
+        tokenizer = self.model.acoustic_tokenizer
+        sample_indices = torch.zeros(1, dtype=torch.long, device=tokenizer.device)
+        latent = speech_latent.unsqueeze(1).to(device=tokenizer.device, dtype=tokenizer.dtype)
+        for chunk_size in range(1, max(1, decode_chunk_size) + 1):
+            cache = VibeVoiceTokenizerStreamingCache()
+            latents = latent.expand(-1, chunk_size, -1)
+            for _ in range(num_frames):
+                tokenizer.decode(latents, cache=cache, sample_indices=sample_indices, use_cache=True)
+
     # @can_return_tuple
     def forward_lm(
         self,
@@ -427,12 +751,34 @@ class VibeVoiceStreamingForConditionalGenerationInference(VibeVoiceStreamingPreT
             cfg_scale: Classifier-free guidance scale for speech diffusion.
             return_speech: If False, skips audio decode concatenation.
             stop_check_fn: External early-stop hook (returns True to halt).
+            generator: Optional `torch.Generator` used for all diffusion noise (initial and SDE noise).
+                Keep it on CPU to get the same noise on every device.
+            seed: Convenience alternative to `generator`; a CPU generator is created from it.
+            pregenerate_noise: If True, draws the noise of a whole speech window in a single call
+                instead of 1 + `ddpm_inference_steps` small calls per speech token.
+            inference_steps: Diffusion steps per speech token for this call (default: `ddpm_inference_steps`).
+                Unlike `set_ddpm_inference_steps`, it does not change the model, so concurrent calls on a
+                shared model can use different step counts.
+            decode_chunk_size: Number of speech latents accumulated before one streaming decode call
+                (default 1, one 133 ms frame per call). Larger values add up to `decode_chunk_size - 1`
+                frames of latency in exchange for fewer, larger decoder calls.
+            decode_first_chunk_immediately: If True (default), the first latent is decoded on its own so
+                the time to first audio does not depend on `decode_chunk_size`.
+            defer_decode: If True, no streaming decode happens during generation; the whole utterance is
+                decoded in one non-streaming pass at the end (for file rendering and batch jobs). The
+                audio streamer, if any, receives it as a single chunk.
+            offline_decode_chunk_size: With `defer_decode`, decode in chunks of this many frames
+                (with overlapping context) to bound memory.
+            acoustic_decoder: Optional `BatchedAcousticDecoder` shared by concurrent `generate` calls. Streaming
+                decode then goes through it and is batched with the other sessions instead of running a
+                batch-1 decoder forward here.
 
         Returns:
             VibeVoiceGenerationOutput with:
               - sequences: final token ids
               - speech_outputs: list of concatenated audio tensors (or None)
               - reach_max_step_sample: flags for samples stopped by max length
+              - speech_latents: list of generated latents per sample (or None)
         """
         # 1. Handle `generation_config` and kwargs that might update it, and validate the `.generate()` call
         tokenizer = kwargs.pop("tokenizer", None)
@@ -444,6 +790,21 @@ class VibeVoiceStreamingForConditionalGenerationInference(VibeVoiceStreamingPreT
         all_prefilled_outputs = kwargs.pop("all_prefilled_outputs", None)
         tts_text_ids = tts_text_ids.to(self.device)
 
+        # Per-request RNG for diffusion noise, so concurrent requests do not share the global RNG
+        generator = kwargs.pop("generator", None)
+        seed = kwargs.pop("seed", None)
+        if generator is None and seed is not None:
+            generator = torch.Generator(device="cpu").manual_seed(int(seed))
+        pregenerate_noise = kwargs.pop("pregenerate_noise", False)
+        inference_steps = kwargs.pop("inference_steps", None) or self.ddpm_inference_steps
+
+        # Decode granularity: latents are accumulated and decoded `decode_chunk_size` at a time
+        decode_chunk_size = max(1, int(kwargs.pop("decode_chunk_size", 1)))
+        decode_first_chunk_immediately = kwargs.pop("decode_first_chunk_immediately", True)
+        defer_decode = kwargs.pop("defer_decode", False)
+        offline_decode_chunk_size = kwargs.pop("offline_decode_chunk_size", None)
+        acoustic_decoder = kwargs.pop("acoustic_decoder", None)
+
         if kwargs.get('max_new_tokens', None) is None:
             kwargs['max_new_tokens'] = self.config.decoder_config.max_position_embeddings - tts_lm_input_ids.shape[-1]
 
@@ -479,206 +840,257 @@ class VibeVoiceStreamingForConditionalGenerationInference(VibeVoiceStreamingPreT
         )
 
         acoustic_cache = VibeVoiceTokenizerStreamingCache()
-        batch_size = input_ids.shape[0]
-        assert batch_size == 1, "Currently only supports batch size == 1"
-        device = input_ids.device
-        finished_tags = torch.zeros(batch_size, dtype=torch.bool, device=device)
-        verbose = kwargs.get("verbose", False)
-
-        # Initialize audio chunks storage for each sample
-        audio_chunks = [[] for _ in range(batch_size)]
-        tts_text_window_index = 0
-        reach_max_step_sample = torch.zeros(batch_size, dtype=torch.bool, device=device)
-        first_text_window_size = TTS_TEXT_WINDOW_SIZE if tts_text_ids.shape[1] >= TTS_TEXT_WINDOW_SIZE else tts_text_ids.shape[1]
-
-        outputs = all_prefilled_outputs["lm"]
-        tts_lm_outputs = all_prefilled_outputs["tts_lm"]
-        negative_outputs = all_prefilled_outputs["neg_lm"]
-        tts_lm_negative_outputs = all_prefilled_outputs["neg_tts_lm"]
-
-        model_kwargs = _update_model_kwargs_for_generation(
-            outputs, model_kwargs, num_new_tokens=first_text_window_size,
-        )
-        tts_lm_model_kwargs = _update_model_kwargs_for_generation(
-            tts_lm_outputs, tts_lm_model_kwargs, num_new_tokens=first_text_window_size,
-        )
-        negative_model_kwargs = self._update_model_kwargs_for_generation(
-            negative_outputs, negative_model_kwargs, is_encoder_decoder=False,
-        )
-        tts_lm_negative_model_kwargs = self._update_model_kwargs_for_generation(
-            tts_lm_negative_outputs, tts_lm_negative_model_kwargs, is_encoder_decoder=False,
-        )
+        decoder_session = acoustic_decoder.open_session() if acoustic_decoder is not None else None
+        try:
+            batch_size = input_ids.shape[0]
+            assert batch_size == 1, "Currently only supports batch size == 1"
+            device = input_ids.device
+            finished_tags = torch.zeros(batch_size, dtype=torch.bool, device=device)
+            verbose = kwargs.get("verbose", False)
+
+            # Initialize audio chunks storage for each sample
+            audio_chunks = [[] for _ in range(batch_size)]
+            speech_latents = [[] for _ in range(batch_size)]
+            pending_latents = []
+            decoded_first_chunk = False
+            stopped_externally = False
+
+            def flush_pending_latents(sample_indices):
+                if not pending_latents:
+                    return
+                audio_chunk = self._decode_speech_latents(
+                    pending_latents, acoustic_cache, sample_indices,
+                    acoustic_decoder=acoustic_decoder, decoder_session=decoder_session,
+                )
+                pending_latents.clear()
 
-        step = tts_lm_input_ids.shape[1]
-        total_generated_speech_tokens = 0
-        total_prefilled_text_tokens = 0
-        if kwargs.get("show_progress_bar", True):
-            progress_bar = tqdm(
-                total=tts_lm_generation_config.max_length,
-                desc=f"Prefilled {step} tokens, current step ({step} / {tts_lm_generation_config.max_length})",
-                initial=step,
-                leave=False
-            )
-        else:
-            progress_bar = None
-
-        while True:
-            # Check for external stop signal
-            if stop_check_fn is not None and stop_check_fn():
-                if verbose:
-                    print(f"Generation stopped externally at step {step + 1}")
-                # End the audio streamer if it exists
-                if audio_streamer is not None:
-                    audio_streamer.end()
-                break
-            
-            # # Check if audio_streamer has been ended (stopped externally)
-            # if audio_streamer is not None and hasattr(audio_streamer, 'finished_flags'):
-            #     if any(audio_streamer.finished_flags):
-            #         if verbose:
-            #             print(f"Audio generation stopped externally at step {step + 1}")
-            #         break
-            
-            if finished_tags.all():
-                if hasattr(progress_bar, 'set_description'):
-                    progress_bar.set_description("Generation complete")
-                break
+                # Store audio chunks for each sample
+                for i, sample_idx in enumerate(sample_indices):
+                    audio_chunks[sample_idx.item()].append(audio_chunk[i])
 
-            cur_input_tts_text_ids = tts_text_ids[:, tts_text_window_index*TTS_TEXT_WINDOW_SIZE:(tts_text_window_index+1)*TTS_TEXT_WINDOW_SIZE]
-            next_text_window_size = tts_text_ids[:, (tts_text_window_index+1)*TTS_TEXT_WINDOW_SIZE:(tts_text_window_index+2)*TTS_TEXT_WINDOW_SIZE].shape[1]
-            tts_text_window_index += 1
+                # Add streaming support here
+                if audio_streamer is not None:
+                    # Stream the audio chunks immediately; a bounded streamer may block here until its consumer
+                    # catches up, the shared decoder must not hold other sessions' batches for it meanwhile
+                    if acoustic_decoder is not None:
+                        with acoustic_decoder.idle(decoder_session):
+                            audio_streamer.put(audio_chunk, sample_indices)
+                    else:
+                        audio_streamer.put(audio_chunk, sample_indices)
+
+            tts_text_window_index = 0
+            reach_max_step_sample = torch.zeros(batch_size, dtype=torch.bool, device=device)
+            first_text_window_size = TTS_TEXT_WINDOW_SIZE if tts_text_ids.shape[1] >= TTS_TEXT_WINDOW_SIZE else tts_text_ids.shape[1]
+
+            outputs = all_prefilled_outputs["lm"]
+            tts_lm_outputs = all_prefilled_outputs["tts_lm"]
+            negative_outputs = all_prefilled_outputs["neg_lm"]
+            tts_lm_negative_outputs = all_prefilled_outputs["neg_tts_lm"]
+
+            model_kwargs = _update_model_kwargs_for_generation(
+                outputs, model_kwargs, num_new_tokens=first_text_window_size,
+            )
+            tts_lm_model_kwargs = _update_model_kwargs_for_generation(
+                tts_lm_outputs, tts_lm_model_kwargs, num_new_tokens=first_text_window_size,
+            )
+            negative_model_kwargs = self._update_model_kwargs_for_generation(
+                negative_outputs, negative_model_kwargs, is_encoder_decoder=False,
+            )
+            tts_lm_negative_model_kwargs = self._update_model_kwargs_for_generation(
+                tts_lm_negative_outputs, tts_lm_negative_model_kwargs, is_encoder_decoder=False,
+            )
 
-            if cur_input_tts_text_ids.shape[1] > 0:
-                input_ids = torch.cat([input_ids, cur_input_tts_text_ids], dim=-1)
-                tts_lm_input_ids = torch.cat([tts_lm_input_ids, cur_input_tts_text_ids], dim=-1)
+            step = tts_lm_input_ids.shape[1]
+            total_generated_speech_tokens = 0
+            total_prefilled_text_tokens = 0
+            if kwargs.get("show_progress_bar", True):
+                progress_bar = tqdm(
+                    total=tts_lm_generation_config.max_length,
+                    desc=f"Prefilled {step} tokens, current step ({step} / {tts_lm_generation_config.max_length})",
+                    initial=step,
+                    leave=False
+                )
+            else:
+                progress_bar = None
 
-                if tts_lm_input_ids.shape[1] > tts_lm_generation_config.max_length:
+            while True:
+                # Check for external stop signal
+                if stop_check_fn is not None and stop_check_fn():
+                    stopped_externally = True
                     if verbose:
-                        print(f"Reached maximum generation length {generation_config.max_length}, stopped it.")
-                    reached_samples = torch.arange(batch_size, device=device)[~finished_tags]
-                    if reached_samples.numel() > 0:
-                        reach_max_step_sample[reached_samples] = True
+                        print(f"Generation stopped externally at step {step + 1}")
+                    # End the audio streamer if it exists
+                    if audio_streamer is not None:
+                        audio_streamer.end()
                     break
+            
+                # # Check if audio_streamer has been ended (stopped externally)
+                # if audio_streamer is not None and hasattr(audio_streamer, 'finished_flags'):
+                #     if any(audio_streamer.finished_flags):
+                #         if verbose:
+                #             print(f"Audio generation stopped externally at step {step + 1}")
+                #         break
+            
+                if finished_tags.all():
+                    if hasattr(progress_bar, 'set_description'):
+                        progress_bar.set_description("Generation complete")
+                    break
+
+                cur_input_tts_text_ids = tts_text_ids[:, tts_text_window_index*TTS_TEXT_WINDOW_SIZE:(tts_text_window_index+1)*TTS_TEXT_WINDOW_SIZE]
+                next_text_window_size = tts_text_ids[:, (tts_text_window_index+1)*TTS_TEXT_WINDOW_SIZE:(tts_text_window_index+2)*TTS_TEXT_WINDOW_SIZE].shape[1]
+                tts_text_window_index += 1
+
+                if cur_input_tts_text_ids.shape[1] > 0:
+                    input_ids = torch.cat([input_ids, cur_input_tts_text_ids], dim=-1)
+                    tts_lm_input_ids = torch.cat([tts_lm_input_ids, cur_input_tts_text_ids], dim=-1)
+
+                    if tts_lm_input_ids.shape[1] > tts_lm_generation_config.max_length:
+                        if verbose:
+                            print(f"Reached maximum generation length {generation_config.max_length}, stopped it.")
+                        reached_samples = torch.arange(batch_size, device=device)[~finished_tags]
+                        if reached_samples.numel() > 0:
+                            reach_max_step_sample[reached_samples] = True
+                        break
                 
-                step += cur_input_tts_text_ids.shape[1]
-                total_prefilled_text_tokens += cur_input_tts_text_ids.shape[1]
-                if progress_bar is not None:
-                    progress_bar.update(cur_input_tts_text_ids.shape[1])
-                    progress_bar.set_description(f"Prefilled {total_prefilled_text_tokens} text tokens, generated {total_generated_speech_tokens} speech tokens, current step ({step} / {tts_lm_generation_config.max_length})")
-
-                model_inputs = self.prepare_inputs_for_generation(input_ids, **model_kwargs)
-                # Forward pass through the model
-                outputs = self.forward_lm(
-                    **model_inputs, return_dict=True, output_attentions=False, output_hidden_states=False,
-                )
-                model_kwargs = _update_model_kwargs_for_generation(
-                    outputs, model_kwargs, num_new_tokens=next_text_window_size,
-                )
+                    step += cur_input_tts_text_ids.shape[1]
+                    total_prefilled_text_tokens += cur_input_tts_text_ids.shape[1]
+                    if progress_bar is not None:
+                        progress_bar.update(cur_input_tts_text_ids.shape[1])
+                        progress_bar.set_description(f"Prefilled {total_prefilled_text_tokens} text tokens, generated {total_generated_speech_tokens} speech tokens, current step ({step} / {tts_lm_generation_config.max_length})")
+
+                    model_inputs = self.prepare_inputs_for_generation(input_ids, **model_kwargs)
+                    # Forward pass through the model
+                    outputs = self.forward_lm(
+                        **model_inputs, return_dict=True, output_attentions=False, output_hidden_states=False,
+                    )
+                    model_kwargs = _update_model_kwargs_for_generation(
+                        outputs, model_kwargs, num_new_tokens=next_text_window_size,
+                    )
 
-                tts_lm_model_inputs = self.prepare_inputs_for_generation(tts_lm_input_ids, **tts_lm_model_kwargs)
-                tts_lm_additional_inputs = {
-                    "tts_text_masks": torch.ones_like(tts_lm_input_ids[:, -1:]),
-                    "lm_last_hidden_state": outputs.last_hidden_state,
-                }
-                # Forward pass through the model
-                tts_lm_outputs = self.forward_tts_lm(
-                    **tts_lm_model_inputs, **tts_lm_additional_inputs, return_dict=True, output_attentions=False, output_hidden_states=False,
-                )
-                tts_lm_model_kwargs = self._update_model_kwargs_for_generation(
-                    tts_lm_outputs, tts_lm_model_kwargs, is_encoder_decoder=False,
-                )
+                    tts_lm_model_inputs = self.prepare_inputs_for_generation(tts_lm_input_ids, **tts_lm_model_kwargs)
+                    tts_lm_additional_inputs = {
+                        "tts_text_masks": torch.ones_like(tts_lm_input_ids[:, -1:]),
+                        "lm_last_hidden_state": outputs.last_hidden_state,
+                    }
+                    # Forward pass through the model
+                    tts_lm_outputs = self.forward_tts_lm(
+                        **tts_lm_model_inputs, **tts_lm_additional_inputs, return_dict=True, output_attentions=False, output_hidden_states=False,
+                    )
+                    tts_lm_model_kwargs = self._update_model_kwargs_for_generation(
+                        tts_lm_outputs, tts_lm_model_kwargs, is_encoder_decoder=False,
+                    )
 
-            diffusion_indices = torch.LongTensor([0])
-            for cur_speech_index in range(TTS_SPEECH_WINDOW_SIZE):
-                positive_condition = tts_lm_outputs.last_hidden_state[diffusion_indices, -1, :]
-                negative_condition = tts_lm_negative_outputs.last_hidden_state[diffusion_indices, -1, :]
+                diffusion_indices = torch.LongTensor([0])
+                if pregenerate_noise:
+                    window_noise, window_variance_noise = self._sample_window_noise(
+                        TTS_SPEECH_WINDOW_SIZE, 2 * len(diffusion_indices), generator=generator,
+                        inference_steps=inference_steps,
+                    )
+                for cur_speech_index in range(TTS_SPEECH_WINDOW_SIZE):
+                    positive_condition = tts_lm_outputs.last_hidden_state[diffusion_indices, -1, :]
+                    negative_condition = tts_lm_negative_outputs.last_hidden_state[diffusion_indices, -1, :]
                 
-                speech_latent = self.sample_speech_tokens(
-                    positive_condition,
-                    negative_condition,
-                    cfg_scale=cfg_scale,
-                ).unsqueeze(1)
+                    speech_latent = self.sample_speech_tokens(
+                        positive_condition,
+                        negative_condition,
+                        cfg_scale=cfg_scale,
+                        generator=generator,
+                        inference_steps=inference_steps,
+                        noise=window_noise[cur_speech_index] if pregenerate_noise else None,
+                        variance_noise=(
+                            window_variance_noise[cur_speech_index]
+                            if pregenerate_noise and window_variance_noise is not None else None
+                        ),
+                    ).unsqueeze(1)
                                 
-                # Decode acoustic latent to audio using acoustic streaming cache
-                scaled_latent = speech_latent / self.model.speech_scaling_factor.to(speech_latent.device) - self.model.speech_bias_factor.to(speech_latent.device)
-                audio_chunk = self.model.acoustic_tokenizer.decode(
-                    scaled_latent.to(self.model.acoustic_tokenizer.device),
-                    cache=acoustic_cache,  # Use acoustic-specific cache
-                    sample_indices=diffusion_indices.to(self.model.acoustic_tokenizer.device),
-                    use_cache=True,
-                    debug=False
-                )
-                
-                # Store audio chunks for each sample
-                for i, sample_idx in enumerate(diffusion_indices):
-                    idx = sample_idx.item()
-                    # Only append audio chunk if the sample is not finished
-                    if not finished_tags[idx]:
-                        audio_chunks[idx].append(audio_chunk[i])
-
-                 # Add streaming support here
-                if audio_streamer is not None:
-                    # Stream the audio chunks immediately
-                    audio_streamer.put(audio_chunk, diffusion_indices)
-
-                acoustic_embed = self.model.acoustic_connector(speech_latent)
-                tts_lm_input_ids = torch.cat([tts_lm_input_ids, torch.ones_like(tts_lm_input_ids[:, -1:])], dim=-1)
-
-                if tts_lm_input_ids.shape[1] > tts_lm_generation_config.max_length:
-                    break
+                    # Decode acoustic latents to audio using acoustic streaming cache, `decode_chunk_size` at a time.
+                    # Only latents of unfinished samples are kept and decoded
+                    if not finished_tags[diffusion_indices].all():
+                        for i, sample_idx in enumerate(diffusion_indices):
+                            speech_latents[sample_idx.item()].append(speech_latent[i])
+                    if not defer_decode and not finished_tags[diffusion_indices].all():
+                        pending_latents.append(speech_latent)
+                        if len(pending_latents) >= decode_chunk_size or (decode_first_chunk_immediately and not decoded_first_chunk):
+                            flush_pending_latents(diffusion_indices)
+                            decoded_first_chunk = True
+
+                    acoustic_embed = self.model.acoustic_connector(speech_latent)
+                    tts_lm_input_ids = torch.cat([tts_lm_input_ids, torch.ones_like(tts_lm_input_ids[:, -1:])], dim=-1)
+
+                    if tts_lm_input_ids.shape[1] > tts_lm_generation_config.max_length:
+                        break
                 
-                step += 1
-                total_generated_speech_tokens += 1
-                if progress_bar is not None:
-                    progress_bar.update(1)
-                    progress_bar.set_description(f"Prefilled {total_prefilled_text_tokens} text tokens, generated {total_generated_speech_tokens} speech tokens, current step ({step} / {tts_lm_generation_config.max_length})")
-
-                tts_lm_model_inputs = self.prepare_inputs_for_generation(tts_lm_input_ids, **tts_lm_model_kwargs)
-                tts_lm_additional_inputs = {
-                    "tts_text_masks": torch.zeros_like(tts_lm_input_ids[:, -1:]),
-                    "lm_last_hidden_state": acoustic_embed,
-                }
-                # Forward pass through the model
-                tts_lm_outputs = self.forward_tts_lm(
-                    **tts_lm_model_inputs, **tts_lm_additional_inputs, return_dict=True, output_attentions=False, output_hidden_states=False,
-                )
-                if cur_speech_index == TTS_SPEECH_WINDOW_SIZE - 1 and next_text_window_size > 0:
-                    tts_lm_model_kwargs = _update_model_kwargs_for_generation(
-                        tts_lm_outputs, tts_lm_model_kwargs, num_new_tokens=next_text_window_size,
+                    step += 1
+                    total_generated_speech_tokens += 1
+                    if progress_bar is not None:
+                        progress_bar.update(1)
+                        progress_bar.set_description(f"Prefilled {total_prefilled_text_tokens} text tokens, generated {total_generated_speech_tokens} speech tokens, current step ({step} / {tts_lm_generation_config.max_length})")
+
+                    tts_lm_model_inputs = self.prepare_inputs_for_generation(tts_lm_input_ids, **tts_lm_model_kwargs)
+                    tts_lm_additional_inputs = {
+                        "tts_text_masks": torch.zeros_like(tts_lm_input_ids[:, -1:]),
+                        "lm_last_hidden_state": acoustic_embed,
+                    }
+                    # Forward pass through the model
+                    tts_lm_outputs = self.forward_tts_lm(
+                        **tts_lm_model_inputs, **tts_lm_additional_inputs, return_dict=True, output_attentions=False, output_hidden_states=False,
                     )
-                else:
-                    tts_lm_model_kwargs = self._update_model_kwargs_for_generation(
-                        tts_lm_outputs, tts_lm_model_kwargs, is_encoder_decoder=False,
+                    if cur_speech_index == TTS_SPEECH_WINDOW_SIZE - 1 and next_text_window_size > 0:
+                        tts_lm_model_kwargs = _update_model_kwargs_for_generation(
+                            tts_lm_outputs, tts_lm_model_kwargs, num_new_tokens=next_text_window_size,
+                        )
+                    else:
+                        tts_lm_model_kwargs = self._update_model_kwargs_for_generation(
+                            tts_lm_outputs, tts_lm_model_kwargs, is_encoder_decoder=False,
+                        )
+
+                    tts_lm_negative_input_ids = torch.cat([tts_lm_negative_input_ids, torch.ones_like(tts_lm_input_ids[:, -1:])], dim=-1)
+                    tts_lm_negative_model_inputs = self.prepare_inputs_for_generation(tts_lm_negative_input_ids, **tts_lm_negative_model_kwargs)
+                    # Forward negative pass through the model
+                    tts_lm_negative_additional_inputs = {
+                        "tts_text_masks": torch.zeros_like(tts_lm_negative_input_ids[:, -1:]),
+                        "lm_last_hidden_state": acoustic_embed,
+                    }
+                    tts_lm_negative_outputs = self.forward_tts_lm(
+                        **tts_lm_negative_model_inputs, **tts_lm_negative_additional_inputs, return_dict=True, output_attentions=False, output_hidden_states=False,
+                    )
+                    tts_lm_negative_model_kwargs = self._update_model_kwargs_for_generation(
+                        tts_lm_negative_outputs, tts_lm_negative_model_kwargs, is_encoder_decoder=False,
                     )
 
-                tts_lm_negative_input_ids = torch.cat([tts_lm_negative_input_ids, torch.ones_like(tts_lm_input_ids[:, -1:])], dim=-1)
-                tts_lm_negative_model_inputs = self.prepare_inputs_for_generation(tts_lm_negative_input_ids, **tts_lm_negative_model_kwargs)
-                # Forward negative pass through the model
-                tts_lm_negative_additional_inputs = {
-                    "tts_text_masks": torch.zeros_like(tts_lm_negative_input_ids[:, -1:]),
-                    "lm_last_hidden_state": acoustic_embed,
-                }
-                tts_lm_negative_outputs = self.forward_tts_lm(
-                    **tts_lm_negative_model_inputs, **tts_lm_negative_additional_inputs, return_dict=True, output_attentions=False, output_hidden_states=False,
-                )
-                tts_lm_negative_model_kwargs = self._update_model_kwargs_for_generation(
-                    tts_lm_negative_outputs, tts_lm_negative_model_kwargs, is_encoder_decoder=False,
-                )
+                    tts_eos_logits = torch.sigmoid(self.tts_eos_classifier(tts_lm_outputs.last_hidden_state[diffusion_indices, -1, :]))
+                    if tts_eos_logits[0].item() > 0.5:
+                        # If EOS token is predicted, we can stop generation for this sample
+                        flush_pending_latents(diffusion_indices)
+                        finished_tags[diffusion_indices] = True
+                        if audio_streamer is not None and not defer_decode:
+                            audio_streamer.end(diffusion_indices)
 
-                tts_eos_logits = torch.sigmoid(self.tts_eos_classifier(tts_lm_outputs.last_hidden_state[diffusion_indices, -1, :]))
-                if tts_eos_logits[0].item() > 0.5:
-                    # If EOS token is predicted, we can stop generation for this sample
-                    finished_tags[diffusion_indices] = True
-                    if audio_streamer is not None:
-                        audio_streamer.end(diffusion_indices)
+                if tts_lm_input_ids.shape[1] > tts_lm_generation_config.max_length:
+                    if verbose:
+                        print(f"Reached maximum generation length {tts_lm_generation_config.max_length}, stopped it.")
+                    reached_samples = torch.arange(batch_size, device=device)[~finished_tags]
+                    if reached_samples.numel() > 0:
+                        reach_max_step_sample[reached_samples] = True
+                    break
 
-            if tts_lm_input_ids.shape[1] > tts_lm_generation_config.max_length:
-                if verbose:
-                    print(f"Reached maximum generation length {tts_lm_generation_config.max_length}, stopped it.")
-                reached_samples = torch.arange(batch_size, device=device)[~finished_tags]
-                if reached_samples.numel() > 0:
-                    reach_max_step_sample[reached_samples] = True
-                break
+            # Decode the latents still pending at max length (an external stop drops them)
+            if not stopped_externally:
+                flush_pending_latents(torch.arange(batch_size))
+        finally:
+            # Also on errors: a leaked session would hold its cache row and stall every later batch
+            if acoustic_decoder is not None:
+                acoustic_decoder.close_session(decoder_session)
+
+        final_speech_latents = [torch.cat(latents, dim=0) if latents else None for latents in speech_latents]
+        if defer_decode and not stopped_externally and (return_speech or audio_streamer is not None):
+            for idx, latents in enumerate(final_speech_latents):
+                if latents is None:
+                    continue
+                audio = self.decode_speech_latents(latents, chunk_size=offline_decode_chunk_size)
+                audio_chunks[idx].append(audio[0])
+                if audio_streamer is not None:
+                    audio_streamer.put(audio, torch.tensor([idx]))
 
         if audio_streamer is not None:
             audio_streamer.end()
@@ -701,21 +1113,144 @@ class VibeVoiceStreamingForConditionalGenerationInference(VibeVoiceStreamingPreT
             sequences=tts_lm_input_ids,
             speech_outputs=final_audio_outputs if return_speech else None,
             reach_max_step_sample=reach_max_step_sample,
+            speech_latents=final_speech_latents,
+        )
+
+    def save_speech_latents(self, path, speech_latents, metadata=None, dtype=torch.float32):
+        """
+        Save latents returned by `generate` with this model's latent normalization, so they can be decoded
+        later (e.g. by `vibevoice/scripts/decode_latents.py`) without the language model.
+        """
+        return save_speech_latents(
+            path,
+            speech_latents,
+            self.model.speech_scaling_factor.item(),
+            self.model.speech_bias_factor.item(),
+            hop_length=math.prod(self.model.acoustic_tokenizer.config.decoder_ratios),
+            metadata=metadata,
+            dtype=dtype,
+        )
+
+    @torch.no_grad()
+    def decode_speech_latents(self, speech_latents, chunk_size=None, overlap=64):
+        """
+        Decode whole utterances of speech latents in one non-streaming acoustic decoder pass.
+
+        The decoder is causal with constant padding, so this matches the streaming decode of `generate`
+        without any cache traffic.
+
+        Args:
+            speech_latents: `[frames, latent_dim]` or `[batch, frames, latent_dim]` latents, as returned in
+                `VibeVoiceGenerationOutput.speech_latents`.
+            chunk_size: Optional number of frames per decoder call, to bound activation memory.
+            overlap: Frames of left context decoded with each chunk when `chunk_size` is set.
+
+        Returns:
+            Audio of shape `[batch, 1, frames * hop_length]`.
+        """
+        if speech_latents.dim() == 2:
+            speech_latents = speech_latents.unsqueeze(0)
+        scaled_latents = self._prepare_latent_for_decode(speech_latents)
+        return self.model.acoustic_tokenizer.decode_in_chunks(
+            scaled_latents.transpose(1, 2), chunk_size=chunk_size, overlap=overlap,
+        )
+
+    def _decode_speech_latents(self, speech_latents, acoustic_cache, sample_indices, acoustic_decoder=None, decoder_session=None):
+        """
+        Decode consecutive speech latents in one streaming call of the acoustic decoder.
+
+        Args:
+            speech_latents: List of `[batch, 1, latent_dim]` latents, in generation order.
+            acoustic_cache: `VibeVoiceTokenizerStreamingCache` carrying the decoder state across calls.
+            sample_indices: Cache slots of the batch rows.
+            acoustic_decoder: Optional shared `BatchedAcousticDecoder`; `decoder_session` is then the
+                session of this generation and `acoustic_cache` is not used.
+
+        Returns:
+            Audio of shape `[batch, 1, len(speech_latents) * hop_length]`.
+        """
+        scaled_latents = self._prepare_latent_for_decode(torch.cat(speech_latents, dim=1))
+        if acoustic_decoder is not None:
+            return acoustic_decoder.decode(decoder_session, scaled_latents.transpose(1, 2))
+        return self.model.acoustic_tokenizer.decode(
+            scaled_latents.transpose(1, 2),  # [batch, latent_dim, frames]
+            cache=acoustic_cache,  # Use acoustic-specific cache
+            sample_indices=sample_indices.to(self.model.acoustic_tokenizer.device),
+            use_cache=True,
+            debug=False
+        )
+
+    def _prepare_latent_for_decode(self, speech_latent):
+        """Undo the latent normalization before the acoustic decoder (the scale is folded into it by `optimize_for_inference`)."""
+        if self._decoder_latent_shift is not None:
+            scaled_latent = speech_latent - self._decoder_latent_shift.to(speech_latent)
+        else:
+            scaled_latent = speech_latent / self.model.speech_scaling_factor.to(speech_latent.device) - self.model.speech_bias_factor.to(speech_latent.device)
+        return scaled_latent.to(self.model.acoustic_tokenizer.device)
+
+    def _uses_sde_noise(self, scheduler=None):
+        scheduler = scheduler if scheduler is not None else self.model.noise_scheduler
+        return scheduler.config.algorithm_type in ["sde-dpmsolver", "sde-dpmsolver++"]
+
+    def _sample_window_noise(self, num_tokens, batch_size, generator=None, inference_steps=None):
+        """
+        Draw the diffusion noise for `num_tokens` speech tokens in a single RNG call.
+
+        Returns:
+            Tuple of initial noise `(num_tokens, batch_size, D)` and SDE noise
+            `(num_tokens, inference_steps, batch_size, D)` (None if the solver is deterministic).
+        """
+        inference_steps = inference_steps or self.ddpm_inference_steps
+        num_draws = 1 + (inference_steps if self._uses_sde_noise() else 0)
+        noise = torch.randn(
+            num_tokens, num_draws, batch_size, self.config.acoustic_vae_dim,
+            generator=generator, device=generator.device if generator is not None else None,
         )
+        variance_noise = noise[:, 1:] if num_draws > 1 else None
+        return noise[:, 0], variance_noise
 
     @torch.no_grad()
-    def sample_speech_tokens(self, condition, neg_condition, cfg_scale=3.0):
-        self.model.noise_scheduler.set_timesteps(self.ddpm_inference_steps)
-        condition = torch.cat([condition, neg_condition], dim=0).to(self.model.prediction_head.device)
-        speech = torch.randn(condition.shape[0], self.config.acoustic_vae_dim).to(condition)
-        for t in self.model.noise_scheduler.timesteps:
+    def sample_speech_tokens(self, condition, neg_condition, cfg_scale=3.0, generator=None, noise=None, variance_noise=None,
+                             inference_steps=None):
+        """
+        Sample one speech latent per sample with classifier-free guided diffusion.
+
+        Args:
+            condition: (B, H) positive condition (TTS LM hidden state).
+            neg_condition: (B, H) negative condition.
+            cfg_scale: classifier-free guidance scale.
+            generator: optional `torch.Generator` for the initial and SDE noise.
+            noise: optional pre-drawn initial noise of shape (2B, D).
+            variance_noise: optional pre-drawn SDE noise of shape (inference_steps, 2B, D).
+            inference_steps: diffusion steps (default: `ddpm_inference_steps`).
+
+        Returns:
+            (B, D) speech latents.
+        """
+        # Per-call scheduler so concurrent requests do not share the multistep solver state
+        noise_scheduler = copy.copy(self.model.noise_scheduler)
+        noise_scheduler.set_timesteps(inference_steps or self.ddpm_inference_steps)
+        condition = torch.cat([condition, neg_condition], dim=0).to(
+            device=self.model.prediction_head.device, dtype=self.model.prediction_head.dtype,
+        )
+        if noise is None:
+            noise = torch.randn(
+                condition.shape[0], self.config.acoustic_vae_dim,
+                generator=generator, device=generator.device if generator is not None else None,
+            )
+        speech = noise.to(condition)
+        for i, t in enumerate(noise_scheduler.timesteps):
             half = speech[: len(speech) // 2]
             combined = torch.cat([half, half], dim=0)
             eps = self.model.prediction_head(combined, t.repeat(combined.shape[0]).to(combined), condition=condition)
             cond_eps, uncond_eps = torch.split(eps, len(eps) // 2, dim=0)
             half_eps = uncond_eps + cfg_scale * (cond_eps - uncond_eps)
             eps = torch.cat([half_eps, half_eps], dim=0)
-            speech = self.model.noise_scheduler.step(eps, t, speech).prev_sample
+            speech = noise_scheduler.step(
+                eps, t, speech,
+                generator=generator,
+                variance_noise=variance_noise[i] if variance_noise is not None else None,
+            ).prev_sample
         return speech[: len(speech) // 2]
     
 
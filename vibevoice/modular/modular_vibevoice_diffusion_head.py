@@ -155,8 +155,10 @@ class HeadLayer(nn.Module):
             nn.Linear(cond_dim, 3 * self.embed_dim, bias=False)
         )
 
-    def forward(self, x, c):
-        shift_ffn, scale_ffn, gate_ffn = self.adaLN_modulation(c).chunk(3, dim=-1)
+    def forward(self, x, c, modulation=None):
+        if modulation is None:
+            modulation = self.adaLN_modulation(c)
+        shift_ffn, scale_ffn, gate_ffn = modulation.chunk(3, dim=-1)
         x = x + gate_ffn * self.ffn(modulate(self.norm(x), shift_ffn, scale_ffn))
         return x
 
@@ -181,8 +183,10 @@ class FinalLayer(nn.Module):
             nn.Linear(cond_size, 2 * hidden_size, bias=False)
         )
 
-    def forward(self, x, c):
-        shift, scale = self.adaLN_modulation(c).chunk(2, dim=-1)
+    def forward(self, x, c, modulation=None):
+        if modulation is None:
+            modulation = self.adaLN_modulation(c)
+        shift, scale = modulation.chunk(2, dim=-1)
         x = modulate(self.norm_final(x), shift, scale)
         x = self.linear(x)
         return x
@@ -236,6 +240,20 @@ class VibeVoiceDiffusionHead(PreTrainedModel):
         )
         
         self.initialize_weights()
+        # Set by `fuse_adaln_modulation`
+        self.register_buffer("_fused_adaln_weight", None, persistent=False)
+
+    @torch.no_grad()
+    def fuse_adaln_modulation(self):
+        """
+        Batch the adaLN modulation of all layers into one GEMM.
+
+        Every layer applies SiLU + Linear to the same condition `c`, so the weights are stacked once
+        (as a non-persistent buffer) and all modulations come out of a single matmul.
+        """
+        linears = [layer.adaLN_modulation[-1] for layer in self.layers] + [self.final_layer.adaLN_modulation[-1]]
+        self._adaln_split_sizes = [linear.out_features for linear in linears]
+        self._fused_adaln_weight = torch.cat([linear.weight for linear in linears], dim=0)
 
     def initialize_weights(self):
         """Initialize the weights of the model."""
@@ -272,6 +290,13 @@ class VibeVoiceDiffusionHead(PreTrainedModel):
         t = self.t_embedder(timesteps)
         condition = self.cond_proj(condition)
         c = condition + t
+
+        if self._fused_adaln_weight is not None:
+            modulations = F.linear(self.final_layer.adaLN_modulation[0](c), self._fused_adaln_weight)
+            modulations = modulations.split(self._adaln_split_sizes, dim=-1)
+            for layer, modulation in zip(self.layers, modulations):
+                x = layer(x, c, modulation=modulation)
+            return self.final_layer(x, c, modulation=modulations[-1])
         
         for layer in self.layers:
             x = layer(x, c)
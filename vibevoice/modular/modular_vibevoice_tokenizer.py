@@ -160,6 +160,25 @@ def unpad1d(x: torch.Tensor, paddings: tp.Tuple[int, int]):
     return x[..., padding_left: end]
 
 
+@torch.no_grad()
+def fold_conv1d_input_scale(conv: nn.Conv1d, scale: torch.Tensor):
+    """Fold a per-input-channel (or scalar) scale into the weight of `conv`, i.e. conv(x * scale) == conv'(x)."""
+    out_channels, in_per_group, kernel_size = conv.weight.shape
+    groups = conv.groups
+    scale = scale.to(device=conv.weight.device, dtype=torch.float32).expand(in_per_group * groups).reshape(groups, 1, in_per_group, 1)
+    weight = conv.weight.float().reshape(groups, out_channels // groups, in_per_group, kernel_size) * scale
+    conv.weight.copy_(weight.reshape(out_channels, in_per_group, kernel_size).to(conv.weight.dtype))
+
+
+@torch.no_grad()
+def fold_conv1d_output_scale(conv: nn.Conv1d, scale: torch.Tensor):
+    """Fold a per-output-channel scale into `conv`, i.e. conv(x) * scale[:, None] == conv'(x)."""
+    scale = scale.to(device=conv.weight.device, dtype=torch.float32)
+    conv.weight.copy_((conv.weight.float() * scale.view(-1, 1, 1)).to(conv.weight.dtype))
+    if conv.bias is not None:
+        conv.bias.copy_((conv.bias.float() * scale).to(conv.bias.dtype))
+
+
 class NormConv1d(nn.Module):
     """Wrapper around Conv1d and normalization applied to this conv"""
     def __init__(self, *args, causal: bool = False, norm: str = 'none',
@@ -191,69 +210,215 @@ class NormConvTranspose1d(nn.Module):
 
 
 class VibeVoiceTokenizerStreamingCache:
-    """Cache for streaming convolution, similar to KV cache in attention"""
-    def __init__(self):
-        self.cache = {}  # Dict mapping (layer_id, sample_idx) to state tensor
-        
-    def get(self, layer_id: str, sample_indices: torch.Tensor) -> Optional[torch.Tensor]:
-        """Get cached states for given layer and sample indices"""
-        states = []
-        max_length = 0
-        
-        # First pass: collect states and find max length
+    """
+    Cache for streaming convolution, similar to KV cache in attention.
+
+    States live in preallocated per-layer tensors of shape `[num_slots, channels, length]` that are
+    written and read in place. Every sample index (session) is assigned a slot on first use; when
+    the requested samples map to consecutive slots, reads are plain views and writes are `copy_`s,
+    so a steady-state streaming step does not allocate cache memory.
+
+    The streaming convs only call `window`/`advance` (causal convs) and `get`/`set` (transposed convs).
+    Stand-ins implementing the same interface: `_ExplicitStateCache` (vibevoice/onnx/export.py) and
+    `ConcatStreamingCache` (vibevoice/scripts/benchmark_decoder_cache.py); keep them in sync.
+    """
+    def __init__(self, num_slots: int = 1):
+        self.num_slots = num_slots
+        self.slots = {}  # Dict mapping sample_idx to slot
+        self.free_slots = []
+        self.states = {}  # Dict mapping layer_id to [num_slots, ..., length] state tensor
+        self.initialized = {}  # Dict mapping layer_id to the set of slots holding a state
+        self.windows = {}  # Dict mapping layer_id to [num_slots, C, context + T] conv input buffer
+        self.scratch = {}  # Dict mapping layer_id to [num_slots, C, context] buffer for overlapping shifts
+        self._lookup = None  # (sample_indices, slots, index) of the last lookup
+
+    def _allocate_slot(self) -> int:
+        if self.free_slots:
+            return self.free_slots.pop()
+        slot = len(self.slots)
+        if slot >= self.num_slots:
+            self._grow_slots(max(2 * self.num_slots, slot + 1))
+        return slot
+
+    def _grow_slots(self, num_slots: int):
+        """Reallocate every buffer with room for `num_slots` sessions, keeping the existing rows."""
+        for store in (self.states, self.windows, self.scratch):
+            for layer_id, buffer in store.items():
+                grown = buffer.new_zeros((num_slots,) + tuple(buffer.shape[1:]))
+                grown[:buffer.shape[0]].copy_(buffer)
+                store[layer_id] = grown
+        self.num_slots = num_slots
+
+    def _slots_for(self, sample_indices: torch.Tensor):
+        """Map sample indices to slots; `index` is a slice when the slots are consecutive."""
+        if self._lookup is not None and self._lookup[0] is sample_indices:
+            return self._lookup[1], self._lookup[2]
+
+        slots = []
         for idx in sample_indices.tolist():
-            key = (layer_id, idx)
-            if key not in self.cache:
-                return None  # If any sample is missing, return None
-            state = self.cache[key]
-            states.append(state)
-            max_length = max(max_length, state.shape[-1])
-        
-        # Second pass: pad states to max length if needed
-        if len(states) > 0 and states[0].dim() >= 2:
-            padded_states = []
-            for state in states:
-                if state.shape[-1] < max_length:
-                    # Pad on the time dimension (last dimension)
-                    pad_size = max_length - state.shape[-1]
-                    # Pad with zeros on the LEFT to align the most recent samples
-                    padded_state = F.pad(state, (pad_size, 0), mode='constant', value=0)
-                    padded_states.append(padded_state)
-                else:
-                    padded_states.append(state)
-            return torch.stack(padded_states, dim=0)
+            if idx not in self.slots:
+                self.slots[idx] = self._allocate_slot()
+            slots.append(self.slots[idx])
+        if slots and slots == list(range(slots[0], slots[0] + len(slots))):
+            index = slice(slots[0], slots[0] + len(slots))
         else:
-            return torch.stack(states, dim=0)
-    
+            index = slots
+        # Decoder layers of one step share the same `sample_indices` tensor, so the lookup is done once
+        self._lookup = (sample_indices, slots, index)
+        return slots, index
+
+    @staticmethod
+    def _rows(buffer: torch.Tensor, index):
+        if isinstance(index, slice):
+            return index
+        return torch.as_tensor(index, device=buffer.device)
+
+    def _buffer(self, store: dict, layer_id: str, shape: tuple, like: torch.Tensor) -> torch.Tensor:
+        """Return the buffer of a layer, (re)allocating it when its trailing shape, dtype or device changes."""
+        buffer = store.get(layer_id)
+        if (
+            buffer is None
+            or tuple(buffer.shape[1:]) != shape
+            or buffer.dtype != like.dtype
+            or buffer.device != like.device
+        ):
+            buffer = like.new_zeros((self.num_slots,) + shape)
+            store[layer_id] = buffer
+        return buffer
+
+    def get(self, layer_id: str, sample_indices: torch.Tensor) -> Optional[torch.Tensor]:
+        """Get cached states for given layer and sample indices (None if none of the samples has one)"""
+        state = self.states.get(layer_id)
+        if state is None:
+            return None
+        slots, index = self._slots_for(sample_indices)
+        initialized = self.initialized[layer_id]
+        missing = [i for i, slot in enumerate(slots) if slot not in initialized]
+        if len(missing) == len(slots):
+            return None  # No sample has a state yet (first chunk of all of them)
+        # Shorter states are stored left-padded with zeros, so the most recent samples stay aligned
+        states = state[self._rows(state, index)]
+        if missing:
+            # Samples joining a batch of ongoing ones: zeros are the state of a first chunk. The rows
+            # are overwritten by the next `set`, so zeroing them in place is fine when `states` is a view
+            states[missing] = 0
+        return states
+
     def set(self, layer_id: str, sample_indices: torch.Tensor, states: torch.Tensor):
         """Set cached states for given layer and sample indices"""
-        for i, idx in enumerate(sample_indices.tolist()):
-            key = (layer_id, idx)
-            self.cache[key] = states[i].detach()
+        slots, index = self._slots_for(sample_indices)
+        length = states.shape[-1]
+        state = self.states.get(layer_id)
+        if state is not None and state.shape[1:-1] == states.shape[1:-1] and state.shape[-1] < length:
+            # Longer states than seen so far: grow the time axis, keeping the stored states right-aligned
+            grown = state.new_zeros(tuple(state.shape[:-1]) + (length,))
+            grown[..., length - state.shape[-1]:].copy_(state)
+            self.states[layer_id] = state = grown
+        capacity = max(length, state.shape[-1]) if state is not None else length
+        state = self._buffer(self.states, layer_id, tuple(states.shape[1:-1]) + (capacity,), states)
+        offset = state.shape[-1] - length
+        rows = self._rows(state, index)
+        if isinstance(rows, slice):
+            target = state[rows]
+            target[..., offset:].copy_(states)
+            if offset > 0:
+                target[..., :offset].zero_()
+        else:
+            state[rows, ..., offset:] = states.to(state.dtype)
+            if offset > 0:
+                state[rows, ..., :offset] = 0
+        self.initialized.setdefault(layer_id, set()).update(slots)
+
+    def window(self, layer_id: str, sample_indices: torch.Tensor, x: torch.Tensor, context_size: int) -> torch.Tensor:
+        """
+        Return the cached context of a causal conv concatenated with `x` along time.
+
+        The window is assembled in a preallocated per-layer buffer (zero context on the first chunk) and
+        may be a view of it: call `advance` once the conv has consumed it, to keep its last
+        `context_size` frames as the context of the next call.
+        """
+        if context_size == 0:
+            return x
+        B, C, T = x.shape
+        slots, index = self._slots_for(sample_indices)
+        buffer = self.windows.get(layer_id)
+        if buffer is None or buffer.shape[1] != C or buffer.dtype != x.dtype or buffer.device != x.device:
+            buffer = x.new_zeros(self.num_slots, C, context_size + T)
+            self.windows[layer_id] = buffer
+        elif buffer.shape[2] < context_size + T:
+            # Longer chunks than seen so far: widen the buffer, keeping the context
+            grown = buffer.new_zeros(buffer.shape[0], C, context_size + T)
+            grown[:, :, :context_size].copy_(buffer[:, :, :context_size])
+            self.windows[layer_id] = buffer = grown
+
+        rows = self._rows(buffer, index)
+        if isinstance(rows, slice):
+            window = buffer[rows, :, :context_size + T]
+            window[:, :, context_size:].copy_(x)
+        else:
+            buffer[rows, :, context_size:context_size + T] = x
+            window = buffer[rows, :, :context_size + T]
+        return window
+
+    def advance(self, layer_id: str, sample_indices: torch.Tensor, window: torch.Tensor, context_size: int):
+        """Keep the last `context_size` frames of a `window` as the context of the next call."""
+        if context_size == 0:
+            return
+        _, index = self._slots_for(sample_indices)
+        buffer = self.windows[layer_id]
+        rows = self._rows(buffer, index)
+        tail = window[:, :, -context_size:]
+        if window.shape[2] < 2 * context_size and isinstance(rows, slice):
+            # The window is a view of the buffer and the shift overlaps itself: go through a scratch buffer
+            scratch = self._buffer(self.scratch, layer_id, (window.shape[1], context_size), window)
+            scratch[rows].copy_(tail)
+            tail = scratch[rows]
+        buffer[rows, :, :context_size] = tail
 
     def set_to_zero(self, sample_indices: torch.Tensor):
         """Set all cached states to zero for given sample indices"""
-        for key in list(self.cache.keys()):
-            layer_id, sample_idx = key
-            if sample_idx in sample_indices.tolist():
-                # Create zero tensor with same shape and dtype as cached tensor
-                cached_tensor = self.cache[key]
-                self.cache[key] = torch.zeros_like(cached_tensor)
-                
+        slots, _ = self._slots_for(sample_indices)
+        for store in (self.states, self.windows):
+            for buffer in store.values():
+                buffer[self._rows(buffer, slots)] = 0
+
+    def release(self, sample_indices: torch.Tensor):
+        """Free the slots of finished samples so that new sessions can reuse them"""
+        for idx in sample_indices.tolist():
+            slot = self.slots.pop(idx, None)
+            if slot is None:
+                continue
+            for store in (self.states, self.windows):
+                for buffer in store.values():
+                    buffer[slot] = 0
+            for initialized in self.initialized.values():
+                initialized.discard(slot)
+            self.free_slots.append(slot)
+        self._lookup = None
+
     def clear(self, layer_id: Optional[str] = None, sample_indices: Optional[torch.Tensor] = None):
         """Clear cache for specific layer/samples or everything"""
         if layer_id is None and sample_indices is None:
-            self.cache.clear()
+            self.slots.clear()
+            self.free_slots.clear()
+            self.states.clear()
+            self.initialized.clear()
+            self.windows.clear()
+            self.scratch.clear()
+            self._lookup = None
         elif layer_id is not None and sample_indices is None:
             # Clear all samples for a specific layer
-            keys_to_remove = [k for k in self.cache.keys() if k[0] == layer_id]
-            for k in keys_to_remove:
-                del self.cache[k]
+            for store in (self.states, self.initialized, self.windows, self.scratch):
+                store.pop(layer_id, None)
         elif layer_id is not None and sample_indices is not None:
             # Clear specific samples for a specific layer
-            for idx in sample_indices.tolist():
-                key = (layer_id, idx)
-                self.cache.pop(key, None)
+            slots, _ = self._slots_for(sample_indices)
+            self.initialized.get(layer_id, set()).difference_update(slots)
+            if layer_id in self.windows:
+                buffer = self.windows[layer_id]
+                buffer[self._rows(buffer, slots)] = 0
+        else:
+            self.release(sample_indices)
 
 class SConv1d(nn.Module):
     """Conv1d with built-in handling of asymmetric or causal padding and normalization."""
@@ -331,54 +496,23 @@ class SConv1d(nn.Module):
         """Streaming forward pass with cache operations kept separate from compiled code"""
         B, C, T = x.shape
         
-        # Cache operations (not compiled)
-        cached_states = cache.get(self.layer_id, sample_indices)
-        
-        if cached_states is None:
-            # First chunk - initialize with zeros for context
-            if self.context_size > 0:
-                cached_states = torch.zeros(B, C, self.context_size, device=x.device, dtype=x.dtype)
-                if debug:
-                    print(f"[DEBUG] Initialized cache with shape: {cached_states.shape}, context_size={self.context_size}")
-            else:
-                cached_states = torch.zeros(B, C, 0, device=x.device, dtype=x.dtype)
-                if debug:
-                    print(f"[DEBUG] No context needed (kernel_size=stride)")
-        
-        # Concatenate cached states with input
-        if cached_states.shape[2] > 0:
-            input_with_context = torch.cat([cached_states, x], dim=2)
-        else:
-            input_with_context = x
+        # Cache operations (not compiled): context + input are assembled in the cache's preallocated
+        # window buffer, zero context on the first chunk
+        input_with_context = cache.window(self.layer_id, sample_indices, x, self.context_size)
             
         if debug:
-            print(f"[DEBUG] Input shape: {x.shape}, Cache shape: {cached_states.shape}, Combined: {input_with_context.shape}")
+            print(f"[DEBUG] Input shape: {x.shape}, context_size={self.context_size}, Combined: {input_with_context.shape}")
         
         # Apply convolution directly - no extra padding in streaming mode
         # The conv layer will handle its own padding internally
         output = self.conv(input_with_context)
 
+        # The window may be a view of the cache buffer, so the new context is only kept once it is consumed
+        cache.advance(self.layer_id, sample_indices, input_with_context, self.context_size)
+
         if debug:
             print(f"[DEBUG] Output shape: {output.shape}")
         
-        # Update cache for next chunk
-        if self.context_size > 0:
-            # Calculate how many samples to keep
-            total_input_length = input_with_context.shape[2]
-            
-            # Keep the last context_size samples
-            if total_input_length >= self.context_size:
-                new_cache_start = total_input_length - self.context_size
-                new_cache = input_with_context[:, :, new_cache_start:]
-            else:
-                # If we have less than context_size samples, keep everything
-                new_cache = input_with_context
-                
-            if debug:
-                print(f"[DEBUG] New cache shape: {new_cache.shape}")
-                
-            cache.set(self.layer_id, sample_indices, new_cache)
-        
         return output
     
     def _forward_non_streaming(self, x: torch.Tensor, debug: bool = False) -> torch.Tensor:
@@ -480,6 +614,9 @@ class SConvTranspose1d(nn.Module):
                           sample_indices: torch.Tensor,
                           debug: bool = False) -> torch.Tensor:
         """Streaming forward pass with cache operations kept separate from compiled code"""
+        if self._supports_overlap_add():
+            return self._forward_overlap_add(x, cache, sample_indices, debug)
+
         B, C, T = x.shape
         
         # Cache operations (not compiled)
@@ -548,6 +685,46 @@ class SConvTranspose1d(nn.Module):
         
         return output
     
+    def _supports_overlap_add(self) -> bool:
+        """Overlap-add needs a conv that is linear in its input and a causal trim that only cuts the right side"""
+        if self.convtr.norm_type != 'none' or not self.causal:
+            return False
+        padding_right = math.ceil(self.padding_total * self.trim_right_ratio)
+        return self.padding_total - padding_right == 0
+
+    def _forward_overlap_add(self, x: torch.Tensor,
+                             cache: VibeVoiceTokenizerStreamingCache,
+                             sample_indices: torch.Tensor,
+                             debug: bool = False) -> torch.Tensor:
+        """
+        Streaming forward pass by overlap-add.
+
+        The transposed conv only runs on the new input. Its last `kernel_size - stride` output samples
+        still overlap with the next frames, so they are cached (without bias) and added to the head of
+        the next chunk instead of recomputing the cached input frames.
+        """
+        B, C, T = x.shape
+        convtr = self.convtr.convtr
+        y = F.conv_transpose1d(x, convtr.weight, None, convtr.stride, convtr.padding,
+                               convtr.output_padding, convtr.groups, convtr.dilation)
+        new_length = T * self.stride
+        tail_length = y.shape[2] - new_length
+
+        if tail_length > 0:
+            pending = cache.get(self.layer_id, sample_indices)
+            if pending is not None:
+                y[:, :, :tail_length] += pending
+            cache.set(self.layer_id, sample_indices, y[:, :, new_length:])
+
+        output = y[:, :, :new_length]
+        if convtr.bias is not None:
+            output = output + convtr.bias[:, None]
+
+        if debug:
+            print(f"[DEBUG] Overlap-add input shape: {x.shape}, pending tail: {tail_length}, output: {output.shape}")
+
+        return output
+
     def _forward_non_streaming(self, x: torch.Tensor, debug: bool = False) -> torch.Tensor:
         """Standard forward pass without streaming"""
         if debug:
@@ -672,6 +849,49 @@ class Block1D(nn.Module):
         x = residual + self.drop_path(x)
 
         # ffn
+        x = self.forward_ffn(x)
+
+        return x
+
+    @torch.no_grad()
+    def fold_for_inference(self) -> bool:
+        """
+        Fold the RMSNorm weights and the layer-scale vectors into the adjacent mixer conv and FFN linears.
+
+        Only applies to RMSNorm blocks with plain (non-parametrized) convolutions. The block must not be
+        trained or saved afterwards, as `gamma`/`ffn_gamma` and the norm weights are dropped.
+
+        Returns:
+            True if the block was folded.
+        """
+        conv_wrapper = self.mixer.conv.conv
+        if conv_wrapper.norm_type != 'none' or not isinstance(self.norm, ConvRMSNorm) or not isinstance(self.ffn_norm, ConvRMSNorm):
+            return False
+        conv = conv_wrapper.conv
+
+        # mixer: conv(norm(x) * w) * gamma
+        if self.norm.weight is not None:
+            fold_conv1d_input_scale(conv, self.norm.weight)
+            self.norm = ConvRMSNorm(self.norm.dim, eps=self.norm.eps, elementwise_affine=False)
+        if self.gamma is not None:
+            fold_conv1d_output_scale(conv, self.gamma)
+            self.gamma = None
+
+        # ffn: linear2(gelu(linear1(norm(x) * w))) * ffn_gamma
+        linear1, linear2 = self.ffn.linear1, self.ffn.linear2
+        if self.ffn_norm.weight is not None:
+            linear1.weight.copy_((linear1.weight.float() * self.ffn_norm.weight.float()[None, :]).to(linear1.weight.dtype))
+            self.ffn_norm = ConvRMSNorm(self.ffn_norm.dim, eps=self.ffn_norm.eps, elementwise_affine=False)
+        if self.ffn_gamma is not None:
+            ffn_gamma = self.ffn_gamma.float()
+            linear2.weight.copy_((linear2.weight.float() * ffn_gamma[:, None]).to(linear2.weight.dtype))
+            if linear2.bias is not None:
+                linear2.bias.copy_((linear2.bias.float() * ffn_gamma).to(linear2.bias.dtype))
+            self.ffn_gamma = None
+        return True
+
+    def forward_ffn(self, x):
+        """FFN half of the block (norm, FFN, layer scale and residual). Stateless, so it can be compiled on its own."""
         residual = x
         x = self.ffn_norm(x)
         x = x.permute(0, 2, 1)
@@ -680,7 +900,6 @@ class Block1D(nn.Module):
         if self.ffn_gamma is not None:
             x = x * self.ffn_gamma.unsqueeze(-1)
         x = residual + self.drop_path(x)
-
         return x
 
 
@@ -782,6 +1001,22 @@ class TokenizerDecoder(nn.Module):
             self.norm = nn.Identity()
         self.head = SConv1d(in_ch, self.channels, kernel_size=last_kernel_size, causal=self.causal, pad_mode=pad_mode, norm=norm, bias=bias)
 
+    @torch.no_grad()
+    def fold_for_inference(self, input_scale: Optional[torch.Tensor] = None) -> int:
+        """
+        Fold per-call multiplies into weights (see `Block1D.fold_for_inference`).
+
+        Args:
+            input_scale: optional scale applied to the latents before decoding, folded into the stem conv.
+
+        Returns:
+            Number of folded blocks.
+        """
+        if input_scale is not None:
+            stem = self.upsample_layers[0][0]
+            fold_conv1d_input_scale(stem.conv.conv, input_scale)
+        return sum(block.fold_for_inference() for stage in self.stages for block in stage)
+
     def forward_features(self, x, cache=None, sample_indices=None, use_cache=False, debug=False):
         for i in range(len(self.depths)):
             # Apply upsampling
@@ -803,14 +1038,7 @@ class TokenizerDecoder(nn.Module):
                     x = residual + x
                     
                     # FFN part
-                    residual = x
-                    x = block.ffn_norm(x)
-                    x = x.permute(0, 2, 1)
-                    x = block.ffn(x)
-                    x = x.permute(0, 2, 1)
-                    if block.ffn_gamma is not None:
-                        x = x * block.ffn_gamma.unsqueeze(-1)
-                    x = residual + x
+                    x = block.forward_ffn(x)
                 else:
                     x = block(x)
 
@@ -895,6 +1123,32 @@ class VibeVoiceAcousticTokenizerModel(PreTrainedModel):
         audio = self.decoder(latents, cache=cache, sample_indices=sample_indices, use_cache=use_cache, debug=debug)
         return audio
 
+    def decode_in_chunks(self, latents, chunk_size: Optional[int] = None, overlap: int = 64):
+        """
+        Non-streaming decode of long latent sequences in chunks, to bound activation memory.
+
+        Each chunk of `chunk_size` frames is decoded together with up to `overlap` preceding frames,
+        whose audio is discarded. The decoder is causal, so once `overlap` covers its receptive field
+        (about 60 frames for the default config) the result matches a single decode.
+
+        Args:
+            latents: `[batch, vae_dim, frames]` latents.
+            chunk_size: Frames per chunk; None decodes everything at once.
+            overlap: Frames of left context decoded with each chunk.
+        """
+        num_frames = latents.shape[-1]
+        if chunk_size is None or chunk_size >= num_frames:
+            return self.decode(latents)
+
+        chunks = []
+        for start in range(0, num_frames, chunk_size):
+            context = min(overlap, start)
+            chunk = latents[:, :, start - context:start + chunk_size]
+            audio = self.decode(chunk)
+            hop_length = audio.shape[-1] // chunk.shape[-1]
+            chunks.append(audio[..., context * hop_length:])
+        return torch.cat(chunks, dim=-1)
+
 
 AutoModel.register(VibeVoiceAcousticTokenizerConfig, VibeVoiceAcousticTokenizerModel)
 
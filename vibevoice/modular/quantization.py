@@ -0,0 +1,238 @@
+import json
+import os
+from typing import Dict, Iterable, List
+
+import torch
+import torch.nn as nn
+
+from transformers.utils import logging
+
+logger = logging.get_logger(__name__)
+
+QUANTIZATION_FORMAT_VERSION = "2"
+QUANTIZED_WEIGHTS_NAME = "quantized_model.pt"
+QUANTIZATION_CONFIG_NAME = "quantization_config.json"
+QUANTIZABLE_COMPONENTS = ("language_model", "tts_language_model", "prediction_head", "acoustic_decoder")
+
+
+def _quantization_targets(model, component: str) -> List[nn.Module]:
+    """Containers whose `nn.Linear` layers are quantized for `component`."""
+    if component == "language_model":
+        return [model.model.language_model.layers]
+    if component == "tts_language_model":
+        return [model.model.tts_language_model.layers]
+    if component == "prediction_head":
+        # FFNs and adaLN modulations; the latent in/out projections and the timestep embedder stay in fp32
+        head = model.model.prediction_head
+        return (
+            [layer.ffn for layer in head.layers]
+            + [layer.adaLN_modulation for layer in head.layers]
+            + [head.final_layer.adaLN_modulation]
+        )
+    if component == "acoustic_decoder":
+        # The block FFNs are the only pointwise layers of the decoder, the mixers are depthwise convs
+        return [block.ffn for stage in model.model.acoustic_tokenizer.decoder.stages for block in stage]
+    raise ValueError(f"Unknown component {component!r}, expected one of {QUANTIZABLE_COMPONENTS}")
+
+
+def _replace_linears(container: nn.Module, make_module) -> int:
+    """Replace every `nn.Linear` below `container` by `make_module(linear)`."""
+    replaced = 0
+    for name, child in container.named_children():
+        if type(child) is nn.Linear:
+            setattr(container, name, make_module(child))
+            replaced += 1
+        else:
+            replaced += _replace_linears(child, make_module)
+    return replaced
+
+
+def _check_components(model, components: Iterable[str]) -> List[str]:
+    components = list(components)
+    for component in components:
+        if component not in QUANTIZABLE_COMPONENTS:
+            raise ValueError(f"Unknown component {component!r}, expected one of {QUANTIZABLE_COMPONENTS}")
+        if component in model._quantized_components:
+            raise ValueError(f"Component {component!r} is already quantized")
+    return components
+
+
+@torch.no_grad()
+def quantize_for_cpu(model, components: Iterable[str] = QUANTIZABLE_COMPONENTS, dtype: torch.dtype = torch.qint8) -> Dict[str, int]:
+    """
+    Replace the Linear layers of the selected components by dynamically quantized int8 kernels (int8
+    weights, activations quantized per call) for CPU inference.
+
+    The model must be in fp32 on CPU. `optimize_for_inference` needs the float weights, so it has to run
+    before quantizing (and such a model cannot be saved with `save_quantized`); the fused adaLN modulation
+    of the diffusion head is dropped when the head is quantized.
+
+    Args:
+        model: `VibeVoiceStreamingForConditionalGenerationInference`.
+        components: Any of `QUANTIZABLE_COMPONENTS`.
+        dtype: Weight dtype, `torch.qint8` (or `torch.float16` for fp16 weight-only kernels).
+
+    Returns:
+        Number of quantized Linear layers per component.
+    """
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+    from torch.ao.quantization import default_dynamic_qconfig, float16_dynamic_qconfig
+
+    qconfig = default_dynamic_qconfig if dtype == torch.qint8 else float16_dynamic_qconfig
+    counts = {}
+    for component in _check_components(model, components):
+        targets = _quantization_targets(model, component)
+        for container in targets:
+            for parameter in container.parameters():
+                if parameter.dtype != torch.float32 or parameter.device.type != "cpu":
+                    raise ValueError(f"{component} must be float32 on CPU to be quantized, got {parameter.dtype} on {parameter.device}")
+
+        if component == "prediction_head" and model.model.prediction_head._fused_adaln_weight is not None:
+            # The fused GEMM would bypass the quantized modulation layers
+            model.model.prediction_head._fused_adaln_weight = None
+
+        def quantize(linear):
+            linear.qconfig = qconfig
+            return DynamicQuantizedLinear.from_float(linear)
+
+        counts[component] = sum(_replace_linears(container, quantize) for container in targets)
+        model._quantized_components.append(component)
+    logger.info(f"Quantized Linear layers ({dtype}): {counts}")
+    return counts
+
+
+def _prepare_quantized_skeleton(model, components: Iterable[str], dtype: torch.dtype):
+    """Swap in empty quantized Linear modules, so a quantized state dict loads without requantizing."""
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+
+    def empty(linear):
+        return DynamicQuantizedLinear(linear.in_features, linear.out_features, bias_=linear.bias is not None, dtype=dtype)
+
+    for component in _check_components(model, components):
+        if component == "prediction_head":
+            model.model.prediction_head._fused_adaln_weight = None
+        for container in _quantization_targets(model, component):
+            _replace_linears(container, empty)
+        model._quantized_components.append(component)
+
+
+def _quantized_linears(model) -> Dict[str, nn.Module]:
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+
+    return {name: module for name, module in model.named_modules() if isinstance(module, DynamicQuantizedLinear)}
+
+
+def _unpack_weight(module) -> Dict[str, object]:
+    """Plain tensors of a quantized Linear (int8 values and quantization parameters, or fp16 weights)."""
+    weight, bias = module._weight_bias()
+    if not weight.is_quantized:
+        return {"weight": weight, "bias": bias}
+    if weight.qscheme() in (torch.per_channel_affine, torch.per_channel_symmetric):
+        return {
+            "weight": weight.int_repr(), "bias": bias, "axis": weight.q_per_channel_axis(),
+            "scale": weight.q_per_channel_scales(), "zero_point": weight.q_per_channel_zero_points(),
+        }
+    return {
+        "weight": weight.int_repr(), "bias": bias, "axis": None,
+        "scale": torch.tensor(weight.q_scale(), dtype=torch.float64),
+        "zero_point": torch.tensor(weight.q_zero_point(), dtype=torch.int64),
+    }
+
+
+def _pack_weight(module, unpacked: Dict[str, object]):
+    """Inverse of `_unpack_weight`."""
+    weight = unpacked["weight"]
+    if "scale" in unpacked:
+        if unpacked["axis"] is None:
+            weight = torch._make_per_tensor_quantized_tensor(weight, unpacked["scale"].item(), int(unpacked["zero_point"].item()))
+        else:
+            weight = torch._make_per_channel_quantized_tensor(weight, unpacked["scale"], unpacked["zero_point"], unpacked["axis"])
+    module.set_weight_bias(weight, unpacked["bias"])
+
+
+def save_quantized(model, save_directory: str) -> str:
+    """
+    Save a model quantized with `quantize_for_cpu`: the config, the quantized state dict and the list of
+    quantized components, so `load_quantized` restores it without the float checkpoint.
+    """
+    if model._decoder_latent_shift is not None:
+        raise ValueError("Models folded by optimize_for_inference cannot be saved, quantize and save the unfolded model")
+    linears = _quantized_linears(model)
+    dtypes = {module._packed_params.dtype for module in linears.values()}
+    if len(dtypes) != 1:
+        raise ValueError(f"Expected a model quantized with quantize_for_cpu to a single dtype, found {dtypes or 'none'}")
+    # Packed quantized parameters are stored as plain tensors, so `load_quantized` can use the restricted unpickler
+    state_dict = {
+        key: value for key, value in model.state_dict().items()
+        if not any(key.startswith(f"{name}.") for name in linears)
+    }
+    weights = {
+        "state_dict": state_dict,
+        "quantized_linears": {name: _unpack_weight(module) for name, module in linears.items()},
+    }
+    os.makedirs(save_directory, exist_ok=True)
+    model.config.save_pretrained(save_directory)
+    torch.save(weights, os.path.join(save_directory, QUANTIZED_WEIGHTS_NAME))
+    with open(os.path.join(save_directory, QUANTIZATION_CONFIG_NAME), "w", encoding="utf-8") as f:
+        json.dump({
+            "format_version": QUANTIZATION_FORMAT_VERSION,
+            "components": list(model._quantized_components),
+            "dtype": str(dtypes.pop()).replace("torch.", ""),
+            "ddpm_inference_steps": model.ddpm_inference_steps,
+        }, f, indent=2)
+    return save_directory
+
+
+@torch.no_grad()
+def load_quantized(save_directory: str, attn_implementation: str = "sdpa"):
+    """Load a model written by `save_quantized` on CPU."""
+    from transformers.modeling_utils import no_init_weights
+
+    from .configuration_vibevoice_streaming import VibeVoiceStreamingConfig
+    from .modeling_vibevoice_streaming_inference import VibeVoiceStreamingForConditionalGenerationInference
+
+    with open(os.path.join(save_directory, QUANTIZATION_CONFIG_NAME), "r", encoding="utf-8") as f:
+        quantization_config = json.load(f)
+    if quantization_config.get("format_version") != QUANTIZATION_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported quantized model format {quantization_config.get('format_version')!r} in {save_directory}, "
+            "quantize the float checkpoint again with vibevoice/scripts/quantize_model.py"
+        )
+
+    config = VibeVoiceStreamingConfig.from_pretrained(save_directory)
+    config._attn_implementation = attn_implementation
+    config.decoder_config._attn_implementation = attn_implementation
+    with no_init_weights():
+        model = VibeVoiceStreamingForConditionalGenerationInference(config)
+    model = model.float().eval()
+    _prepare_quantized_skeleton(model, quantization_config["components"], getattr(torch, quantization_config["dtype"]))
+
+    # Only plain tensors are stored, so loading a checkpoint cannot run arbitrary pickled code
+    weights = torch.load(os.path.join(save_directory, QUANTIZED_WEIGHTS_NAME), map_location="cpu", weights_only=True)
+    linears = _quantized_linears(model)
+    if set(weights["quantized_linears"]) != set(linears):
+        raise ValueError(f"Quantized layers of {save_directory} do not match the components {quantization_config['components']}")
+    missing, unexpected = model.load_state_dict(weights["state_dict"], strict=False)
+    missing = [key for key in missing if not any(key.startswith(f"{name}.") for name in linears)]
+    if missing or unexpected:
+        raise RuntimeError(f"Error loading {save_directory}: missing keys {missing}, unexpected keys {unexpected}")
+    for name, module in linears.items():
+        _pack_weight(module, weights["quantized_linears"][name])
+    model.set_ddpm_inference_steps(quantization_config.get("ddpm_inference_steps"))
+    return model
+
+
+def model_size_bytes(module: nn.Module) -> int:
+    """Bytes of the state dict of `module`, counting quantized (packed) weights at their stored size."""
+    def size(value):
+        if torch.is_tensor(value):
+            return value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):
+            return sum(size(item) for item in value)
+        return 0
+    return sum(size(value) for value in module.state_dict().values())
+
+
+def is_quantized_checkpoint(path: str) -> bool:
+    """Whether `path` is a directory written by `save_quantized`."""
+    return os.path.isfile(os.path.join(path, QUANTIZATION_CONFIG_NAME))
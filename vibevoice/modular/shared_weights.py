@@ -0,0 +1,130 @@
+import json
+import os
+import struct
+from typing import Dict, Tuple
+
+import torch
+
+from transformers.utils import logging
+
+logger = logging.get_logger(__name__)
+
+SHARED_WEIGHTS_FORMAT_VERSION = "1"
+
+# safetensors dtype tags
+_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+
+def save_shared_weights(model, path: str) -> str:
+    """
+    Write the state dict of `model` (in its current dtypes) to one safetensors file for `load_shared_weights`.
+
+    Tied parameters are stored once and recorded as aliases. Apply the CPU precision map before saving, so the
+    worker processes do not have to cast (and thereby copy) the mapped weights.
+    """
+    from safetensors.torch import save_file
+
+    if getattr(model, "_quantized_components", None):
+        raise ValueError("Quantized models hold packed weights that cannot be memory-mapped, share the float model")
+    tensors: Dict[str, torch.Tensor] = {}
+    aliases: Dict[str, str] = {}
+    seen: Dict[tuple, str] = {}
+    for name, tensor in model.state_dict().items():
+        key = (tensor.untyped_storage().data_ptr(), tensor.storage_offset(), tuple(tensor.shape), tensor.dtype)
+        if key in seen:
+            aliases[name] = seen[key]
+            continue
+        seen[key] = name
+        tensors[name] = tensor.detach().to("cpu").contiguous()
+
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    # Written next to the target and renamed, so a worker never maps a partial file
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    save_file(tensors, tmp_path, metadata={
+        "format_version": SHARED_WEIGHTS_FORMAT_VERSION,
+        "aliases": json.dumps(aliases),
+    })
+    os.replace(tmp_path, path)
+    return path
+
+
+def map_safetensors(path: str) -> Tuple[Dict[str, torch.Tensor], Dict[str, str], int]:
+    """
+    Private (copy-on-write) memory map of a safetensors file.
+
+    The tensors are views into one mapping of the file, so every process mapping the same file shares its
+    pages through the page cache until it writes to them, and a page is only read from disk when first
+    touched.
+
+    Returns:
+        The tensors by name, the header metadata and the number of mapped bytes.
+    """
+    with open(path, "rb") as f:
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_size))
+    metadata = header.pop("__metadata__", {}) or {}
+
+    size = os.path.getsize(path)
+    mapped = torch.from_file(os.fspath(path), shared=False, size=size, dtype=torch.uint8)
+    data_start = 8 + header_size
+    tensors = {}
+    for name, info in header.items():
+        begin, end = info["data_offsets"]
+        tensor = mapped[data_start + begin:data_start + end]
+        tensors[name] = tensor.view(_DTYPES[info["dtype"]]).view(info["shape"])
+    return tensors, metadata, size
+
+
+@torch.no_grad()
+def load_shared_weights(model, path: str) -> int:
+    """
+    Point the parameters and buffers of `model` at a private memory map of `path` (see `map_safetensors`).
+
+    In-place weight rewrites (e.g. `optimize_for_inference`) copy the touched pages into the process.
+
+    Returns:
+        Number of mapped bytes.
+    """
+    state_dict, metadata, size = map_safetensors(path)
+    if metadata.get("format_version") != SHARED_WEIGHTS_FORMAT_VERSION:
+        raise ValueError(f"{path} was not written by save_shared_weights")
+    for alias, name in json.loads(metadata.get("aliases", "{}")).items():
+        state_dict[alias] = state_dict[name]
+
+    model.load_state_dict(state_dict, strict=True, assign=True)
+    model.tie_weights()
+    return size
+
+
+def load_shared_model(model_path: str, weights_path: str, attn_implementation: str = "sdpa"):
+    """Build the model of `model_path` without allocating its weights and map them from `weights_path`."""
+    from accelerate import init_empty_weights
+
+    from .configuration_vibevoice_streaming import VibeVoiceStreamingConfig
+    from .modeling_vibevoice_streaming_inference import VibeVoiceStreamingForConditionalGenerationInference
+
+    config = VibeVoiceStreamingConfig.from_pretrained(model_path)
+    config._attn_implementation = attn_implementation
+    config.decoder_config._attn_implementation = attn_implementation
+    # Parameters are created on the meta device, non-persistent buffers (rotary tables, ...) are real
+    with init_empty_weights(include_buffers=False):
+        model = VibeVoiceStreamingForConditionalGenerationInference(config)
+    mapped = load_shared_weights(model, weights_path)
+    unmapped = [name for name, parameter in model.named_parameters() if parameter.is_meta]
+    if unmapped:
+        raise ValueError(f"Parameters missing from {weights_path}: {unmapped[:5]}")
+    logger.info(f"Mapped {mapped / 2**20:.1f} MiB of shared weights from {weights_path}")
+    return model.eval()
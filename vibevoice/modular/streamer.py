@@ -3,12 +3,19 @@ from __future__ import annotations
 import torch
 
 import asyncio
+import threading
+import time
 from queue import Queue
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, NamedTuple, Optional
 
 
 from transformers.generation import BaseStreamer
 
+# Marks "nothing queued" in the batch iterators, where `stop_signal` may itself be None
+_EMPTY = object()
+# Seconds between completion checks of a pending device-to-host copy in the async iterators
+_EVENT_POLL_INTERVAL = 0.0005
+
 
 class AudioStreamer(BaseStreamer):
     """
@@ -38,6 +45,14 @@ class AudioStreamer(BaseStreamer):
         self.audio_queues = [Queue() for _ in range(batch_size)]
         self.finished_flags = [False for _ in range(batch_size)]
         self.sample_indices_map = {}  # Maps from sample index to queue index
+        # Samples with queued items, so batch iteration waits instead of polling
+        self._ready = set()
+        self._ready_condition = threading.Condition()
+
+    def _mark_ready(self, idx: int):
+        with self._ready_condition:
+            self._ready.add(idx)
+            self._ready_condition.notify_all()
         
     def put(self, audio_chunks: torch.Tensor, sample_indices: torch.Tensor):
         """
@@ -53,6 +68,7 @@ class AudioStreamer(BaseStreamer):
                 # Convert to numpy or keep as tensor based on preference
                 audio_chunk = audio_chunks[i].detach().cpu()
                 self.audio_queues[idx].put(audio_chunk, timeout=self.timeout)
+                self._mark_ready(idx)
     
     def end(self, sample_indices: Optional[torch.Tensor] = None):
         """
@@ -67,6 +83,7 @@ class AudioStreamer(BaseStreamer):
                 if not self.finished_flags[idx]:
                     self.audio_queues[idx].put(self.stop_signal, timeout=self.timeout)
                     self.finished_flags[idx] = True
+                    self._mark_ready(idx)
         else:
             # End specific samples
             for sample_idx in sample_indices:
@@ -74,6 +91,7 @@ class AudioStreamer(BaseStreamer):
                 if idx < self.batch_size and not self.finished_flags[idx]:
                     self.audio_queues[idx].put(self.stop_signal, timeout=self.timeout)
                     self.finished_flags[idx] = True
+                    self._mark_ready(idx)
     
     def __iter__(self):
         """Returns an iterator over the batch of audio streams."""
@@ -114,42 +132,307 @@ class AudioBatchIterator:
         return self
     
     def __next__(self):
-        if not self.active_samples:
-            raise StopIteration()
-            
-        batch_chunks = {}
-        samples_to_remove = set()
-        
-        # Try to get chunks from all active samples
-        for idx in self.active_samples:
-            try:
-                value = self.streamer.audio_queues[idx].get(block=False)
-                if value == self.streamer.stop_signal:
-                    samples_to_remove.add(idx)
+        streamer = self.streamer
+        while self.active_samples:
+            with streamer._ready_condition:
+                streamer._ready_condition.wait_for(lambda: streamer._ready & self.active_samples, timeout=streamer.timeout)
+                ready = streamer._ready & self.active_samples
+                if not ready:
+                    raise TimeoutError("No audio chunk arrived within the streamer timeout")
+
+            # One chunk per ready sample; samples with more queued chunks stay ready
+            batch_chunks = {}
+            for idx in ready:
+                queue = streamer.audio_queues[idx]
+                with streamer._ready_condition:
+                    value = queue.get_nowait() if not queue.empty() else _EMPTY
+                    if queue.empty():
+                        streamer._ready.discard(idx)
+                if value is _EMPTY:
+                    continue
+                if value is streamer.stop_signal:
+                    self.active_samples.discard(idx)
                 else:
                     batch_chunks[idx] = value
-            except:
-                # Queue is empty for this sample, skip it this iteration
-                pass
-        
-        # Remove finished samples
-        self.active_samples -= samples_to_remove
-        
-        if batch_chunks:
-            return batch_chunks
-        elif self.active_samples:
-            # If no chunks were ready but we still have active samples, 
-            # wait a bit and try again
-            import time
-            time.sleep(0.01)
-            return self.__next__()
+
+            if batch_chunks:
+                return batch_chunks
+        raise StopIteration()
+
+
+class _RingChunk(NamedTuple):
+    """Region of a ring buffer holding one chunk; `size` also counts the tail skipped to keep it contiguous."""
+    start: int
+    length: int
+    size: int
+    event: Optional[object]
+
+
+class RingBufferAudioStreamer(AudioStreamer):
+    """
+    Audio streamer backed by a preallocated float32 ring buffer per sample, yielding numpy views into it.
+
+    Each chunk is converted to float32 exactly once, while it is copied into the ring. Chunks produced on a
+    CUDA device are cast on the device and copied into the (pinned) ring with a non-blocking transfer, so
+    the generation thread does not wait for it; the consumer waits for the copy before reading the chunk.
+
+    A yielded array is only valid until the next chunk of the same stream is requested; copy it to keep it
+    longer. The ring bounds the audio buffered per sample: when it is full, `put` blocks (pausing generation)
+    until the consumer catches up or the stream is ended. A consumer that falls behind receives the chunks
+    queued back to back in the ring as one larger frame, up to `max_frame_samples`.
+
+    Parameters:
+        batch_size (`int`):
+            The batch size for generation
+        capacity (`int`, *optional*):
+            Ring size per sample, in samples. Defaults to 10 s at 24 kHz.
+        max_frame_samples (`int`, *optional*):
+            Largest frame built by coalescing queued chunks. `None` yields every chunk separately.
+        sample_rate (`int`, *optional*):
+            Sample rate of the audio, used to report buffer depths in seconds.
+        stop_signal (`any`, *optional*):
+            The signal to put in the queue when generation ends. Defaults to None.
+        timeout (`float`, *optional*):
+            The timeout for the audio queue. If `None`, the queue will block indefinitely.
+        pin_memory (`bool`, *optional*):
+            Allocate the ring in page-locked memory. Defaults to `torch.cuda.is_available()`.
+        loop (`asyncio.AbstractEventLoop`, *optional*):
+            Publish chunks to this event loop (`loop.call_soon_threadsafe`) for `get_async_stream`, so async
+            consumers await them without executor round trips.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        capacity: int = 240000,
+        stop_signal: Optional[any] = None,
+        timeout: Optional[float] = None,
+        pin_memory: Optional[bool] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        max_frame_samples: Optional[int] = None,
+        sample_rate: int = 24000,
+    ):
+        super().__init__(batch_size, stop_signal, timeout)
+        self.loop = loop
+        self.max_frame_samples = max_frame_samples
+        self.sample_rate = sample_rate
+        if loop is not None:
+            self.audio_queues = [asyncio.Queue() for _ in range(batch_size)]
+        if pin_memory is None:
+            pin_memory = torch.cuda.is_available()
+        self.capacity = capacity
+        self.buffer = torch.empty(batch_size, capacity, dtype=torch.float32, pin_memory=pin_memory)
+        self.arrays = self.buffer.numpy()
+        self._write_positions = [0] * batch_size
+        self._used = [0] * batch_size
+        self._stalled = [0.0] * batch_size
+        self._condition = threading.Condition()
+
+    def _reserve(self, idx: int, length: int) -> Optional[_RingChunk]:
+        """Wait for `length` contiguous free samples in the ring of `idx`; None if the stream ended meanwhile."""
+        with self._condition:
+            while True:
+                if self.finished_flags[idx]:
+                    return None
+                start = self._write_positions[idx]
+                size = length
+                if start + length > self.capacity:
+                    size += self.capacity - start
+                    start = 0
+                if self._used[idx] + size <= self.capacity:
+                    break
+                waited = time.perf_counter()
+                freed = self._condition.wait(timeout=self.timeout)
+                self._stalled[idx] += time.perf_counter() - waited
+                if not freed:
+                    raise TimeoutError("Audio consumer did not free the ring buffer in time")
+            self._used[idx] += size
+            self._write_positions[idx] = (start + length) % self.capacity
+            return _RingChunk(start, length, size, None)
+
+    def _release(self, idx: int, size: int):
+        with self._condition:
+            self._used[idx] -= size
+            self._condition.notify_all()
+
+    def buffered_seconds(self, sample_idx: int) -> float:
+        """Audio of `sample_idx` held in the ring (queued, or yielded and not yet released), in seconds."""
+        with self._condition:
+            return self._used[sample_idx] / self.sample_rate
+
+    def stalled_seconds(self, sample_idx: int) -> float:
+        """Total time `put` waited for the consumer of `sample_idx` to free the ring."""
+        with self._condition:
+            return self._stalled[sample_idx]
+
+    def put(self, audio_chunks: torch.Tensor, sample_indices: torch.Tensor):
+        """
+        Copy audio chunks into the ring buffers of their samples.
+
+        Args:
+            audio_chunks: Tensor of shape (num_samples, ...) containing audio chunks
+            sample_indices: Tensor indicating which samples these chunks belong to
+        """
+        max_length = self.capacity // 2
+        for i, sample_idx in enumerate(sample_indices):
+            idx = sample_idx.item()
+            if idx >= self.batch_size or self.finished_flags[idx]:
+                continue
+            audio = audio_chunks[i].detach().reshape(-1)
+            # Whole-utterance outputs (deferred decoding) are streamed in pieces that fit the ring
+            for offset in range(0, audio.numel(), max_length):
+                piece = audio[offset:offset + max_length]
+                chunk = self._reserve(idx, piece.numel())
+                if chunk is None:
+                    break
+                target = self.buffer[idx, chunk.start:chunk.start + chunk.length]
+                if piece.device.type == "cuda":
+                    target.copy_(piece, non_blocking=True)
+                    event = torch.cuda.Event()
+                    event.record(torch.cuda.current_stream(piece.device))
+                    chunk = chunk._replace(event=event)
+                else:
+                    target.copy_(piece)
+                self._publish(idx, chunk)
+
+    def _publish(self, idx: int, value):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.audio_queues[idx].put_nowait, value)
         else:
+            self.audio_queues[idx].put(value, timeout=self.timeout)
+
+    def end(self, sample_indices: Optional[torch.Tensor] = None):
+        """Signals the end of generation and wakes up a producer waiting for free space."""
+        if sample_indices is None:
+            indices = range(self.batch_size)
+        else:
+            indices = [idx.item() if torch.is_tensor(idx) else idx for idx in sample_indices]
+        for idx in indices:
+            if idx < self.batch_size and not self.finished_flags[idx]:
+                self.finished_flags[idx] = True
+                self._publish(idx, self.stop_signal)
+        with self._condition:
+            self._condition.notify_all()
+
+    def __iter__(self):
+        # Unsupported by design: frames are views into per-sample rings, consumed through per-sample iterators
+        raise TypeError("RingBufferAudioStreamer is not iterable, use get_stream(sample_idx)")
+
+    def get_stream(self, sample_idx: int):
+        """Get the audio stream for a specific sample, as float32 numpy views into the ring buffer."""
+        if sample_idx >= self.batch_size:
+            raise ValueError(f"Sample index {sample_idx} exceeds batch size {self.batch_size}")
+        if self.loop is not None:
+            raise ValueError("This streamer publishes to an event loop, use get_async_stream")
+        return RingBufferSampleIterator(self, sample_idx)
+
+    def get_async_stream(self, sample_idx: int):
+        """Async variant of `get_stream`, for streamers created with a `loop`."""
+        if sample_idx >= self.batch_size:
+            raise ValueError(f"Sample index {sample_idx} exceeds batch size {self.batch_size}")
+        if self.loop is None:
+            raise ValueError("Pass the consuming event loop as `loop` to stream asynchronously")
+        return RingBufferAsyncSampleIterator(self, sample_idx)
+
+
+class RingBufferSampleIterator:
+    """Iterator for a single stream of a `RingBufferAudioStreamer`; frees each frame when the next is requested."""
+
+    def __init__(self, streamer: RingBufferAudioStreamer, sample_idx: int):
+        self.streamer = streamer
+        self.sample_idx = sample_idx
+        self._held = 0
+        # Item taken from the queue while coalescing that did not fit the previous frame
+        self._pending = _EMPTY
+
+    def __iter__(self):
+        return self
+
+    def _release_held(self):
+        if self._held:
+            self.streamer._release(self.sample_idx, self._held)
+            self._held = 0
+
+    def _take_pending(self):
+        value, self._pending = self._pending, _EMPTY
+        return value
+
+    def _frame(self, value):
+        """
+        Build the frame starting with `value`, merging the chunks already queued right after it in the ring.
+
+        Returns:
+            The float32 view and the CUDA events to wait for before reading it, or None at the end of the stream.
+        """
+        if not isinstance(value, _RingChunk):
+            return None
+        streamer = self.streamer
+        queue = streamer.audio_queues[self.sample_idx]
+        start, length, size = value.start, value.length, value.size
+        events = [value.event] if value.event is not None else []
+        while streamer.max_frame_samples and not queue.empty():
+            following = queue.get_nowait()
+            if (
+                not isinstance(following, _RingChunk)
+                or following.start != start + length
+                or length + following.length > streamer.max_frame_samples
+            ):
+                self._pending = following
+                break
+            length += following.length
+            size += following.size
+            if following.event is not None:
+                events.append(following.event)
+        self._held = size
+        return streamer.arrays[self.sample_idx, start:start + length], events
+
+    def __next__(self):
+        self._release_held()
+        value = self._take_pending()
+        if value is _EMPTY:
+            value = self.streamer.audio_queues[self.sample_idx].get(timeout=self.streamer.timeout)
+        frame = self._frame(value)
+        if frame is None:
             raise StopIteration()
+        array, events = frame
+        for event in events:
+            event.synchronize()
+        return array
+
+
+class RingBufferAsyncSampleIterator(RingBufferSampleIterator):
+    """Async iterator for a single stream of a loop-bound `RingBufferAudioStreamer`."""
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        self._release_held()
+        value = self._take_pending()
+        if value is _EMPTY:
+            value = await asyncio.wait_for(self.streamer.audio_queues[self.sample_idx].get(), self.streamer.timeout)
+        frame = self._frame(value)
+        if frame is None:
+            raise StopAsyncIteration()
+        array, events = frame
+        for event in events:
+            # The copy of a 3200-sample chunk is done almost immediately: poll it at a short interval rather
+            # than block the loop on it (or spin the loop with zero-length sleeps)
+            while not event.query():
+                await asyncio.sleep(_EVENT_POLL_INTERVAL)
+        return array
 
 
 class AsyncAudioStreamer(AudioStreamer):
     """
     Async version of AudioStreamer for use in async contexts.
+
+    The generation thread publishes into per-sample `asyncio.Queue`s with `loop.call_soon_threadsafe`;
+    batch iteration waits on a readiness set maintained on the event loop.
+
+    Parameters:
+        loop (`asyncio.AbstractEventLoop`, *optional*):
+            The consuming event loop. Defaults to the running loop.
     """
     
     def __init__(
@@ -157,11 +440,20 @@ class AsyncAudioStreamer(AudioStreamer):
         batch_size: int,
         stop_signal: Optional[any] = None,
         timeout: Optional[float] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
     ):
         super().__init__(batch_size, stop_signal, timeout)
         # Replace regular queues with async queues
         self.audio_queues = [asyncio.Queue() for _ in range(batch_size)]
-        self.loop = asyncio.get_running_loop()
+        self.loop = loop or asyncio.get_running_loop()
+        # Only touched on the event loop
+        self._ready_event = asyncio.Event()
+
+    def _deliver(self, idx: int, value):
+        """Runs on the event loop: enqueue and mark the sample ready."""
+        self.audio_queues[idx].put_nowait(value)
+        self._ready.add(idx)
+        self._ready_event.set()
         
     def put(self, audio_chunks: torch.Tensor, sample_indices: torch.Tensor):
         """Put audio chunks in the appropriate async queues."""
@@ -169,9 +461,7 @@ class AsyncAudioStreamer(AudioStreamer):
             idx = sample_idx.item()
             if idx < self.batch_size and not self.finished_flags[idx]:
                 audio_chunk = audio_chunks[i].detach().cpu()
-                self.loop.call_soon_threadsafe(
-                    self.audio_queues[idx].put_nowait, audio_chunk
-                )
+                self.loop.call_soon_threadsafe(self._deliver, idx, audio_chunk)
     
     def end(self, sample_indices: Optional[torch.Tensor] = None):
         """Signal the end of generation for specified samples."""
@@ -182,9 +472,7 @@ class AsyncAudioStreamer(AudioStreamer):
             
         for idx in indices_to_end:
             if idx < self.batch_size and not self.finished_flags[idx]:
-                self.loop.call_soon_threadsafe(
-                    self.audio_queues[idx].put_nowait, self.stop_signal
-                )
+                self.loop.call_soon_threadsafe(self._deliver, idx, self.stop_signal)
                 self.finished_flags[idx] = True
     
     async def get_stream(self, sample_idx: int):
@@ -194,7 +482,7 @@ class AsyncAudioStreamer(AudioStreamer):
             
         while True:
             value = await self.audio_queues[sample_idx].get()
-            if value == self.stop_signal:
+            if value is self.stop_signal:
                 break
             yield value
     
@@ -204,7 +492,7 @@ class AsyncAudioStreamer(AudioStreamer):
 
 
 class AsyncAudioBatchIterator:
-    """Async iterator for batch audio streaming."""
+    """Async iterator for batch audio streaming, driven by the streamer's readiness set."""
     
     def __init__(self, streamer: AsyncAudioStreamer):
         self.streamer = streamer
@@ -214,51 +502,29 @@ class AsyncAudioBatchIterator:
         return self
         
     async def __anext__(self):
-        if not self.active_samples:
-            raise StopAsyncIteration()
-            
-        batch_chunks = {}
-        samples_to_remove = set()
-        
-        # Create tasks for all active samples
-        tasks = {
-            idx: asyncio.create_task(self._get_chunk(idx)) 
-            for idx in self.active_samples
-        }
-        
-        # Wait for at least one chunk to be ready
-        done, pending = await asyncio.wait(
-            tasks.values(), 
-            return_when=asyncio.FIRST_COMPLETED,
-            timeout=self.streamer.timeout
-        )
-        
-        # Cancel pending tasks
-        for task in pending:
-            task.cancel()
-            
-        # Process completed tasks
-        for idx, task in tasks.items():
-            if task in done:
-                try:
-                    value = await task
-                    if value == self.streamer.stop_signal:
-                        samples_to_remove.add(idx)
-                    else:
-                        batch_chunks[idx] = value
-                except asyncio.CancelledError:
-                    pass
-                    
-        self.active_samples -= samples_to_remove
-        
-        if batch_chunks:
-            return batch_chunks
-        elif self.active_samples:
-            # Try again if we still have active samples
-            return await self.__anext__()
-        else:
-            raise StopAsyncIteration()
-    
-    async def _get_chunk(self, idx):
-        """Helper to get a chunk from a specific queue."""
-        return await self.streamer.audio_queues[idx].get()
\ No newline at end of file
+        streamer = self.streamer
+        while self.active_samples:
+            ready = streamer._ready & self.active_samples
+            if not ready:
+                streamer._ready_event.clear()
+                # Raises `asyncio.TimeoutError` when no sample produces anything within the streamer's timeout
+                await asyncio.wait_for(streamer._ready_event.wait(), streamer.timeout)
+                continue
+
+            # One chunk per ready sample; samples with more queued chunks stay ready
+            batch_chunks = {}
+            for idx in ready:
+                queue = streamer.audio_queues[idx]
+                value = queue.get_nowait() if not queue.empty() else _EMPTY
+                if queue.empty():
+                    streamer._ready.discard(idx)
+                if value is _EMPTY:
+                    continue
+                if value is streamer.stop_signal:
+                    self.active_samples.discard(idx)
+                else:
+                    batch_chunks[idx] = value
+
+            if batch_chunks:
+                return batch_chunks
+        raise StopAsyncIteration()
@@ -0,0 +1,131 @@
+import math
+from fnmatch import fnmatch
+from typing import Dict, Optional
+
+import torch
+import torch.distributed as dist
+import torch.nn as nn
+
+from transformers.utils import logging
+
+logger = logging.get_logger(__name__)
+
+
+def _shard_linear(linear: nn.Linear, style: str, rank: int, world_size: int):
+    """Keep this rank's slice of a Linear: output rows for "colwise", input columns for "rowwise"."""
+    if style == "colwise":
+        weight = linear.weight.chunk(world_size, dim=0)[rank]
+        bias = linear.bias.chunk(world_size, dim=0)[rank] if linear.bias is not None else None
+        linear.out_features = weight.shape[0]
+    elif style == "rowwise":
+        weight = linear.weight.chunk(world_size, dim=1)[rank]
+        # The partial outputs are summed across ranks, so the bias is added by rank 0 only
+        bias = linear.bias if linear.bias is not None and rank == 0 else (
+            torch.zeros_like(linear.bias) if linear.bias is not None else None
+        )
+        linear.in_features = weight.shape[1]
+    else:
+        raise ValueError(f"Unsupported tensor parallel style {style!r}, expected 'colwise' or 'rowwise'")
+    linear.weight = nn.Parameter(weight.clone(), requires_grad=False)
+    if bias is not None:
+        linear.bias = nn.Parameter(bias.clone(), requires_grad=False)
+
+
+def _all_reduce_output(group):
+    def hook(module, args, output):
+        dist.all_reduce(output, group=group)
+        return output
+    return hook
+
+
+def _broadcast_from_rank0(tensor: torch.Tensor, group) -> torch.Tensor:
+    dist.broadcast(tensor, src=dist.get_global_rank(group, 0) if group is not None else 0, group=group)
+    return tensor
+
+
+@torch.no_grad()
+def apply_tensor_parallel(model, group: Optional[dist.ProcessGroup] = None) -> Dict[str, int]:
+    """
+    Shard the Qwen layers of `language_model` and `tts_language_model` across the ranks of `group` following
+    `config.base_model_tp_plan` (colwise q/k/v and gate/up, rowwise o/down followed by an all-reduce).
+
+    Everything else (diffusion head, connector, EOS classifier, acoustic decoder) stays replicated. Every rank
+    runs the same `generate` call in lockstep; the sampled speech latents and the EOS probabilities are
+    broadcast from rank 0, so the ranks cannot drift apart, and only rank 0 decodes audio. Voice presets must
+    be sharded with `shard_prefilled_outputs`.
+
+    Args:
+        model: fp32 `VibeVoiceStreamingForConditionalGenerationInference` on CPU, identical on every rank.
+        group: Process group to shard over (default: the world, e.g. `init_process_group("gloo")` under torchrun).
+
+    Returns:
+        Number of sharded Linear layers per language model.
+    """
+    rank, world_size = dist.get_rank(group), dist.get_world_size(group)
+    decoder_config = model.config.decoder_config
+    for name, value in (
+        ("num_attention_heads", decoder_config.num_attention_heads),
+        ("num_key_value_heads", decoder_config.num_key_value_heads),
+        ("intermediate_size", decoder_config.intermediate_size),
+    ):
+        if value % world_size != 0:
+            raise ValueError(f"{name}={value} is not divisible by the tensor parallel size {world_size}")
+
+    tp_plan = model.config.base_model_tp_plan or {}
+    counts = {}
+    for lm_name in ("language_model", "tts_language_model"):
+        language_model = getattr(model.model, lm_name)
+        counts[lm_name] = 0
+        for name, module in language_model.named_modules():
+            style = next((style for pattern, style in tp_plan.items() if fnmatch(name, pattern)), None)
+            if style is None or type(module) is not nn.Linear:
+                continue
+            _shard_linear(module, style, rank, world_size)
+            if style == "rowwise":
+                module.register_forward_hook(_all_reduce_output(group))
+            counts[lm_name] += 1
+
+    # Keep the replicated stochastic parts bit-identical across ranks
+    sample_speech_tokens = model.sample_speech_tokens
+
+    def broadcast_sample_speech_tokens(*args, **kwargs):
+        return _broadcast_from_rank0(sample_speech_tokens(*args, **kwargs).contiguous(), group)
+
+    model.sample_speech_tokens = broadcast_sample_speech_tokens
+    model.tts_eos_classifier.register_forward_hook(
+        lambda module, args, output: _broadcast_from_rank0(output.contiguous(), group)
+    )
+
+    if rank != 0:
+        # Audio is produced by rank 0; the other ranks only keep the language models in lockstep
+        hop_length = math.prod(model.model.acoustic_tokenizer.decoder.ratios)
+
+        def skip_decode(speech_latents, *args, **kwargs):
+            batch_size = speech_latents[0].shape[0]
+            return torch.zeros(batch_size, 1, len(speech_latents) * hop_length, dtype=torch.float32)
+
+        model._decode_speech_latents = skip_decode
+
+    model._tensor_parallel_group = (group, rank, world_size)
+    logger.info(f"Rank {rank}/{world_size}: sharded Linear layers {counts}")
+    return counts
+
+
+def shard_prefilled_outputs(model, all_prefilled_outputs):
+    """Keep this rank's KV heads of a voice preset (in place), matching `apply_tensor_parallel`."""
+    if getattr(model, "_tensor_parallel_group", None) is None:
+        raise ValueError("Call apply_tensor_parallel before sharding voice presets")
+    _, rank, world_size = model._tensor_parallel_group
+    for key in ("lm", "tts_lm", "neg_lm", "neg_tts_lm"):
+        outputs = all_prefilled_outputs.get(key)
+        if outputs is None:
+            continue
+        past_key_values = outputs["past_key_values"]
+        if hasattr(past_key_values, "key_cache"):
+            past_key_values.key_cache = [k.chunk(world_size, dim=1)[rank].contiguous() for k in past_key_values.key_cache]
+            past_key_values.value_cache = [v.chunk(world_size, dim=1)[rank].contiguous() for v in past_key_values.value_cache]
+        else:
+            outputs["past_key_values"] = tuple(
+                tuple(tensor.chunk(world_size, dim=1)[rank].contiguous() for tensor in layer) for layer in past_key_values
+            )
+    return all_prefilled_outputs
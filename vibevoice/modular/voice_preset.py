@@ -0,0 +1,182 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import torch
+
+from transformers.cache_utils import Cache, DynamicCache
+from transformers.modeling_outputs import ModelOutput
+from transformers.utils import logging
+
+from .shared_weights import map_safetensors
+
+logger = logging.get_logger(__name__)
+
+VOICE_PRESET_FORMAT_VERSION = "1"
+VOICE_PRESET_SUFFIX = ".safetensors"
+# Prefilled prompt outputs of a voice preset: the language models and their negative (CFG) counterparts
+PRESET_KEYS = ("lm", "tts_lm", "neg_lm", "neg_tts_lm")
+
+
+@dataclass
+class VibeVoicePrefilledOutput(ModelOutput):
+    """
+    Prefilled prompt outputs of one language model, as read by `generate` and
+    `VibeVoiceStreamingProcessor.process_input_with_cached_prompt`.
+
+    Args:
+        last_hidden_state (`torch.FloatTensor` of shape `(batch_size, 1, hidden_size)`):
+            Hidden state of the final prompt position (the only one `generate` reads).
+        past_key_values (`Cache`):
+            KV cache of the prompt.
+        prompt_length (`int`):
+            Number of prompt tokens.
+    """
+    last_hidden_state: torch.FloatTensor = None
+    past_key_values: Optional[Cache] = None
+    prompt_length: Optional[int] = None
+
+
+def prompt_length(outputs) -> int:
+    """Prompt length of prefilled outputs, slim or as stored in the original `.pt` presets."""
+    length = outputs.get("prompt_length") if hasattr(outputs, "get") else None
+    if length is not None:
+        return int(length)
+    return outputs["last_hidden_state"].size(1)
+
+
+def _kv_lists(past_key_values) -> Tuple[List[torch.Tensor], List[torch.Tensor]]:
+    if hasattr(past_key_values, "key_cache"):
+        return list(past_key_values.key_cache), list(past_key_values.value_cache)
+    return [key for key, _ in past_key_values], [value for _, value in past_key_values]
+
+
+def _cache_from_lists(keys: List[torch.Tensor], values: List[torch.Tensor]) -> DynamicCache:
+    # The cache holds references to the tensors, nothing is copied
+    return DynamicCache.from_legacy_cache(tuple(zip(keys, values)))
+
+
+def clone_prefilled_outputs(all_prefilled_outputs: Dict[str, object]) -> Dict[str, VibeVoicePrefilledOutput]:
+    """
+    Copy of a preset for one `generate` call, sharing its tensors.
+
+    `generate` grows the KV caches by replacing their per-layer tensors with concatenations, so fresh cache
+    objects are enough to keep the preset untouched: unlike `copy.deepcopy`, no tensor is copied and the
+    mapped pages of a slim preset stay shared.
+    """
+    cloned = {}
+    for name, outputs in all_prefilled_outputs.items():
+        cloned[name] = VibeVoicePrefilledOutput(
+            last_hidden_state=outputs["last_hidden_state"],
+            past_key_values=_cache_from_lists(*_kv_lists(outputs["past_key_values"])),
+            prompt_length=prompt_length(outputs),
+        )
+    return cloned
+
+
+def preset_nbytes(all_prefilled_outputs: Dict[str, object]) -> int:
+    """Bytes held by the tensors of a preset (KV caches and hidden states)."""
+    total = 0
+    for outputs in all_prefilled_outputs.values():
+        keys, values = _kv_lists(outputs["past_key_values"])
+        total += outputs["last_hidden_state"].nbytes + sum(tensor.nbytes for tensor in keys + values)
+    return total
+
+
+def save_voice_preset(all_prefilled_outputs: Dict[str, object], path: str, dtype: Optional[torch.dtype] = None) -> str:
+    """
+    Write a voice preset in the slim safetensors format read by `load_voice_preset`.
+
+    Only what inference reads is kept: the KV caches, the hidden state of the final prompt position, and the
+    prompt lengths (as metadata).
+
+    Args:
+        all_prefilled_outputs: Preset with the `PRESET_KEYS` outputs, e.g. loaded from a `.pt` preset.
+        path: Output file, conventionally with a `.safetensors` extension.
+        dtype: Storage dtype (default: as stored). Store presets in the dtype of the serving model, so they
+            load without a cast (and thereby a copy).
+    """
+    from safetensors.torch import save_file
+
+    tensors: Dict[str, torch.Tensor] = {}
+    lengths: Dict[str, int] = {}
+    num_layers: Dict[str, int] = {}
+    for name in PRESET_KEYS:
+        outputs = all_prefilled_outputs[name]
+        keys, values = _kv_lists(outputs["past_key_values"])
+        length = prompt_length(outputs)
+        if keys and keys[0].shape[-2] != length:
+            raise ValueError(f"{name}: KV cache holds {keys[0].shape[-2]} positions for a prompt of {length} tokens")
+        lengths[name] = length
+        num_layers[name] = len(keys)
+        for index, (key, value) in enumerate(zip(keys, values)):
+            tensors[f"{name}.{index}.key"] = key
+            tensors[f"{name}.{index}.value"] = value
+        tensors[f"{name}.last_hidden_state"] = outputs["last_hidden_state"][:, -1:, :]
+    tensors = {
+        name: tensor.detach().to("cpu", dtype or tensor.dtype).contiguous()
+        for name, tensor in tensors.items()
+    }
+
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    # Written next to the target and renamed, so a server never maps a partial file
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    save_file(tensors, tmp_path, metadata={
+        "format_version": VOICE_PRESET_FORMAT_VERSION,
+        "prompt_lengths": json.dumps(lengths),
+        "num_layers": json.dumps(num_layers),
+    })
+    os.replace(tmp_path, path)
+    return path
+
+
+def convert_voice_preset(preset_path: str, output_path: Optional[str] = None, dtype: Optional[torch.dtype] = None) -> str:
+    """Convert a `.pt` voice preset to the slim format (next to it by default)."""
+    if output_path is None:
+        output_path = os.path.splitext(preset_path)[0] + VOICE_PRESET_SUFFIX
+    # Only for trusted files: the original presets are pickles of transformers objects
+    preset = torch.load(preset_path, map_location="cpu", weights_only=False)
+    return save_voice_preset(preset, output_path, dtype=dtype)
+
+
+def load_voice_preset(path: str, device="cpu", mmap: bool = True) -> Dict[str, VibeVoicePrefilledOutput]:
+    """
+    Load a preset written by `save_voice_preset`.
+
+    With `mmap` (CPU only), the tensors are views into a private memory map of the file (see
+    `map_safetensors`): loading reads only the header, each layer's KV pages are read from disk when its
+    attention first touches them, and processes serving the same preset share its pages. Otherwise the
+    tensors are copied to `device`.
+    """
+    tensors, metadata, _ = map_safetensors(path)
+    if metadata.get("format_version") != VOICE_PRESET_FORMAT_VERSION:
+        raise ValueError(f"{path} is not a voice preset written by save_voice_preset")
+    device = torch.device(device)
+    if not mmap or device.type != "cpu":
+        tensors = {name: tensor.to(device, copy=True) for name, tensor in tensors.items()}
+
+    lengths = json.loads(metadata["prompt_lengths"])
+    num_layers = json.loads(metadata["num_layers"])
+    preset = {}
+    for name in PRESET_KEYS:
+        layers = range(num_layers[name])
+        preset[name] = VibeVoicePrefilledOutput(
+            last_hidden_state=tensors[f"{name}.last_hidden_state"],
+            past_key_values=_cache_from_lists(
+                [tensors[f"{name}.{index}.key"] for index in layers],
+                [tensors[f"{name}.{index}.value"] for index in layers],
+            ),
+            prompt_length=lengths[name],
+        )
+    return preset
+
+
+def load_prefilled_outputs(path: str, device="cpu", mmap: bool = True) -> Dict[str, object]:
+    """Load a voice preset in either format: slim `.safetensors`, or the original (pickled) `.pt`."""
+    if os.fspath(path).endswith(VOICE_PRESET_SUFFIX):
+        return load_voice_preset(path, device=device, mmap=mmap)
+    logger.info(f"Loading pickled voice preset {path}, convert it with vibevoice/scripts/convert_voice_presets.py")
+    return torch.load(path, map_location=device, weights_only=False)
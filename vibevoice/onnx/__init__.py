@@ -0,0 +1,9 @@
+# vibevoice/onnx/__init__.py
+# The runtime only needs onnxruntime, numpy and tokenizers; the exporter (`vibevoice.onnx.export`) needs
+# torch and transformers and is imported explicitly.
+from .runtime import DPMSolverNumpy, VibeVoiceOnnxRuntime
+
+__all__ = [
+    "DPMSolverNumpy",
+    "VibeVoiceOnnxRuntime",
+]
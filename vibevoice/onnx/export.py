@@ -0,0 +1,325 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from transformers import DynamicCache
+from transformers.utils import logging
+
+from vibevoice.modular.modeling_vibevoice_streaming_inference import TTS_SPEECH_WINDOW_SIZE, TTS_TEXT_WINDOW_SIZE
+from vibevoice.modular.modular_vibevoice_tokenizer import SConvTranspose1d
+
+logger = logging.get_logger(__name__)
+
+PRESET_KEYS = ("lm", "tts_lm", "neg_lm", "neg_tts_lm")
+
+
+def _run_with_kv(language_model, inputs_embeds, past_keys, past_values):
+    """
+    Run a Qwen2 model on `inputs_embeds` on top of a stacked `[layers, 1, kv_heads, past, head_dim]` KV cache.
+
+    Batch size is 1 and there is no padding, so positions simply continue after the past length.
+    """
+    past_length = past_keys.shape[3]
+    seq_length = inputs_embeds.shape[1]
+    cache = DynamicCache()
+    for layer_idx in range(past_keys.shape[0]):
+        cache.update(past_keys[layer_idx], past_values[layer_idx], layer_idx)
+
+    cache_position = torch.arange(past_length, past_length + seq_length, device=inputs_embeds.device)
+    attention_mask = torch.ones(1, past_length + seq_length, dtype=torch.long, device=inputs_embeds.device)
+    outputs = language_model(
+        inputs_embeds=inputs_embeds,
+        attention_mask=attention_mask,
+        position_ids=cache_position.unsqueeze(0),
+        past_key_values=cache,
+        use_cache=True,
+        cache_position=cache_position,
+        return_dict=True,
+    )
+    present = outputs.past_key_values
+    return outputs.last_hidden_state, torch.stack(present.key_cache), torch.stack(present.value_cache)
+
+
+class _LanguageModelStep(nn.Module):
+    """Base text LM step: token ids + KV in, hidden states + KV out."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.embed_tokens = model.model.get_input_embeddings()
+        self.language_model = model.model.language_model
+
+    def forward(self, input_ids, past_keys, past_values):
+        return _run_with_kv(self.language_model, self.embed_tokens(input_ids), past_keys, past_values)
+
+
+class _TTSLanguageModelStep(nn.Module):
+    """TTS LM step (see `forward_tts_lm`): embeddings + text/speech type ids + KV in, hidden states, EOS probability + KV out."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.tts_input_types = model.model.tts_input_types
+        self.language_model = model.model.tts_language_model
+        self.tts_eos_classifier = model.tts_eos_classifier
+
+    def forward(self, inputs_embeds, type_ids, past_keys, past_values):
+        inputs_embeds = inputs_embeds + self.tts_input_types(type_ids)
+        hidden_states, present_keys, present_values = _run_with_kv(self.language_model, inputs_embeds, past_keys, past_values)
+        eos_prob = torch.sigmoid(self.tts_eos_classifier(hidden_states[:, -1, :]))
+        return hidden_states, eos_prob, present_keys, present_values
+
+
+class _DiffusionHeadStep(nn.Module):
+    """One classifier-free guided prediction of the diffusion head (see `sample_speech_tokens`)."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.prediction_head = model.model.prediction_head
+
+    def forward(self, sample, timestep, condition, cfg_scale):
+        combined = torch.cat([sample, sample], dim=0)
+        eps = self.prediction_head(combined, timestep.expand(combined.shape[0]), condition=condition)
+        cond_eps, uncond_eps = torch.split(eps, sample.shape[0], dim=0)
+        return uncond_eps + cfg_scale * (cond_eps - uncond_eps)
+
+
+class _ExplicitStateCache:
+    """
+    Stand-in for `VibeVoiceTokenizerStreamingCache` (same `window`/`advance`/`get`/`set` interface) that
+    takes the conv states from graph inputs and collects the updated ones as graph outputs.
+
+    Without `states` it records the layer order and state shapes of one streaming step instead.
+    """
+
+    def __init__(self, states: Optional[Dict[str, torch.Tensor]] = None):
+        self.states = states
+        self.layout: Dict[str, tuple] = {}
+        self.updated: Dict[str, torch.Tensor] = {}
+
+    def _state(self, layer_id, shape, like):
+        if self.states is None:
+            self.layout.setdefault(layer_id, tuple(shape))
+            return like.new_zeros(shape)
+        return self.states[layer_id]
+
+    def window(self, layer_id, sample_indices, x, context_size):
+        if context_size == 0:
+            return x
+        state = self._state(layer_id, (x.shape[0], x.shape[1], context_size), x)
+        return torch.cat([state, x], dim=2)
+
+    def advance(self, layer_id, sample_indices, window, context_size):
+        if context_size == 0:
+            return
+        self.updated[layer_id] = window[:, :, window.shape[2] - context_size:]
+
+    def get(self, layer_id, sample_indices):
+        if self.states is None:
+            return None
+        return self.states[layer_id]
+
+    def set(self, layer_id, sample_indices, states):
+        if self.states is None:
+            self.layout.setdefault(layer_id, tuple(states.shape))
+        self.updated[layer_id] = states
+
+
+class _AcousticDecoderStep(nn.Module):
+    """Streaming acoustic decoder step: raw speech latents + conv states in, audio + conv states out."""
+
+    def __init__(self, model, layer_ids: List[str]):
+        super().__init__()
+        self.model = model
+        self.layer_ids = layer_ids
+
+    def forward(self, speech_latents, *states):
+        cache = _ExplicitStateCache(dict(zip(self.layer_ids, states)))
+        scaled_latents = self.model._prepare_latent_for_decode(speech_latents).transpose(1, 2)
+        sample_indices = torch.zeros(1, dtype=torch.long, device=scaled_latents.device)
+        audio = self.model.model.acoustic_tokenizer.decode(
+            scaled_latents, cache=cache, sample_indices=sample_indices, use_cache=True,
+        )
+        return (audio,) + tuple(cache.updated[layer_id] for layer_id in self.layer_ids)
+
+
+def _stack_kv(past_key_values):
+    """Stack a `DynamicCache` (or legacy tuple cache) into `[layers, 1, kv_heads, length, head_dim]` arrays."""
+    if hasattr(past_key_values, "key_cache"):
+        keys, values = past_key_values.key_cache, past_key_values.value_cache
+    else:
+        keys, values = [k for k, _ in past_key_values], [v for _, v in past_key_values]
+    return (
+        torch.stack(keys).float().cpu().numpy(),
+        torch.stack(values).float().cpu().numpy(),
+    )
+
+
+def convert_voice_preset(preset_path: str, output_path: str) -> str:
+    """
+    Convert a voice preset (`.pt` prefilled prompt outputs) into the `.npz` format of the ONNX runtime.
+
+    Stores, for each of lm / tts_lm / neg_lm / neg_tts_lm, the stacked KV cache and the last hidden state.
+    """
+    preset = torch.load(preset_path, map_location="cpu", weights_only=False)
+    arrays = {}
+    for name in PRESET_KEYS:
+        keys, values = _stack_kv(preset[name]["past_key_values"])
+        arrays[f"{name}_keys"] = keys
+        arrays[f"{name}_values"] = values
+        arrays[f"{name}_last_hidden_state"] = preset[name]["last_hidden_state"][:, -1, :].float().cpu().numpy()
+    np.savez(output_path, **arrays)
+    return output_path
+
+
+def _scheduler_tables(model) -> Dict:
+    """Timesteps, sigmas and solver settings of the model's DPM-Solver for `ddpm_inference_steps`."""
+    scheduler = model.model.noise_scheduler.from_config(model.model.noise_scheduler.config)
+    scheduler.set_timesteps(model.ddpm_inference_steps)
+    config = scheduler.config
+    if config.solver_order > 2 or config.algorithm_type not in ("dpmsolver++", "sde-dpmsolver++"):
+        raise NotImplementedError(
+            f"The ONNX runtime supports order <= 2 dpmsolver++ / sde-dpmsolver++, got {config.algorithm_type} order {config.solver_order}"
+        )
+    if config.thresholding:
+        raise NotImplementedError("Thresholding is not supported by the ONNX runtime")
+    return {
+        "timesteps": [float(t) for t in scheduler.timesteps],
+        "sigmas": [float(s) for s in scheduler.sigmas],
+        "algorithm_type": config.algorithm_type,
+        "solver_type": config.solver_type,
+        "solver_order": config.solver_order,
+        "prediction_type": config.prediction_type,
+        "lower_order_final": config.lower_order_final,
+        "euler_at_final": config.euler_at_final,
+        "final_sigmas_type": config.final_sigmas_type,
+    }
+
+
+def _export(module, args, path, input_names, output_names, dynamic_axes, opset):
+    torch.onnx.export(
+        module, args, path,
+        input_names=input_names, output_names=output_names, dynamic_axes=dynamic_axes,
+        opset_version=opset, do_constant_folding=True,
+    )
+    logger.info(f"Exported {path}")
+
+
+@torch.no_grad()
+def export_onnx(model, processor, output_dir: str, opset: int = 17) -> Dict:
+    """
+    Export the streaming components of a VibeVoice model to ONNX graphs with explicit state I/O.
+
+    Writes to `output_dir`:
+        - `lm_step.onnx`: base text LM step, `input_ids` + `past_keys/values` -> `hidden_states` + `present_keys/values`.
+        - `tts_lm_step.onnx`: TTS LM step, `inputs_embeds` + `type_ids` + KV -> `hidden_states`, `eos_prob` + KV.
+        - `diffusion_head.onnx`: guided prediction for one solver step.
+        - `acoustic_connector.onnx`: speech latent -> TTS LM input embedding.
+        - `acoustic_decoder.onnx`: streaming decoder step with every conv context / overlap-add tail as state I/O.
+        - `runtime_config.json` (shapes, window sizes, solver tables) and the text tokenizer.
+
+    The graphs are fp32 with eager attention, for the onnxruntime CPU execution provider. The model is
+    converted to fp32 on CPU in place.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    model = model.float().cpu().eval()
+    for language_model in (model.model.language_model, model.model.tts_language_model):
+        language_model.config._attn_implementation = "eager"
+    for module in model.model.acoustic_tokenizer.decoder.modules():
+        if isinstance(module, SConvTranspose1d) and not module._supports_overlap_add():
+            raise NotImplementedError("Explicit decoder states need overlap-add transposed convs (conv_norm='none', causal)")
+
+    config = model.config
+    hidden_size = config.decoder_config.hidden_size
+    num_kv_heads = config.decoder_config.num_key_value_heads
+    head_dim = getattr(config.decoder_config, "head_dim", None) or hidden_size // config.decoder_config.num_attention_heads
+    latent_dim = config.acoustic_vae_dim
+    past_length = 4
+    kv_axes = {0: "layers", 3: "past_length"}
+    present_axes = {0: "layers", 3: "total_length"}
+
+    def dummy_kv(num_layers):
+        shape = (num_layers, 1, num_kv_heads, past_length, head_dim)
+        return torch.randn(shape), torch.randn(shape)
+
+    lm_layers = len(model.model.language_model.layers)
+    _export(
+        _LanguageModelStep(model),
+        (torch.zeros(1, 3, dtype=torch.long), *dummy_kv(lm_layers)),
+        os.path.join(output_dir, "lm_step.onnx"),
+        ["input_ids", "past_keys", "past_values"],
+        ["hidden_states", "present_keys", "present_values"],
+        {"input_ids": {1: "seq_length"}, "past_keys": kv_axes, "past_values": kv_axes,
+         "hidden_states": {1: "seq_length"}, "present_keys": present_axes, "present_values": present_axes},
+        opset,
+    )
+
+    tts_layers = len(model.model.tts_language_model.layers)
+    _export(
+        _TTSLanguageModelStep(model),
+        (torch.randn(1, 3, hidden_size), torch.ones(1, 3, dtype=torch.long), *dummy_kv(tts_layers)),
+        os.path.join(output_dir, "tts_lm_step.onnx"),
+        ["inputs_embeds", "type_ids", "past_keys", "past_values"],
+        ["hidden_states", "eos_prob", "present_keys", "present_values"],
+        {"inputs_embeds": {1: "seq_length"}, "type_ids": {1: "seq_length"}, "past_keys": kv_axes, "past_values": kv_axes,
+         "hidden_states": {1: "seq_length"}, "present_keys": present_axes, "present_values": present_axes},
+        opset,
+    )
+
+    _export(
+        _DiffusionHeadStep(model),
+        (torch.randn(1, latent_dim), torch.full((1,), 500.0), torch.randn(2, hidden_size), torch.full((1,), 1.5)),
+        os.path.join(output_dir, "diffusion_head.onnx"),
+        ["sample", "timestep", "condition", "cfg_scale"],
+        ["model_output"],
+        None,
+        opset,
+    )
+
+    _export(
+        model.model.acoustic_connector,
+        (torch.randn(1, 1, latent_dim),),
+        os.path.join(output_dir, "acoustic_connector.onnx"),
+        ["speech_latent"],
+        ["speech_embed"],
+        None,
+        opset,
+    )
+
+    # Record the decoder state layout with one streaming step, then export with the states as I/O
+    recorder = _ExplicitStateCache()
+    model.model.acoustic_tokenizer.decode(
+        torch.zeros(1, latent_dim, 1), cache=recorder, sample_indices=torch.zeros(1, dtype=torch.long), use_cache=True,
+    )
+    layer_ids = list(recorder.layout)
+    state_names = [f"state_{i}" for i in range(len(layer_ids))]
+    _export(
+        _AcousticDecoderStep(model, layer_ids),
+        (torch.randn(1, 1, latent_dim), *[torch.zeros(recorder.layout[layer_id]) for layer_id in layer_ids]),
+        os.path.join(output_dir, "acoustic_decoder.onnx"),
+        ["speech_latents"] + state_names,
+        ["audio"] + [f"new_{name}" for name in state_names],
+        {"speech_latents": {1: "num_frames"}, "audio": {2: "num_samples"}},
+        opset,
+    )
+
+    processor.tokenizer.save_pretrained(output_dir)
+    runtime_config = {
+        "hidden_size": hidden_size,
+        "latent_dim": latent_dim,
+        "num_lm_layers": lm_layers,
+        "num_tts_lm_layers": tts_layers,
+        "num_key_value_heads": num_kv_heads,
+        "head_dim": head_dim,
+        "max_position_embeddings": config.decoder_config.max_position_embeddings,
+        "text_window_size": TTS_TEXT_WINDOW_SIZE,
+        "speech_window_size": TTS_SPEECH_WINDOW_SIZE,
+        "sample_rate": 24000,
+        "decoder_states": [list(recorder.layout[layer_id]) for layer_id in layer_ids],
+        "scheduler": _scheduler_tables(model),
+    }
+    with open(os.path.join(output_dir, "runtime_config.json"), "w", encoding="utf-8") as f:
+        json.dump(runtime_config, f, indent=2)
+    return runtime_config
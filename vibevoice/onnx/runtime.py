@@ -0,0 +1,304 @@
+"""
+Lean ONNX runtime for VibeVoice streaming TTS.
+
+Reproduces `VibeVoiceStreamingForConditionalGenerationInference.generate` (batch size 1) on top of
+onnxruntime, numpy and `tokenizers`, without torch or transformers. The graphs, tokenizer, solver tables
+and voice presets are produced by `vibevoice/scripts/export_onnx.py`.
+"""
+import argparse
+import json
+import os
+import wave
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+class DPMSolverNumpy:
+    """
+    Numpy port of the (SDE-)DPM-Solver++ multistep update of `vibevoice.schedule.dpm_solver` for solver
+    order <= 2, driven by the timestep/sigma tables exported with the model.
+    """
+
+    def __init__(self, tables: Dict):
+        self.timesteps = np.asarray(tables["timesteps"], dtype=np.float32)
+        self.sigmas = np.asarray(tables["sigmas"], dtype=np.float64)
+        self.algorithm_type = tables["algorithm_type"]
+        self.solver_type = tables["solver_type"]
+        self.solver_order = tables["solver_order"]
+        self.prediction_type = tables["prediction_type"]
+        self.lower_order_final = tables["lower_order_final"]
+        self.euler_at_final = tables["euler_at_final"]
+        self.final_sigmas_type = tables["final_sigmas_type"]
+
+    @property
+    def uses_noise(self) -> bool:
+        return self.algorithm_type == "sde-dpmsolver++"
+
+    @staticmethod
+    def _alpha_sigma_lambda(sigma):
+        alpha_t = 1.0 / np.sqrt(sigma ** 2 + 1.0)
+        sigma_t = sigma * alpha_t
+        with np.errstate(divide="ignore"):
+            lambda_t = np.log(alpha_t) - np.log(sigma_t)
+        return alpha_t, sigma_t, lambda_t
+
+    def _convert_model_output(self, model_output, sample, step_index):
+        alpha_t, sigma_t, _ = self._alpha_sigma_lambda(self.sigmas[step_index])
+        if self.prediction_type == "epsilon":
+            return (sample - sigma_t * model_output) / alpha_t
+        if self.prediction_type == "sample":
+            return model_output
+        return alpha_t * sample - sigma_t * model_output  # v_prediction
+
+    def _first_order(self, x0, sample, step_index, noise):
+        alpha_t, sigma_t, lambda_t = self._alpha_sigma_lambda(self.sigmas[step_index + 1])
+        _, sigma_s, lambda_s = self._alpha_sigma_lambda(self.sigmas[step_index])
+        h = lambda_t - lambda_s
+        if self.algorithm_type == "dpmsolver++":
+            return (sigma_t / sigma_s) * sample - (alpha_t * (np.exp(-h) - 1.0)) * x0
+        return (
+            (sigma_t / sigma_s * np.exp(-h)) * sample
+            + (alpha_t * (1 - np.exp(-2.0 * h))) * x0
+            + sigma_t * np.sqrt(1.0 - np.exp(-2 * h)) * noise
+        )
+
+    def _second_order(self, x0_list, sample, step_index, noise):
+        alpha_t, sigma_t, lambda_t = self._alpha_sigma_lambda(self.sigmas[step_index + 1])
+        _, sigma_s0, lambda_s0 = self._alpha_sigma_lambda(self.sigmas[step_index])
+        _, _, lambda_s1 = self._alpha_sigma_lambda(self.sigmas[step_index - 1])
+        m0, m1 = x0_list[-1], x0_list[-2]
+        h, h_0 = lambda_t - lambda_s0, lambda_s0 - lambda_s1
+        r0 = h_0 / h
+        D0, D1 = m0, (1.0 / r0) * (m0 - m1)
+        if self.algorithm_type == "dpmsolver++":
+            if self.solver_type == "midpoint":
+                return (
+                    (sigma_t / sigma_s0) * sample
+                    - (alpha_t * (np.exp(-h) - 1.0)) * D0
+                    - 0.5 * (alpha_t * (np.exp(-h) - 1.0)) * D1
+                )
+            return (
+                (sigma_t / sigma_s0) * sample
+                - (alpha_t * (np.exp(-h) - 1.0)) * D0
+                + (alpha_t * ((np.exp(-h) - 1.0) / h + 1.0)) * D1
+            )
+        if self.solver_type == "midpoint":
+            return (
+                (sigma_t / sigma_s0 * np.exp(-h)) * sample
+                + (alpha_t * (1 - np.exp(-2.0 * h))) * D0
+                + 0.5 * (alpha_t * (1 - np.exp(-2.0 * h))) * D1
+                + sigma_t * np.sqrt(1.0 - np.exp(-2 * h)) * noise
+            )
+        return (
+            (sigma_t / sigma_s0 * np.exp(-h)) * sample
+            + (alpha_t * (1 - np.exp(-2.0 * h))) * D0
+            + (alpha_t * ((1.0 - np.exp(-2.0 * h)) / (-2.0 * h) + 1.0)) * D1
+            + sigma_t * np.sqrt(1.0 - np.exp(-2 * h)) * noise
+        )
+
+    def sample(self, predict: Callable, sample: np.ndarray, noise_fn: Callable) -> np.ndarray:
+        """
+        Run the full solver loop.
+
+        Args:
+            predict: `predict(sample, timestep)` returning the (guided) model output.
+            sample: Initial noise of the kept rows.
+            noise_fn: Draws SDE noise; called with the shape of the doubled CFG batch, like the PyTorch path.
+        """
+        num_steps = len(self.timesteps)
+        x0_list = [None] * self.solver_order
+        lower_order_nums = 0
+        for step_index, timestep in enumerate(self.timesteps):
+            lower_order_final = (step_index == num_steps - 1) and (
+                self.euler_at_final
+                or (self.lower_order_final and num_steps < 15)
+                or self.final_sigmas_type == "zero"
+            )
+            model_output = predict(sample, timestep)
+            x0 = self._convert_model_output(model_output, sample, step_index)
+            x0_list = x0_list[1:] + [x0]
+            noise = noise_fn((2 * sample.shape[0],) + sample.shape[1:])[:sample.shape[0]] if self.uses_noise else None
+            if self.solver_order == 1 or lower_order_nums < 1 or lower_order_final:
+                sample = self._first_order(x0, sample, step_index, noise)
+            else:
+                sample = self._second_order(x0_list, sample, step_index, noise)
+            sample = sample.astype(np.float32)
+            lower_order_nums = min(lower_order_nums + 1, self.solver_order)
+        return sample
+
+
+class VibeVoiceOnnxRuntime:
+    """
+    Streaming TTS on exported ONNX graphs.
+
+    Args:
+        export_dir (`str`): Directory written by `vibevoice.onnx.export.export_onnx`.
+        num_threads (`int`, *optional*): onnxruntime intra-op threads per graph.
+        providers (`Tuple[str]`, *optional*): onnxruntime execution providers.
+    """
+
+    GRAPHS = ("lm_step", "tts_lm_step", "diffusion_head", "acoustic_connector", "acoustic_decoder")
+
+    def __init__(self, export_dir: str, num_threads: Optional[int] = None, providers: Tuple[str, ...] = ("CPUExecutionProvider",)):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(export_dir, "runtime_config.json"), "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.sessions = {
+            name: ort.InferenceSession(os.path.join(export_dir, f"{name}.onnx"), options, providers=list(providers))
+            for name in self.GRAPHS
+        }
+        self.tokenizer = Tokenizer.from_file(os.path.join(export_dir, "tokenizer.json"))
+        self.solver = DPMSolverNumpy(self.config["scheduler"])
+        self.sample_rate = self.config["sample_rate"]
+
+    @staticmethod
+    def load_voice(path: str) -> Dict[str, np.ndarray]:
+        """Load a voice preset converted with `vibevoice.onnx.export.convert_voice_preset`."""
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    def _lm_step(self, input_ids, kv):
+        hidden_states, keys, values = self.sessions["lm_step"].run(
+            None, {"input_ids": input_ids, "past_keys": kv[0], "past_values": kv[1]},
+        )
+        return hidden_states, (keys, values)
+
+    def _tts_lm_step(self, inputs_embeds, is_text: bool, kv):
+        type_ids = np.full(inputs_embeds.shape[:2], 1 if is_text else 0, dtype=np.int64)
+        hidden_states, eos_prob, keys, values = self.sessions["tts_lm_step"].run(
+            None, {"inputs_embeds": inputs_embeds, "type_ids": type_ids, "past_keys": kv[0], "past_values": kv[1]},
+        )
+        return hidden_states[:, -1, :], float(eos_prob.reshape(-1)[0]), (keys, values)
+
+    def _sample_speech_latent(self, condition, neg_condition, cfg_scale, noise_fn):
+        conditions = np.concatenate([condition, neg_condition], axis=0).astype(np.float32)
+        cfg = np.full((1,), cfg_scale, dtype=np.float32)
+
+        def predict(sample, timestep):
+            return self.sessions["diffusion_head"].run(None, {
+                "sample": sample,
+                "timestep": np.full((1,), timestep, dtype=np.float32),
+                "condition": conditions,
+                "cfg_scale": cfg,
+            })[0]
+
+        # Initial noise for the doubled CFG batch, as in the PyTorch path; only the first row is used
+        sample = noise_fn((2, self.config["latent_dim"]))[:1].astype(np.float32)
+        return self.solver.sample(predict, sample, noise_fn)
+
+    def stream(
+        self,
+        text: str,
+        voice: Dict[str, np.ndarray],
+        cfg_scale: float = 1.5,
+        seed: Optional[int] = None,
+        noise_fn: Optional[Callable] = None,
+        stop_check_fn: Optional[Callable[[], bool]] = None,
+        latents: Optional[List[np.ndarray]] = None,
+    ) -> Iterator[np.ndarray]:
+        """
+        Generate speech for `text` and yield float32 audio chunks (one 7.5 Hz frame each) as they are decoded.
+
+        Args:
+            voice: Preset returned by `load_voice`.
+            seed: Seed of the numpy noise generator (ignored when `noise_fn` is given).
+            noise_fn: Optional `noise_fn(shape) -> np.ndarray` of standard normal noise, e.g. to share
+                the noise of the PyTorch path for validation.
+            latents: Optional list that receives the generated `[1, latent_dim]` speech latents.
+        """
+        if noise_fn is None:
+            rng = np.random.default_rng(seed)
+            noise_fn = lambda shape: rng.standard_normal(shape, dtype=np.float32)
+
+        text_ids = self.tokenizer.encode(text.strip() + "\n", add_special_tokens=False).ids
+        text_window, speech_window = self.config["text_window_size"], self.config["speech_window_size"]
+        max_length = self.config["max_position_embeddings"]
+
+        lm_kv = (voice["lm_keys"], voice["lm_values"])
+        tts_kv = (voice["tts_lm_keys"], voice["tts_lm_values"])
+        neg_kv = (voice["neg_tts_lm_keys"], voice["neg_tts_lm_values"])
+        tts_hidden = voice["tts_lm_last_hidden_state"]
+        neg_hidden = voice["neg_tts_lm_last_hidden_state"]
+        tts_length = tts_kv[0].shape[3]
+        decoder_states = [np.zeros(shape, dtype=np.float32) for shape in self.config["decoder_states"]]
+        state_names = [f"state_{i}" for i in range(len(decoder_states))]
+
+        window_index = 0
+        while True:
+            if stop_check_fn is not None and stop_check_fn():
+                return
+
+            window_ids = text_ids[window_index * text_window:(window_index + 1) * text_window]
+            window_index += 1
+            if window_ids:
+                tts_length += len(window_ids)
+                if tts_length > max_length:
+                    return
+                lm_hidden, lm_kv = self._lm_step(np.asarray([window_ids], dtype=np.int64), lm_kv)
+                tts_hidden, _, tts_kv = self._tts_lm_step(lm_hidden, True, tts_kv)
+
+            for _ in range(speech_window):
+                speech_latent = self._sample_speech_latent(tts_hidden, neg_hidden, cfg_scale, noise_fn)
+                if latents is not None:
+                    latents.append(speech_latent)
+
+                outputs = self.sessions["acoustic_decoder"].run(
+                    None, {"speech_latents": speech_latent[:, None, :], **dict(zip(state_names, decoder_states))},
+                )
+                decoder_states = outputs[1:]
+                yield outputs[0].reshape(-1)
+
+                speech_embed = self.sessions["acoustic_connector"].run(None, {"speech_latent": speech_latent[:, None, :]})[0]
+                tts_length += 1
+                if tts_length > max_length:
+                    return
+                tts_hidden, eos_prob, tts_kv = self._tts_lm_step(speech_embed, False, tts_kv)
+                neg_hidden, _, neg_kv = self._tts_lm_step(speech_embed, False, neg_kv)
+                if eos_prob > 0.5:
+                    return
+
+    def generate(self, text: str, voice: Dict[str, np.ndarray], **kwargs) -> Tuple[np.ndarray, np.ndarray]:
+        """Non-streaming variant of `stream`, returning the whole waveform and the `[frames, latent_dim]` latents."""
+        latents: List[np.ndarray] = []
+        chunks = list(self.stream(text, voice, latents=latents, **kwargs))
+        audio = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+        speech_latents = np.concatenate(latents) if latents else np.zeros((0, self.config["latent_dim"]), dtype=np.float32)
+        return audio, speech_latents
+
+
+def write_wav(path: str, audio: np.ndarray, sample_rate: int):
+    """Write float audio in [-1, 1] as 16-bit PCM with the standard library."""
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VibeVoice streaming TTS on onnxruntime")
+    parser.add_argument("--export_dir", type=str, required=True)
+    parser.add_argument("--voice", type=str, required=True, help="Voice preset .npz")
+    parser.add_argument("--text", type=str, required=True)
+    parser.add_argument("--output", type=str, default="output.wav")
+    parser.add_argument("--cfg_scale", type=float, default=1.5)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--num_threads", type=int, default=None)
+    args = parser.parse_args()
+
+    runtime = VibeVoiceOnnxRuntime(args.export_dir, num_threads=args.num_threads)
+    audio, _ = runtime.generate(args.text, runtime.load_voice(args.voice), cfg_scale=args.cfg_scale, seed=args.seed)
+    write_wav(args.output, audio, runtime.sample_rate)
+    print(f"Saved {len(audio) / runtime.sample_rate:.2f} s of audio to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
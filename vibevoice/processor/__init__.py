@@ -2,10 +2,13 @@
 from .vibevoice_processor import VibeVoiceProcessor
 from .vibevoice_streaming_processor import VibeVoiceStreamingProcessor
 from .vibevoice_tokenizer_processor import VibeVoiceTokenizerProcessor, AudioNormalizer
+from .audio_streaming import SilenceTrimmer, StreamingResampler
 
 __all__ = [
     "VibeVoiceProcessor",
     "VibeVoiceStreamingProcessor",
     "VibeVoiceTokenizerProcessor",
     "AudioNormalizer",
+    "StreamingResampler",
+    "SilenceTrimmer",
 ]
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""
+Chunk-wise audio processing stages for streamed model output.
+"""
+
+from math import gcd
+from typing import Optional
+
+import numpy as np
+from scipy import signal
+
+
+class StreamingResampler:
+    """
+    Polyphase FIR resampler that carries its state across chunks.
+
+    The filter is the one used by `scipy.signal.resample_poly` (Kaiser-windowed sinc, cutoff at the lower
+    Nyquist rate), split into `up` phases. Each chunk is resampled against the tail of the previous ones,
+    so concatenating the outputs equals resampling the whole signal at once (no clicks at chunk
+    boundaries). The filter delay is compensated: the output is aligned with the input and, after `flush`,
+    holds `ceil(len(input) * up / down)` samples, like `resample_poly`.
+
+    Args:
+        orig_sr (int): Sample rate of the input chunks.
+        target_sr (int): Sample rate of the output.
+        half_width (int): Filter half length in input or output periods, whichever is longer. Default: 10
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int, half_width: int = 10):
+        divisor = gcd(orig_sr, target_sr)
+        self.orig_sr = orig_sr
+        self.target_sr = target_sr
+        self.up = target_sr // divisor
+        self.down = orig_sr // divisor
+
+        max_rate = max(self.up, self.down)
+        self.half_len = half_width * max_rate if not self.is_identity else 0
+        if self.is_identity:
+            taps = np.ones(1)
+        else:
+            taps = signal.firwin(2 * self.half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * self.up
+        # taps[p + j * up] applies to the j-th most recent input sample for phase p, stored oldest first
+        self.num_taps = -(-len(taps) // self.up)
+        taps = np.pad(taps, (0, self.num_taps * self.up - len(taps)))
+        self.phases = np.ascontiguousarray(taps.reshape(self.num_taps, self.up).T[:, ::-1], dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """Forget the stream history, to start a new stream."""
+        # Inputs from global index `_offset` on; the samples before the stream start are zeros
+        self._history = np.zeros(self.num_taps - 1, dtype=np.float32)
+        self._offset = -(self.num_taps - 1)
+        self._num_in = 0
+        self._num_out = 0
+
+    @property
+    def is_identity(self) -> bool:
+        return self.up == self.down
+
+    def _emit(self, num_out: int) -> np.ndarray:
+        """Compute the next `num_out` outputs from the history; the inputs they need must be present."""
+        if num_out <= 0:
+            return np.zeros(0, dtype=np.float32)
+        n = np.arange(self._num_out, self._num_out + num_out, dtype=np.int64)
+        m = n * self.down + self.half_len
+        last_input, phase = m // self.up, m % self.up
+        windows = np.lib.stride_tricks.sliding_window_view(self._history, self.num_taps)
+        out = np.einsum("nl,nl->n", windows[last_input - self._offset - self.num_taps + 1], self.phases[phase])
+        self._num_out += num_out
+
+        # Keep only the inputs still needed by the next output
+        keep_from = (self._num_out * self.down + self.half_len) // self.up - self.num_taps + 1
+        drop = max(0, min(keep_from - self._offset, len(self._history) - self.num_taps + 1))
+        if drop:
+            self._history = self._history[drop:]
+            self._offset += drop
+        return out.astype(np.float32, copy=False)
+
+    def _available_outputs(self, num_in: int) -> int:
+        # Output n needs inputs up to (n * down + half_len) // up
+        return max(0, (num_in * self.up - 1 - self.half_len) // self.down + 1)
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Resample the next float32 mono chunk; returns every output sample its inputs fully determine."""
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        if self.is_identity:
+            return chunk
+        self._history = np.concatenate([self._history, chunk])
+        self._num_in += len(chunk)
+        return self._emit(self._available_outputs(self._num_in) - self._num_out)
+
+    def flush(self) -> np.ndarray:
+        """Return the outputs held back by the filter delay, treating the stream as followed by silence."""
+        if self.is_identity:
+            return np.zeros(0, dtype=np.float32)
+        total_out = -(-self._num_in * self.up // self.down)
+        padding = self.half_len // self.up + self.num_taps
+        self._history = np.concatenate([self._history, np.zeros(padding, dtype=np.float32)])
+        out = self._emit(total_out - self._num_out)
+        self.reset()
+        return out
+
+    def __call__(self, chunk: Optional[np.ndarray]) -> np.ndarray:
+        """`process(chunk)`, or `flush()` when `chunk` is None."""
+        return self.flush() if chunk is None else self.process(chunk)
+
+
+class SilenceTrimmer:
+    """
+    Streaming gate that drops the silence before the first voiced sample and after the last one.
+
+    The stream is split in windows of `window_ms`; a window is voiced when its RMS level reaches
+    `threshold_db` (dBFS). Until the first voiced window, only the last `pre_roll_ms` of audio are held
+    (and emitted in front of it, so onsets are not clipped). After that, quiet stretches are held back
+    until more voiced audio arrives; at the end of the stream the held silence is dropped, keeping
+    `post_roll_ms`. At most `max_hold_ms` of silence is held, longer pauses are passed through.
+
+    Args:
+        sample_rate (int): Sample rate of the stream.
+        threshold_db (float): RMS level of a voiced window, in dBFS. Default: -50
+        window_ms (float): Analysis window. Default: 10
+        pre_roll_ms (float): Audio kept before the first voiced window. Default: 30
+        post_roll_ms (float): Audio kept after the last voiced window. Default: 50
+        max_hold_ms (float): Longest silence held back while waiting for more speech. Default: 500
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        threshold_db: float = -50.0,
+        window_ms: float = 10.0,
+        pre_roll_ms: float = 30.0,
+        post_roll_ms: float = 50.0,
+        max_hold_ms: float = 500.0,
+    ):
+        self.sample_rate = sample_rate
+        self.threshold = 10 ** (threshold_db / 10)  # on the mean square
+        self.window = max(1, int(sample_rate * window_ms / 1000))
+        self.pre_roll = int(sample_rate * pre_roll_ms / 1000)
+        self.post_roll = int(sample_rate * post_roll_ms / 1000)
+        self.max_hold = max(int(sample_rate * max_hold_ms / 1000), self.post_roll)
+        self.reset()
+
+    def reset(self):
+        """Forget the stream, to start a new one."""
+        self._held = np.zeros(0, dtype=np.float32)
+        self._num_in = 0
+        self.voiced = False
+        # Index in the untrimmed stream of the first voiced window
+        self.first_voiced_sample: Optional[int] = None
+        self.trimmed_leading = 0
+        self.trimmed_trailing = 0
+
+    def _voiced_windows(self, audio: np.ndarray) -> np.ndarray:
+        """Voicing of the windows of `audio`; a trailing partial window counts as a window."""
+        num_windows = -(-len(audio) // self.window)
+        padded = np.zeros(num_windows * self.window, dtype=np.float32)
+        padded[:len(audio)] = audio
+        windows = padded.reshape(num_windows, self.window)
+        lengths = np.full(num_windows, self.window)
+        lengths[-1] = len(audio) - (num_windows - 1) * self.window
+        return np.einsum("nw,nw->n", windows, windows) / lengths >= self.threshold
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Gate the next float32 mono chunk; returns the audio that can be sent now (possibly empty)."""
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        held_start = self._num_in - len(self._held)
+        self._num_in += len(chunk)
+        audio = np.concatenate([self._held, chunk])
+        if not len(audio):
+            return audio
+        voiced = np.flatnonzero(self._voiced_windows(audio))
+
+        if not self.voiced:
+            if not len(voiced):
+                # Only complete windows are known to be silent, a partial one may turn voiced
+                keep_from = max(0, (len(audio) // self.window) * self.window - self.pre_roll)
+                self.trimmed_leading += keep_from
+                self._held = audio[keep_from:]
+                return np.zeros(0, dtype=np.float32)
+            onset = voiced[0] * self.window
+            self.voiced = True
+            self.first_voiced_sample = held_start + onset
+            start = max(0, onset - self.pre_roll)
+            self.trimmed_leading += start
+            audio = audio[start:]
+            voiced = np.flatnonzero(self._voiced_windows(audio))
+
+        # Hold the quiet tail after the last voiced window, up to `max_hold`
+        end = min(len(audio), (voiced[-1] + 1) * self.window) if len(voiced) else 0
+        end = max(end, len(audio) - self.max_hold)
+        self._held = audio[end:]
+        return audio[:end]
+
+    def flush(self) -> np.ndarray:
+        """End of stream: return the post-roll of the held silence and drop the rest."""
+        if not self.voiced:
+            self.trimmed_leading += len(self._held)
+            out = np.zeros(0, dtype=np.float32)
+        else:
+            out = self._held[:self.post_roll]
+            self.trimmed_trailing += len(self._held) - len(out)
+        self._held = np.zeros(0, dtype=np.float32)
+        return out
+
+
+__all__ = [
+    "StreamingResampler",
+    "SilenceTrimmer",
+]
@@ -9,6 +9,7 @@ import torch
 
 from transformers.tokenization_utils_base import BatchEncoding, PaddingStrategy, PreTokenizedInput, TextInput, TruncationStrategy
 from transformers.utils import TensorType, logging
+from ..modular.voice_preset import prompt_length
 from .vibevoice_tokenizer_processor import AudioNormalizer
 
 logger = logging.get_logger(__name__)
@@ -185,7 +186,8 @@ class VibeVoiceStreamingProcessor:
             text (`str`):
                 The input text to process.
             cached_prompt (`Dict[str, Any]`, *optional*):
-                The cached prompt to use for processing. It contains the kv cache of the voice prompt.
+                The cached prompt to use for processing. It contains the kv cache of the voice prompt (a `.pt`
+                preset, or a slim preset from `vibevoice.modular.voice_preset.load_voice_preset`).
             padding (`bool`, `str` or `PaddingStrategy`, defaults to `True`):
                 Whether to pad sequences to the same length
             truncation (`bool`, `str` or `TruncationStrategy`, defaults to `False`):
@@ -217,8 +219,8 @@ class VibeVoiceStreamingProcessor:
         all_encodings = []
         for text_input, cached_prompt_input in zip(texts, cached_prompts):
             script_tokens = self.tokenizer.encode(text_input.strip() + "\n", add_special_tokens=False)
-            input_id_length = cached_prompt_input['lm']['last_hidden_state'].size(1)
-            tts_lm_input_id_length = cached_prompt_input['tts_lm']['last_hidden_state'].size(1)
+            input_id_length = prompt_length(cached_prompt_input['lm'])
+            tts_lm_input_id_length = prompt_length(cached_prompt_input['tts_lm'])
 
             # psudo input ids and masks
             input_ids = [self.tokenizer.pad_id] * input_id_length
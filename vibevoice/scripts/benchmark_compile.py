@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import argparse
+import time
+
+import torch
+from transformers import DynamicCache
+
+from vibevoice.modular.modeling_vibevoice_streaming_inference import VibeVoiceStreamingForConditionalGenerationInference
+from vibevoice.modular.modular_vibevoice_tokenizer import VibeVoiceTokenizerStreamingCache
+
+
+@torch.no_grad()
+def time_per_token(model, num_tokens: int = 50, prompt_length: int = 64, cfg_scale: float = 1.5):
+    """
+    Time the three per-token stages of streaming generation.
+
+    Returns:
+        Dict with the mean milliseconds per speech token of each stage.
+    """
+    hidden_size = model.config.decoder_config.hidden_size
+    lm = model.model.tts_language_model
+    generator = torch.Generator(device="cpu").manual_seed(0)
+
+    # Prefill a KV cache with random embeddings, then time single-token steps on top of it
+    cache = DynamicCache()
+    prompt = torch.randn(1, prompt_length, hidden_size, generator=generator).to(device=lm.device, dtype=lm.dtype)
+    lm(inputs_embeds=prompt, past_key_values=cache, use_cache=True)
+
+    acoustic_cache = VibeVoiceTokenizerStreamingCache()
+    sample_indices = torch.zeros(1, dtype=torch.long, device=model.model.acoustic_tokenizer.device)
+    condition = torch.randn(1, hidden_size, generator=generator).to(device=lm.device, dtype=lm.dtype)
+
+    timings = {"tts_lm": 0.0, "diffusion": 0.0, "decoder": 0.0}
+    for _ in range(num_tokens):
+        start = time.perf_counter()
+        outputs = lm(inputs_embeds=condition.unsqueeze(1), past_key_values=cache, use_cache=True)
+        timings["tts_lm"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        speech_latent = model.sample_speech_tokens(
+            outputs.last_hidden_state[:, -1, :], condition, cfg_scale=cfg_scale, generator=generator,
+        )
+        timings["diffusion"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        model.model.acoustic_tokenizer.decode(
+            speech_latent.unsqueeze(1), cache=acoustic_cache, sample_indices=sample_indices, use_cache=True,
+        )
+        timings["decoder"] += time.perf_counter() - start
+
+    return {stage: 1000.0 * total / num_tokens for stage, total in timings.items()}
+
+
+def compiled_graph_counts(model) -> dict:
+    """Graphs cached by dynamo for each compiled code object (instances of one class share it)."""
+    from torch._dynamo.eval_frame import _debug_get_cache_entry_list
+
+    counts = {}
+    for owner, name in model._compile_targets():
+        code = getattr(type(owner), name).__code__
+        counts[f"{type(owner).__name__}.{name}"] = len(_debug_get_cache_entry_list(code))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-token latency of the eager vs. compiled hot path")
+    parser.add_argument("--model_path", type=str, default="microsoft/VibeVoice-Realtime-0.5B")
+    parser.add_argument("--num_tokens", type=int, default=50, help="Speech tokens timed per run")
+    parser.add_argument("--num_threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--mode", type=str, default=None, help="torch.compile mode")
+    args = parser.parse_args()
+
+    if args.num_threads:
+        torch.set_num_threads(args.num_threads)
+
+    model = VibeVoiceStreamingForConditionalGenerationInference.from_pretrained(
+        args.model_path, torch_dtype=torch.float32, device_map="cpu", attn_implementation="sdpa",
+    )
+    model.eval()
+    model.set_ddpm_inference_steps(num_steps=5)
+
+    time_per_token(model, num_tokens=3)
+    eager = time_per_token(model, num_tokens=args.num_tokens)
+
+    start = time.perf_counter()
+    if not model.compile_for_inference(mode=args.mode, warmup=True):
+        print("Compiled mode unavailable, nothing to compare.")
+        return
+    print(f"Compilation + warmup: {time.perf_counter() - start:.1f} s")
+    from torch._dynamo.utils import counters
+
+    graphs_after_warmup = counters["stats"]["unique_graphs"]
+    compiled = time_per_token(model, num_tokens=args.num_tokens)
+    print(f"Graphs compiled after warmup (recompiles): {counters['stats']['unique_graphs'] - graphs_after_warmup}")
+    for code_name, count in compiled_graph_counts(model).items():
+        # At the limit, dynamo runs further shapes eagerly without an error
+        status = "AT LIMIT, extra shapes run eagerly" if count >= model.compile_graph_limit else "ok"
+        print(f"  {code_name}: {count} graphs (limit {model.compile_graph_limit}) {status}")
+
+    print(f"{'stage':<12}{'eager ms':>12}{'compiled ms':>14}{'speedup':>10}")
+    for stage in eager:
+        print(f"{stage:<12}{eager[stage]:>12.2f}{compiled[stage]:>14.2f}{eager[stage] / compiled[stage]:>9.2f}x")
+    eager_total, compiled_total = sum(eager.values()), sum(compiled.values())
+    print(f"{'total':<12}{eager_total:>12.2f}{compiled_total:>14.2f}{eager_total / compiled_total:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import argparse
+import time
+
+import torch
+from torch.profiler import ProfilerActivity, profile
+
+from vibevoice.modular.configuration_vibevoice import VibeVoiceAcousticTokenizerConfig
+from vibevoice.modular.modular_vibevoice_tokenizer import (
+    SConv1d,
+    SConvTranspose1d,
+    VibeVoiceAcousticTokenizerModel,
+    VibeVoiceTokenizerStreamingCache,
+)
+
+
+def count_allocations(prof) -> int:
+    """Number of allocator calls (CPU or device) recorded by a memory-profiling run."""
+    allocations = 0
+    for event in prof.events():
+        if event.name != "[memory]":
+            continue
+        device_usage = getattr(event, "device_memory_usage", getattr(event, "cuda_memory_usage", 0))
+        if event.cpu_memory_usage > 0 or device_usage > 0:
+            allocations += 1
+    return allocations
+
+
+class ConcatStreamingCache(VibeVoiceTokenizerStreamingCache):
+    """
+    Reference cache with the previous per-sample storage: every window is a fresh `torch.cat` of the
+    cached context and the input, so the in-place window buffer can be checked against it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.contexts = {}  # Dict mapping (layer_id, sample_idx) to context tensor
+
+    def window(self, layer_id, sample_indices, x, context_size):
+        if context_size == 0:
+            return x
+        contexts = [self.contexts.get((layer_id, idx)) for idx in sample_indices.tolist()]
+        contexts = [
+            context if context is not None else x.new_zeros(x.shape[1], context_size)
+            for context in contexts
+        ]
+        return torch.cat([torch.stack(contexts, dim=0), x], dim=2)
+
+    def advance(self, layer_id, sample_indices, window, context_size):
+        if context_size == 0:
+            return
+        for i, idx in enumerate(sample_indices.tolist()):
+            self.contexts[(layer_id, idx)] = window[i, :, -context_size:].clone()
+
+
+@torch.no_grad()
+def benchmark(tokenizer, num_frames: int = 50, batch_size: int = 1):
+    """
+    Stream `num_frames` latent frames through the acoustic decoder one frame at a time.
+
+    Returns:
+        Dict with allocations and milliseconds per frame, and the max deviations of the streamed
+        audio from the same stream through `ConcatStreamingCache` and from a single non-streaming
+        decode of the same latents.
+    """
+    device = tokenizer.device
+    generator = torch.Generator(device="cpu").manual_seed(0)
+    latents = torch.randn(batch_size, num_frames, tokenizer.config.vae_dim, generator=generator)
+    latents = latents.to(device=device, dtype=tokenizer.dtype)
+    sample_indices = torch.arange(batch_size, device=device)
+    activities = [ProfilerActivity.CPU] + ([ProfilerActivity.CUDA] if device.type == "cuda" else [])
+
+    cache = VibeVoiceTokenizerStreamingCache(num_slots=batch_size)
+    chunks, allocations, elapsed = [], 0, 0.0
+    for i in range(num_frames):
+        frame = latents[:, i:i + 1]
+        if i < 2:
+            # The first frames allocate the cache buffers, keep them out of the steady-state numbers
+            chunks.append(tokenizer.decode(frame, cache=cache, sample_indices=sample_indices, use_cache=True))
+            continue
+        with profile(activities=activities, profile_memory=True) as prof:
+            start = time.perf_counter()
+            chunks.append(tokenizer.decode(frame, cache=cache, sample_indices=sample_indices, use_cache=True))
+            if device.type == "cuda":
+                torch.cuda.synchronize()
+            elapsed += time.perf_counter() - start
+        allocations += count_allocations(prof)
+
+    streamed = torch.cat(chunks, dim=-1)
+    concat_cache = ConcatStreamingCache()
+    concat_streamed = torch.cat([
+        tokenizer.decode(latents[:, i:i + 1], cache=concat_cache, sample_indices=sample_indices, use_cache=True)
+        for i in range(num_frames)
+    ], dim=-1)
+    reference = tokenizer.decode(latents)
+    timed_frames = num_frames - 2
+    return {
+        "allocations_per_frame": allocations / timed_frames,
+        "ms_per_frame": 1000.0 * elapsed / timed_frames,
+        "max_abs_diff_concat": (streamed - concat_streamed).abs().max().item(),
+        "max_abs_diff": (streamed - reference[..., :streamed.shape[-1]]).abs().max().item(),
+    }
+
+
+@torch.no_grad()
+def mixed_batch_deviation(tokenizer, num_frames: int = 12, join_frame: int = 4):
+    """
+    Max deviation between decoding two streams separately and in one shared cache, where the second stream
+    joins the batch after `join_frame` frames of the first (as sessions do in `BatchedAcousticDecoder`).
+    """
+    device = tokenizer.device
+    generator = torch.Generator(device="cpu").manual_seed(1)
+    latents = torch.randn(2, num_frames, tokenizer.config.vae_dim, generator=generator)
+    latents = latents.to(device=device, dtype=tokenizer.dtype)
+
+    separate = []
+    for session in range(2):
+        cache = VibeVoiceTokenizerStreamingCache()
+        sample_indices = torch.tensor([0], device=device)
+        frames = range(num_frames - join_frame) if session else range(num_frames)
+        separate.append(torch.cat([
+            tokenizer.decode(latents[session:session + 1, i:i + 1], cache=cache, sample_indices=sample_indices, use_cache=True)
+            for i in frames
+        ], dim=-1))
+
+    cache = VibeVoiceTokenizerStreamingCache(num_slots=2)
+    chunks = [[], []]
+    for i in range(num_frames):
+        if i < join_frame:
+            frame = latents[:1, i:i + 1]
+            sample_indices = torch.tensor([0], device=device)
+        else:
+            frame = torch.stack([latents[0, i:i + 1], latents[1, i - join_frame:i - join_frame + 1]], dim=0)
+            sample_indices = torch.tensor([0, 1], device=device)
+        audio = tokenizer.decode(frame, cache=cache, sample_indices=sample_indices, use_cache=True)
+        for row, session in enumerate(sample_indices.tolist()):
+            chunks[session].append(audio[row:row + 1])
+    batched = [torch.cat(session_chunks, dim=-1) for session_chunks in chunks]
+    return max((a - b).abs().max().item() for a, b in zip(separate, batched))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame allocations of the streaming acoustic decoder")
+    parser.add_argument("--num_frames", type=int, default=50, help="Latent frames streamed per run")
+    parser.add_argument("--batch_size", type=int, default=1, help="Concurrent streams decoded together")
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--num_threads", type=int, default=None, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.num_threads:
+        torch.set_num_threads(args.num_threads)
+
+    # Allocation counts do not depend on the weights, so a randomly initialized tokenizer is enough
+    tokenizer = VibeVoiceAcousticTokenizerModel(VibeVoiceAcousticTokenizerConfig()).to(args.device).eval()
+    num_convs = sum(isinstance(m, (SConv1d, SConvTranspose1d)) for m in tokenizer.decoder.modules())
+
+    result = benchmark(tokenizer, num_frames=args.num_frames, batch_size=args.batch_size)
+    print(f"Streaming convs in decoder: {num_convs}")
+    print(f"Allocations per frame:      {result['allocations_per_frame']:.1f}")
+    print(f"Time per frame:             {result['ms_per_frame']:.2f} ms")
+    print(f"Max |streamed - concat|:    {result['max_abs_diff_concat']:.2e}")
+    print(f"Max |streamed - full|:      {result['max_abs_diff']:.2e}")
+    mixed_diff = mixed_batch_deviation(tokenizer)
+    print(f"Max |mixed batch - alone|:  {mixed_diff:.2e}")
+    tolerance = 1e-4 if tokenizer.dtype == torch.float32 else 1e-2
+    assert result["max_abs_diff_concat"] <= tolerance, "Streaming cache diverges from the concatenating reference"
+    assert mixed_diff <= tolerance, "A stream joining a batch changes the audio of the ongoing one"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import argparse
+import time
+
+import torch
+
+from vibevoice.modular.configuration_vibevoice import VibeVoiceAcousticTokenizerConfig
+from vibevoice.modular.modular_vibevoice_tokenizer import (
+    VibeVoiceAcousticTokenizerModel,
+    VibeVoiceTokenizerStreamingCache,
+)
+
+
+def _synchronize(device):
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+
+
+@torch.no_grad()
+def decode_streaming(tokenizer, latents, decode_chunk_size: int = 1):
+    """Frame-by-frame decode with the streaming cache, as `generate` does."""
+    cache = VibeVoiceTokenizerStreamingCache()
+    sample_indices = torch.zeros(latents.shape[0], dtype=torch.long, device=latents.device)
+    chunks = []
+    for start in range(0, latents.shape[-1], decode_chunk_size):
+        chunk = latents[:, :, start:start + decode_chunk_size]
+        chunks.append(tokenizer.decode(chunk, cache=cache, sample_indices=sample_indices, use_cache=True))
+    return torch.cat(chunks, dim=-1)
+
+
+@torch.no_grad()
+def compare(tokenizer, num_frames: int = 300, offline_chunk_size: int = 100, overlap: int = 64):
+    """
+    Decode the same latents through the streaming and the offline paths.
+
+    Returns:
+        Dict mapping each path to its seconds of audio decoded per second of wall time and its max
+        absolute deviation from the frame-by-frame streaming decode.
+    """
+    device = tokenizer.device
+    generator = torch.Generator(device="cpu").manual_seed(0)
+    latents = torch.randn(1, tokenizer.config.vae_dim, num_frames, generator=generator)
+    latents = latents.to(device=device, dtype=tokenizer.dtype)
+
+    paths = {
+        "streaming": lambda: decode_streaming(tokenizer, latents),
+        "offline": lambda: tokenizer.decode_in_chunks(latents),
+        f"offline_chunked_{offline_chunk_size}": lambda: tokenizer.decode_in_chunks(
+            latents, chunk_size=offline_chunk_size, overlap=overlap,
+        ),
+    }
+
+    results, reference = {}, None
+    for name, run in paths.items():
+        run()  # warmup
+        _synchronize(device)
+        start = time.perf_counter()
+        audio = run()
+        _synchronize(device)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = audio
+        results[name] = {
+            "speed": audio.shape[-1] / 24000 / elapsed,
+            "max_abs_diff": (audio.float() - reference.float()).abs().max().item(),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parity and throughput of streaming vs. offline acoustic decoding")
+    parser.add_argument("--model_path", type=str, default=None,
+                        help="Model to take the acoustic tokenizer from (default: randomly initialized)")
+    parser.add_argument("--num_frames", type=int, default=300, help="Latent frames to decode (7.5 per second)")
+    parser.add_argument("--offline_chunk_size", type=int, default=100, help="Frames per chunk of the chunked path")
+    parser.add_argument("--overlap", type=int, default=64, help="Context frames per chunk of the chunked path")
+    parser.add_argument("--device", type=str, default="cpu")
+    args = parser.parse_args()
+
+    if args.model_path is not None:
+        from vibevoice.modular.modeling_vibevoice_streaming_inference import (
+            VibeVoiceStreamingForConditionalGenerationInference,
+        )
+        model = VibeVoiceStreamingForConditionalGenerationInference.from_pretrained(
+            args.model_path, torch_dtype=torch.float32, device_map=args.device,
+        )
+        tokenizer = model.model.acoustic_tokenizer
+    else:
+        tokenizer = VibeVoiceAcousticTokenizerModel(VibeVoiceAcousticTokenizerConfig()).to(args.device)
+    tokenizer.eval()
+
+    results = compare(tokenizer, args.num_frames, args.offline_chunk_size, args.overlap)
+    print(f"{'path':<24}{'x realtime':>12}{'max |diff|':>14}")
+    for name, result in results.items():
+        print(f"{name:<24}{result['speed']:>12.1f}{result['max_abs_diff']:>14.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import argparse
+import copy
+import time
+
+import torch
+
+from vibevoice.modular.modeling_vibevoice_streaming_inference import (
+    CPU_BF16_PRECISION_MAP,
+    VibeVoiceStreamingForConditionalGenerationInference,
+)
+from vibevoice.processor.vibevoice_streaming_processor import VibeVoiceStreamingProcessor
+
+
+def relative_error(reference, output):
+    reference, output = reference.float(), output.float()
+    return ((output - reference).abs().max() / reference.abs().max().clamp_min(1e-6)).item()
+
+
+def snr_db(reference, output):
+    length = min(reference.shape[-1], output.shape[-1])
+    reference, output = reference[..., :length].double(), output[..., :length].double()
+    return (10.0 * torch.log10(reference.pow(2).sum() / (reference - output).pow(2).sum().clamp_min(1e-20))).item()
+
+
+def log_spectral_distance(reference, output):
+    """Mean absolute log-magnitude distance over a few STFT resolutions (robust to small time shifts)."""
+    length = min(reference.shape[-1], output.shape[-1])
+    distances = []
+    for n_fft in (512, 1024, 2048):
+        window = torch.hann_window(n_fft)
+        spectra = [
+            torch.stft(signal[..., :length].float().reshape(-1), n_fft, hop_length=n_fft // 4, window=window, return_complex=True).abs()
+            for signal in (reference, output)
+        ]
+        distances.append((torch.log(spectra[0] + 1e-5) - torch.log(spectra[1] + 1e-5)).abs().mean().item())
+    return sum(distances) / len(distances)
+
+
+@torch.no_grad()
+def stage_outputs(model, speech_latents, seed: int = 0):
+    """Outputs of every stage on fixed inputs (teacher forced, so each stage is compared in isolation)."""
+    generator = torch.Generator(device="cpu").manual_seed(seed)
+    hidden_size = model.config.decoder_config.hidden_size
+    embeds = torch.randn(1, 32, hidden_size, generator=generator)
+    condition = torch.randn(1, hidden_size, generator=generator)
+    neg_condition = torch.randn(1, hidden_size, generator=generator)
+
+    tts_hidden = model.model.tts_language_model(inputs_embeds=embeds, use_cache=False).last_hidden_state
+    return {
+        "language_model": model.model.language_model(inputs_embeds=embeds, use_cache=False).last_hidden_state,
+        "tts_language_model": tts_hidden,
+        "tts_eos_classifier": torch.sigmoid(model.tts_eos_classifier(tts_hidden[:, -1, :])),
+        "prediction_head": model.sample_speech_tokens(
+            condition, neg_condition, cfg_scale=1.5, generator=torch.Generator(device="cpu").manual_seed(seed),
+        ),
+        "acoustic_decoder": model.decode_speech_latents(speech_latents),
+    }
+
+
+def generate(model, processor, text, preset, seed, cfg_scale):
+    inputs = processor.process_input_with_cached_prompt(text=text, cached_prompt=preset, return_tensors="pt")
+    start = time.perf_counter()
+    outputs = model.generate(
+        **inputs,
+        max_new_tokens=None,
+        cfg_scale=cfg_scale,
+        tokenizer=processor.tokenizer,
+        generation_config={"do_sample": False},
+        seed=seed,
+        all_prefilled_outputs=model.cast_prefilled_outputs(copy.deepcopy(preset)),
+    )
+    elapsed = time.perf_counter() - start
+    audio = outputs.speech_outputs[0].float().reshape(-1)
+    return audio, outputs.speech_latents[0], elapsed / max(audio.shape[-1] / 24000, 1e-6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quality and RTF of the CPU bf16 precision map against fp32")
+    parser.add_argument("--model_path", type=str, default="microsoft/VibeVoice-Realtime-0.5B")
+    parser.add_argument("--voice", type=str, required=True, help="Voice preset .pt")
+    parser.add_argument("--text", type=str, default="VibeVoice streams speech while the text is still being written, one short window at a time.")
+    parser.add_argument("--cfg_scale", type=float, default=1.5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--num_threads", type=int, default=None, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.num_threads:
+        torch.set_num_threads(args.num_threads)
+
+    processor = VibeVoiceStreamingProcessor.from_pretrained(args.model_path)
+    model = VibeVoiceStreamingForConditionalGenerationInference.from_pretrained(
+        args.model_path, torch_dtype=torch.float32, device_map="cpu", attn_implementation="sdpa",
+    )
+    model.eval()
+    model.set_ddpm_inference_steps(num_steps=5)
+    preset = torch.load(args.voice, map_location="cpu", weights_only=False)
+
+    generate(model, processor, args.text, preset, args.seed, args.cfg_scale)  # warmup
+    fp32_audio, fp32_latents, fp32_rtf = generate(model, processor, args.text, preset, args.seed, args.cfg_scale)
+    references = stage_outputs(model, fp32_latents)
+
+    dtypes = model.apply_precision_map(CPU_BF16_PRECISION_MAP)
+    outputs = stage_outputs(model, fp32_latents)
+    generate(model, processor, args.text, preset, args.seed, args.cfg_scale)  # warmup
+    bf16_audio, _, bf16_rtf = generate(model, processor, args.text, preset, args.seed, args.cfg_scale)
+
+    print(f"{'stage':<22}{'dtype':>16}{'rel. max error':>16}")
+    for name, reference in references.items():
+        dtype = str(dtypes.get(name, "")).replace("torch.", "")
+        if name == "acoustic_decoder":
+            dtype += "/" + str(dtypes["acoustic_decoder_head"]).replace("torch.", "")
+            print(f"{name:<22}{dtype:>16}{relative_error(reference, outputs[name]):>16.2e}  (SNR {snr_db(reference, outputs[name]):.1f} dB)")
+        else:
+            print(f"{name:<22}{dtype:>16}{relative_error(reference, outputs[name]):>16.2e}")
+
+    print(f"\nEnd to end (same seed; autoregressive, so the bf16 run may drift from fp32):")
+    print(f"  fp32: {fp32_audio.shape[-1] / 24000:.2f} s audio, RTF {fp32_rtf:.3f}")
+    print(f"  bf16: {bf16_audio.shape[-1] / 24000:.2f} s audio, RTF {bf16_rtf:.3f} ({fp32_rtf / bf16_rtf:.2f}x)")
+    print(f"  log-spectral distance to fp32: {log_spectral_distance(fp32_audio, bf16_audio):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import argparse
+import copy
+
+import torch
+
+from vibevoice.modular.modeling_vibevoice_streaming_inference import VibeVoiceStreamingForConditionalGenerationInference
+from vibevoice.modular.quantization import QUANTIZABLE_COMPONENTS, model_size_bytes, quantize_for_cpu
+from vibevoice.processor.vibevoice_streaming_processor import VibeVoiceStreamingProcessor
+from vibevoice.scripts.benchmark_precision import generate, log_spectral_distance, relative_error, stage_outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTF, model size and audio deviation of int8 quantization per component")
+    parser.add_argument("--model_path", type=str, default="microsoft/VibeVoice-Realtime-0.5B")
+    parser.add_argument("--voice", type=str, required=True, help="Voice preset .pt")
+    parser.add_argument("--text", type=str, default="VibeVoice streams speech while the text is still being written, one short window at a time.")
+    parser.add_argument("--cfg_scale", type=float, default=1.5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--num_threads", type=int, default=None, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.num_threads:
+        torch.set_num_threads(args.num_threads)
+
+    processor = VibeVoiceStreamingProcessor.from_pretrained(args.model_path)
+    base = VibeVoiceStreamingForConditionalGenerationInference.from_pretrained(
+        args.model_path, torch_dtype=torch.float32, device_map="cpu", attn_implementation="sdpa",
+    )
+    base.eval()
+    base.set_ddpm_inference_steps(num_steps=5)
+    preset = torch.load(args.voice, map_location="cpu", weights_only=False)
+
+    generate(base, processor, args.text, preset, args.seed, args.cfg_scale)  # warmup
+    reference_audio, reference_latents, reference_rtf = generate(base, processor, args.text, preset, args.seed, args.cfg_scale)
+    references = stage_outputs(base, reference_latents)
+    reference_size = model_size_bytes(base)
+
+    toggles = [(component,) for component in QUANTIZABLE_COMPONENTS] + [QUANTIZABLE_COMPONENTS]
+    print(f"fp32: {reference_size / 2**20:.0f} MiB, RTF {reference_rtf:.3f}, {reference_audio.shape[-1] / 24000:.2f} s audio\n")
+    print(f"{'quantized':<40}{'MiB':>8}{'RTF':>8}{'speedup':>9}{'spectral':>10}  stage errors")
+    for components in toggles:
+        model = copy.deepcopy(base)
+        quantize_for_cpu(model, components)
+        generate(model, processor, args.text, preset, args.seed, args.cfg_scale)  # warmup
+        audio, _, rtf = generate(model, processor, args.text, preset, args.seed, args.cfg_scale)
+        outputs = stage_outputs(model, reference_latents)
+        errors = ", ".join(f"{name} {relative_error(references[name], outputs[name]):.1e}" for name in references)
+        name = "all" if components == QUANTIZABLE_COMPONENTS else components[0]
+        print(
+            f"{name:<40}{model_size_bytes(model) / 2**20:>8.0f}{rtf:>8.3f}{reference_rtf / rtf:>8.2f}x"
+            f"{log_spectral_distance(reference_audio, audio):>10.3f}  {errors}"
+        )
+        del model
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import argparse
+import time
+
+import numpy as np
+from scipy import signal
+
+from vibevoice.processor.audio_streaming import StreamingResampler
+
+
+def benchmark(orig_sr: int, target_sr: int, seconds: float = 10.0, chunk_samples: int = 3200):
+    """
+    Resample `seconds` of noise chunk by chunk, as the streaming service does.
+
+    Returns:
+        Dict with the CPU milliseconds per second of audio, and the max deviation from resampling the whole
+        signal at once, for the stateful resampler and for calling `resample_poly` on every chunk.
+    """
+    rng = np.random.default_rng(0)
+    audio = (0.3 * rng.standard_normal(int(seconds * orig_sr))).astype(np.float32)
+    chunks = [audio[i:i + chunk_samples] for i in range(0, len(audio), chunk_samples)]
+
+    resampler = StreamingResampler(orig_sr, target_sr)
+    start = time.process_time()
+    streamed = np.concatenate([resampler.process(chunk) for chunk in chunks] + [resampler.flush()])
+    streaming_cpu = time.process_time() - start
+
+    start = time.process_time()
+    stateless = np.concatenate([
+        signal.resample_poly(chunk, resampler.up, resampler.down).astype(np.float32) for chunk in chunks
+    ])
+    stateless_cpu = time.process_time() - start
+
+    reference = signal.resample_poly(audio.astype(np.float64), resampler.up, resampler.down)
+    return {
+        "streaming_ms_per_sec": 1000.0 * streaming_cpu / seconds,
+        "streaming_max_abs_diff": float(np.abs(streamed - reference).max()),
+        "per_chunk_ms_per_sec": 1000.0 * stateless_cpu / seconds,
+        "per_chunk_max_abs_diff": float(np.abs(stateless[:len(reference)] - reference[:len(stateless)]).max()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU cost of the streaming resampler per second of audio")
+    parser.add_argument("--orig_sr", type=int, default=24000)
+    parser.add_argument("--target_sr", type=int, nargs="+", default=[8000, 16000, 44100, 48000])
+    parser.add_argument("--seconds", type=float, default=10.0, help="Audio resampled per run")
+    parser.add_argument("--chunk_samples", type=int, default=3200, help="Samples per streamed chunk")
+    args = parser.parse_args()
+
+    for target_sr in args.target_sr:
+        result = benchmark(args.orig_sr, target_sr, args.seconds, args.chunk_samples)
+        print(
+            f"{args.orig_sr} -> {target_sr} Hz: "
+            f"streaming {result['streaming_ms_per_sec']:.2f} ms/s (max diff {result['streaming_max_abs_diff']:.2e}) | "
+            f"per-chunk resample_poly {result['per_chunk_ms_per_sec']:.2f} ms/s "
+            f"(max diff {result['per_chunk_max_abs_diff']:.2e})"
+        )
+
+
+if __name__ == "__main__":
+    main()
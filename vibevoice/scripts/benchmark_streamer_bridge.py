@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+import torch
+
+from vibevoice.modular.streamer import AudioStreamer, RingBufferAudioStreamer
+
+
+def produce(streamer, num_chunks: int, chunk_samples: int, interval: float, put_times: list):
+    """Generation-thread stand-in: one chunk every `interval` seconds, recording when each was put."""
+    chunk = torch.zeros(1, chunk_samples)
+    sample_indices = torch.tensor([0])
+    try:
+        for _ in range(num_chunks):
+            time.sleep(interval)
+            put_times.append(time.perf_counter())
+            streamer.put(chunk, sample_indices)
+    finally:
+        streamer.end()
+
+
+async def consume_executor(streamer: AudioStreamer, put_times: list, latencies: list):
+    """Previous bridge: every chunk is fetched with a blocking `next` on the default executor."""
+    iterator = streamer.get_stream(0)
+    sentinel = object()
+    received = 0
+    while True:
+        chunk = await asyncio.to_thread(next, iterator, sentinel)
+        if chunk is sentinel:
+            break
+        latencies.append(time.perf_counter() - put_times[received])
+        received += 1
+
+
+async def consume_async(streamer: RingBufferAudioStreamer, put_times: list, latencies: list):
+    """Loop-bound bridge: chunks are published with `call_soon_threadsafe` and awaited directly."""
+    received = 0
+    async for chunk in streamer.get_async_stream(0):
+        latencies.append(time.perf_counter() - put_times[received])
+        received += 1
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: list, period: float = 0.001):
+    """Overshoot of a periodic 1 ms timer, i.e. how late the loop gets to ready callbacks."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(period)
+        lags.append(loop.time() - start - period)
+
+
+async def run(mode: str, num_streams: int, num_chunks: int, chunk_samples: int, interval: float):
+    loop = asyncio.get_running_loop()
+    latencies, lags = [], []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop, lags))
+
+    threads, consumers = [], []
+    for _ in range(num_streams):
+        put_times = []
+        if mode == "executor":
+            streamer = AudioStreamer(batch_size=1)
+            consumers.append(consume_executor(streamer, put_times, latencies))
+        else:
+            streamer = RingBufferAudioStreamer(batch_size=1, pin_memory=False, loop=loop)
+            consumers.append(consume_async(streamer, put_times, latencies))
+        threads.append(threading.Thread(
+            target=produce, args=(streamer, num_chunks, chunk_samples, interval, put_times), daemon=True
+        ))
+
+    cpu_start, wall_start = time.thread_time(), time.perf_counter()
+    for thread in threads:
+        thread.start()
+    await asyncio.gather(*consumers)
+    loop_cpu, wall = time.thread_time() - cpu_start, time.perf_counter() - wall_start
+    stop.set()
+    await lag_task
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    total_chunks = num_streams * num_chunks
+    return {
+        "latency_mean_ms": 1000.0 * statistics.fmean(latencies),
+        "latency_p99_ms": 1000.0 * latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        "loop_cpu_us_per_chunk": 1e6 * loop_cpu / total_chunks,
+        "loop_lag_p99_ms": 1000.0 * sorted(lags)[int(0.99 * (len(lags) - 1))] if lags else 0.0,
+        "wall_s": wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Event-loop overhead of handing audio chunks from generation threads to asyncio consumers"
+    )
+    parser.add_argument("--num_streams", type=int, default=50, help="Concurrent streams, one producer thread each")
+    parser.add_argument("--num_chunks", type=int, default=100, help="Chunks per stream")
+    parser.add_argument("--chunk_samples", type=int, default=3200, help="Samples per chunk (one latent frame at 24 kHz)")
+    parser.add_argument("--interval_ms", type=float, default=20.0, help="Time between chunks of one stream")
+    args = parser.parse_args()
+
+    for mode in ("executor", "async"):
+        result = asyncio.run(run(mode, args.num_streams, args.num_chunks, args.chunk_samples, args.interval_ms / 1000.0))
+        print(
+            f"{mode:>8}: latency mean {result['latency_mean_ms']:.3f} ms, p99 {result['latency_p99_ms']:.3f} ms | "
+            f"loop CPU {result['loop_cpu_us_per_chunk']:.1f} us/chunk | "
+            f"loop lag p99 {result['loop_lag_p99_ms']:.3f} ms | {result['wall_s']:.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import argparse
+import glob
+import os
+import time
+
+import torch
+
+from vibevoice.modular.voice_preset import (
+    PRESET_KEYS,
+    VOICE_PRESET_SUFFIX,
+    clone_prefilled_outputs,
+    convert_voice_preset,
+    load_voice_preset,
+    prompt_length,
+)
+
+
+def verify(original, converted):
+    """Largest absolute difference between the tensors inference reads from both presets."""
+    # Normalizes the caches of both to `DynamicCache`
+    original, converted = clone_prefilled_outputs(original), clone_prefilled_outputs(converted)
+    deviation = 0.0
+    for name in PRESET_KEYS:
+        if prompt_length(original[name]) != prompt_length(converted[name]):
+            raise ValueError(f"{name}: prompt length {prompt_length(converted[name])} != {prompt_length(original[name])}")
+        pairs = [(original[name]["last_hidden_state"][:, -1:, :], converted[name]["last_hidden_state"])]
+        original_cache, converted_cache = original[name]["past_key_values"], converted[name]["past_key_values"]
+        pairs += list(zip(original_cache.key_cache, converted_cache.key_cache))
+        pairs += list(zip(original_cache.value_cache, converted_cache.value_cache))
+        for reference, tensor in pairs:
+            deviation = max(deviation, (reference.float() - tensor.float()).abs().max().item())
+    return deviation
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert pickled .pt voice presets to the slim memory-mapped format")
+    parser.add_argument("presets", nargs="+", help=".pt presets, or directories of them")
+    parser.add_argument("--output_dir", type=str, default=None, help="Default: next to each preset")
+    parser.add_argument("--dtype", type=str, default=None, choices=["float32", "bfloat16", "float16"],
+                        help="Storage dtype, use the dtype of the serving model (default: as stored)")
+    parser.add_argument("--verify", action="store_true", help="Reload both formats, compare them and time the loads")
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.presets:
+        paths += sorted(glob.glob(os.path.join(path, "*.pt"))) if os.path.isdir(path) else [path]
+    dtype = getattr(torch, args.dtype) if args.dtype else None
+
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        output_path = os.path.join(args.output_dir, name + VOICE_PRESET_SUFFIX) if args.output_dir else None
+        output_path = convert_voice_preset(path, output_path, dtype=dtype)
+        print(f"{path} ({os.path.getsize(path) / 2**20:.1f} MiB) -> {output_path} ({os.path.getsize(output_path) / 2**20:.1f} MiB)")
+
+        if args.verify:
+            start = time.perf_counter()
+            original = torch.load(path, map_location="cpu", weights_only=False)
+            pickle_ms = 1000.0 * (time.perf_counter() - start)
+            start = time.perf_counter()
+            converted = load_voice_preset(output_path)
+            mmap_ms = 1000.0 * (time.perf_counter() - start)
+            print(f"  load: torch.load {pickle_ms:.1f} ms, mmap {mmap_ms:.1f} ms; max abs deviation {verify(original, converted):.3g}")
+
+
+if __name__ == "__main__":
+    main()
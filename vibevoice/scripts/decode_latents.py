@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import argparse
+import os
+import time
+
+import torch
+
+from vibevoice.modular.latent_io import denormalize_speech_latents, load_acoustic_tokenizer, load_speech_latents
+
+
+def render(tokenizer, path: str, chunk_size=None, overlap: int = 64):
+    """
+    Decode one latent file to audio.
+
+    Returns:
+        The float32 numpy waveform at the decoder's native rate and the file metadata.
+    """
+    speech_latents, metadata = load_speech_latents(path)
+    if speech_latents.shape[-1] != tokenizer.config.vae_dim:
+        raise ValueError(f"{path}: latent dim {speech_latents.shape[-1]} does not match the tokenizer ({tokenizer.config.vae_dim})")
+
+    scaled_latents = denormalize_speech_latents(speech_latents, metadata).to(tokenizer.device, tokenizer.dtype)
+    with torch.no_grad():
+        audio = tokenizer.decode_in_chunks(scaled_latents, chunk_size=chunk_size, overlap=overlap)
+    return audio[0, 0].float().cpu().numpy(), metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render speech latent files saved by VibeVoice generation to audio")
+    parser.add_argument("latents", nargs="+", help="Latent .safetensors files")
+    parser.add_argument("--model_path", type=str, default="microsoft/VibeVoice-Realtime-0.5B",
+                        help="Checkpoint to take the acoustic tokenizer from (only its weights are loaded)")
+    parser.add_argument("--output_dir", type=str, default="./outputs")
+    parser.add_argument("--format", type=str, default="wav", choices=["wav", "flac", "ogg"],
+                        help="Output container, written with soundfile")
+    parser.add_argument("--sample_rate", type=int, default=None, help="Resample to this rate (default: native 24 kHz)")
+    parser.add_argument("--chunk_size", type=int, default=None,
+                        help="Decode in chunks of this many frames to bound memory (default: whole utterance)")
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    import soundfile as sf
+
+    print(f"Loading acoustic tokenizer from {args.model_path}")
+    tokenizer = load_acoustic_tokenizer(args.model_path, device=args.device)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    for path in args.latents:
+        start = time.perf_counter()
+        audio, metadata = render(tokenizer, path, chunk_size=args.chunk_size)
+        sample_rate = metadata["sample_rate"]
+        if args.sample_rate and args.sample_rate != sample_rate:
+            import librosa
+            audio = librosa.resample(audio, orig_sr=sample_rate, target_sr=args.sample_rate)
+            sample_rate = args.sample_rate
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        output_path = os.path.join(args.output_dir, f"{name}.{args.format}")
+        sf.write(output_path, audio, sample_rate)
+        elapsed = time.perf_counter() - start
+        print(f"{path}: {metadata['num_frames']} frames -> {output_path} ({len(audio) / sample_rate:.2f} s audio in {elapsed:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import argparse
+import glob
+import os
+
+import torch
+
+from vibevoice.modular.modeling_vibevoice_streaming_inference import VibeVoiceStreamingForConditionalGenerationInference
+from vibevoice.onnx.export import convert_voice_preset, export_onnx
+from vibevoice.processor.vibevoice_streaming_processor import VibeVoiceStreamingProcessor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export VibeVoice streaming components to ONNX for the onnxruntime CPU runtime")
+    parser.add_argument("--model_path", type=str, default="microsoft/VibeVoice-Realtime-0.5B")
+    parser.add_argument("--output_dir", type=str, default="./onnx_export")
+    parser.add_argument("--voices_dir", type=str, default="demo/voices/streaming_model",
+                        help="Directory of .pt voice presets to convert to .npz")
+    parser.add_argument("--ddpm_steps", type=int, default=5, help="Diffusion steps baked into the solver tables")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    processor = VibeVoiceStreamingProcessor.from_pretrained(args.model_path)
+    model = VibeVoiceStreamingForConditionalGenerationInference.from_pretrained(
+        args.model_path, torch_dtype=torch.float32, device_map="cpu", attn_implementation="eager",
+    )
+    model.eval()
+    model.set_ddpm_inference_steps(num_steps=args.ddpm_steps)
+
+    runtime_config = export_onnx(model, processor, args.output_dir, opset=args.opset)
+    print(f"Exported graphs to {args.output_dir} ({len(runtime_config['decoder_states'])} decoder states)")
+
+    voices_dir = os.path.join(args.output_dir, "voices")
+    os.makedirs(voices_dir, exist_ok=True)
+    for preset_path in sorted(glob.glob(os.path.join(args.voices_dir, "*.pt"))):
+        name = os.path.splitext(os.path.basename(preset_path))[0]
+        convert_voice_preset(preset_path, os.path.join(voices_dir, f"{name}.npz"))
+        print(f"Converted voice {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import argparse
+
+import torch
+
+from vibevoice.modular.modeling_vibevoice_streaming_inference import VibeVoiceStreamingForConditionalGenerationInference
+from vibevoice.modular.quantization import QUANTIZABLE_COMPONENTS, model_size_bytes, quantize_for_cpu, save_quantized
+from vibevoice.processor.vibevoice_streaming_processor import VibeVoiceStreamingProcessor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize a VibeVoice model to int8 for CPU serving and save it")
+    parser.add_argument("--model_path", type=str, default="microsoft/VibeVoice-Realtime-0.5B")
+    parser.add_argument("--output_dir", type=str, required=True)
+    parser.add_argument("--components", type=str, nargs="+", default=list(QUANTIZABLE_COMPONENTS),
+                        choices=list(QUANTIZABLE_COMPONENTS), help="Components whose Linear layers are quantized")
+    parser.add_argument("--dtype", type=str, default="qint8", choices=["qint8", "float16"], help="Weight dtype of the dynamic kernels")
+    args = parser.parse_args()
+
+    processor = VibeVoiceStreamingProcessor.from_pretrained(args.model_path)
+    model = VibeVoiceStreamingForConditionalGenerationInference.from_pretrained(
+        args.model_path, torch_dtype=torch.float32, device_map="cpu", attn_implementation="sdpa",
+    )
+    model.eval()
+    size = model_size_bytes(model)
+
+    counts = quantize_for_cpu(model, args.components, dtype=getattr(torch, args.dtype))
+    save_quantized(model, args.output_dir)
+    processor.save_pretrained(args.output_dir)
+    print(f"Quantized {counts}: {size / 2**20:.0f} MiB -> {model_size_bytes(model) / 2**20:.0f} MiB, saved to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
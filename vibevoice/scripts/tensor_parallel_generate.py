@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Single-stream generation with the language models sharded across processes on one host.
+
+Launch one process per socket / NUMA node, e.g.:
+
+    torchrun --standalone --nproc_per_node 2 vibevoice/scripts/tensor_parallel_generate.py \
+        --voice demo/voices/streaming_model/en-WHTest_man.pt --txt_path demo/text_examples/1p_vibevoice.txt
+"""
+import argparse
+import copy
+import os
+import time
+
+import torch
+import torch.distributed as dist
+
+from vibevoice.modular.modeling_vibevoice_streaming_inference import VibeVoiceStreamingForConditionalGenerationInference
+from vibevoice.modular.tensor_parallel import apply_tensor_parallel, shard_prefilled_outputs
+from vibevoice.processor.vibevoice_streaming_processor import VibeVoiceStreamingProcessor
+
+
+def bind_cores(local_rank: int, local_world_size: int):
+    """Pin this rank to its own contiguous block of the available cores and size the torch thread pool to it."""
+    cores = sorted(os.sched_getaffinity(0))
+    block = len(cores) // local_world_size
+    if block == 0:
+        return []
+    cores = cores[local_rank * block:(local_rank + 1) * block]
+    os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+    return cores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tensor-parallel CPU generation (run under torchrun)")
+    parser.add_argument("--model_path", type=str, default="microsoft/VibeVoice-Realtime-0.5B")
+    parser.add_argument("--voice", type=str, required=True, help="Voice preset .pt")
+    parser.add_argument("--txt_path", type=str, required=True)
+    parser.add_argument("--output", type=str, default="./outputs/tensor_parallel.wav")
+    parser.add_argument("--cfg_scale", type=float, default=1.5)
+    parser.add_argument("--seed", type=int, default=0, help="Shared by all ranks")
+    parser.add_argument("--no_bind_cores", action="store_true", help="Do not pin the ranks to disjoint core blocks")
+    args = parser.parse_args()
+
+    dist.init_process_group("gloo")
+    rank = dist.get_rank()
+    local_rank = int(os.environ.get("LOCAL_RANK", rank))
+    local_world_size = int(os.environ.get("LOCAL_WORLD_SIZE", dist.get_world_size()))
+    if not args.no_bind_cores:
+        cores = bind_cores(local_rank, local_world_size)
+        print(f"[rank {rank}] bound to cores {cores[0]}-{cores[-1]}" if cores else f"[rank {rank}] not enough cores to bind")
+
+    with open(args.txt_path, "r", encoding="utf-8") as f:
+        text = f.read().strip()
+
+    processor = VibeVoiceStreamingProcessor.from_pretrained(args.model_path)
+    model = VibeVoiceStreamingForConditionalGenerationInference.from_pretrained(
+        args.model_path, torch_dtype=torch.float32, device_map="cpu", attn_implementation="sdpa",
+    )
+    model.eval()
+    model.set_ddpm_inference_steps(num_steps=5)
+    apply_tensor_parallel(model)
+
+    preset = torch.load(args.voice, map_location="cpu", weights_only=False)
+    inputs = processor.process_input_with_cached_prompt(text=text, cached_prompt=preset, return_tensors="pt")
+
+    dist.barrier()
+    start = time.perf_counter()
+    outputs = model.generate(
+        **inputs,
+        max_new_tokens=None,
+        cfg_scale=args.cfg_scale,
+        tokenizer=processor.tokenizer,
+        generation_config={"do_sample": False},
+        seed=args.seed,
+        verbose=rank == 0,
+        all_prefilled_outputs=shard_prefilled_outputs(model, copy.deepcopy(preset)),
+    )
+    elapsed = time.perf_counter() - start
+
+    if rank == 0:
+        audio = outputs.speech_outputs[0]
+        duration = audio.shape[-1] / 24000
+        print(f"Generated {duration:.2f} s in {elapsed:.2f} s (RTF {elapsed / duration:.3f}) on {dist.get_world_size()} ranks")
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        processor.save_audio(audio, output_path=args.output)
+        print(f"Saved output to {args.output}")
+    dist.destroy_process_group()
+
+
+if __name__ == "__main__":
+    main()
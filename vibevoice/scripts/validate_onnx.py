@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import argparse
+import copy
+
+import numpy as np
+import torch
+
+from vibevoice.modular.modeling_vibevoice_streaming_inference import VibeVoiceStreamingForConditionalGenerationInference
+from vibevoice.onnx.export import convert_voice_preset
+from vibevoice.onnx.runtime import VibeVoiceOnnxRuntime
+from vibevoice.processor.vibevoice_streaming_processor import VibeVoiceStreamingProcessor
+
+
+def _report(name, reference, candidate):
+    """Print the max absolute difference and the SNR (dB) of `candidate` against `reference`."""
+    length = min(len(reference), len(candidate))
+    reference, candidate = reference[:length].astype(np.float64), candidate[:length].astype(np.float64)
+    error = reference - candidate
+    max_diff = float(np.abs(error).max()) if length else 0.0
+    snr = 10.0 * np.log10(np.sum(reference ** 2) / max(np.sum(error ** 2), 1e-20)) if length else float("nan")
+    print(f"{name:>20}: {length} values, max |diff| {max_diff:.2e}, SNR {snr:.1f} dB")
+    return max_diff, snr
+
+
+@torch.no_grad()
+def validate_components(model, runtime, seed: int = 0):
+    """Compare the diffusion head, connector and one decoder step against the PyTorch modules."""
+    generator = torch.Generator(device="cpu").manual_seed(seed)
+    hidden_size, latent_dim = runtime.config["hidden_size"], runtime.config["latent_dim"]
+
+    sample = torch.randn(1, latent_dim, generator=generator)
+    condition = torch.randn(2, hidden_size, generator=generator)
+    timestep = torch.full((2,), 500.0)
+    eps = model.model.prediction_head(torch.cat([sample, sample]), timestep, condition=condition)
+    expected = eps[1:] + 1.5 * (eps[:1] - eps[1:])
+    actual = runtime.sessions["diffusion_head"].run(None, {
+        "sample": sample.numpy(), "timestep": timestep[:1].numpy(),
+        "condition": condition.numpy(), "cfg_scale": np.full((1,), 1.5, dtype=np.float32),
+    })[0]
+    _report("diffusion_head", expected.numpy().ravel(), actual.ravel())
+
+    speech_latent = torch.randn(1, 1, latent_dim, generator=generator)
+    expected = model.model.acoustic_connector(speech_latent)
+    actual = runtime.sessions["acoustic_connector"].run(None, {"speech_latent": speech_latent.numpy()})[0]
+    _report("acoustic_connector", expected.numpy().ravel(), actual.ravel())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the ONNX runtime against the PyTorch generate path")
+    parser.add_argument("--model_path", type=str, default="microsoft/VibeVoice-Realtime-0.5B")
+    parser.add_argument("--export_dir", type=str, default="./onnx_export")
+    parser.add_argument("--voice", type=str, required=True, help="Voice preset .pt")
+    parser.add_argument("--text", type=str, default="The quick brown fox jumps over the lazy dog.")
+    parser.add_argument("--cfg_scale", type=float, default=1.5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ddpm_steps", type=int, default=5, help="Must match the exported solver tables")
+    args = parser.parse_args()
+
+    processor = VibeVoiceStreamingProcessor.from_pretrained(args.model_path)
+    model = VibeVoiceStreamingForConditionalGenerationInference.from_pretrained(
+        args.model_path, torch_dtype=torch.float32, device_map="cpu", attn_implementation="eager",
+    )
+    model.eval()
+    model.set_ddpm_inference_steps(num_steps=args.ddpm_steps)
+    runtime = VibeVoiceOnnxRuntime(args.export_dir)
+
+    validate_components(model, runtime)
+
+    # End to end: PyTorch generate with a seeded generator ...
+    preset = torch.load(args.voice, map_location="cpu", weights_only=False)
+    inputs = processor.process_input_with_cached_prompt(text=args.text, cached_prompt=preset, return_tensors="pt")
+    outputs = model.generate(
+        **inputs,
+        max_new_tokens=None,
+        cfg_scale=args.cfg_scale,
+        tokenizer=processor.tokenizer,
+        generation_config={"do_sample": False},
+        seed=args.seed,
+        all_prefilled_outputs=copy.deepcopy(preset),
+    )
+    torch_audio = outputs.speech_outputs[0].float().numpy().ravel()
+    torch_latents = outputs.speech_latents[0].float().numpy() if outputs.speech_latents and outputs.speech_latents[0] is not None else None
+
+    # ... against the ONNX runtime drawing the same noise in the same order
+    generator = torch.Generator(device="cpu").manual_seed(args.seed)
+    noise_fn = lambda shape: torch.randn(*shape, generator=generator).numpy()
+    voice = runtime.load_voice(convert_voice_preset(args.voice, args.voice.rsplit(".", 1)[0] + ".npz"))
+    onnx_audio, onnx_latents = runtime.generate(args.text, voice, cfg_scale=args.cfg_scale, noise_fn=noise_fn)
+
+    print(f"Frames: torch {len(torch_audio) // 3200}, onnx {len(onnx_latents)}")
+    if torch_latents is not None:
+        _report("speech_latents", torch_latents.reshape(-1), onnx_latents.reshape(-1))
+    _report("audio", torch_audio, onnx_audio)
+
+
+if __name__ == "__main__":
+    main()